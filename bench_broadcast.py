@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark pentru costul CPU al unui broadcast în server.py.
+
+Compară serializarea separată pentru fiecare destinatar (varianta veche,
+send_to_client în buclă) cu fan_out(), care serializează o singură dată
+și pune aceleași octeți în cozile tuturor destinatarilor.
+Nu deschide socket-uri: destinatarii sunt conexiuni fără scriitor.
+
+Rulare: python3 bench_broadcast.py [numar_destinatari ...]
+"""
+
+import sys
+import time
+
+import server
+from chat_protocol import FRAMED
+
+MESSAGE = {'from': 'benchmark', 'message': 'Salut tuturor! ' * 8, 'type': 'broadcast'}
+ROUNDS = 20
+
+
+def make_recipients(count):
+    """Creează conexiuni false, în format framed, cu cozi golite manual."""
+    recipients = []
+    for i in range(count):
+        conn = server.new_connection(None, ('127.0.0.1', 10000 + i))
+        conn['decoder'].mode = FRAMED
+        conn['wake'] = lambda: None
+        recipients.append(conn)
+    return recipients
+
+
+def per_recipient(recipients):
+    for conn in recipients:
+        server.send_to_client(conn, 'message', MESSAGE)
+
+
+def serialize_once(recipients):
+    server.fan_out(recipients, 'message', MESSAGE)
+
+
+def measure(func, recipients):
+    """Returnează timpul CPU mediu (ms) pentru un broadcast."""
+    total = 0.0
+    for _ in range(ROUNDS):
+        start = time.process_time()
+        func(recipients)
+        total += time.process_time() - start
+        for conn in recipients:
+            conn['outbox'].clear()
+    return total / ROUNDS * 1000
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1000, 10000]
+    server.config['outbox_limit'] = ROUNDS + 1
+
+    print(f"{'destinatari':>12} {'per destinatar':>16} {'o singură dată':>16} {'accelerare':>11}")
+    for size in sizes:
+        recipients = make_recipients(size)
+        old = measure(per_recipient, recipients)
+        new = measure(serialize_once, recipients)
+        print(f"{size:>12} {old:>13.2f} ms {new:>13.2f} ms {old / new:>10.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: parse_dns_response de dinainte de dns_wire (copiat mai
+jos, neschimbat, ca referință) față de parse_dns_response de acum, pentru
+câteva răspunsuri tipice; rezultatele celor două trebuie să coincidă.
+
+Ca informație sunt măsurate și parse_dns_response_ttl, care pe lângă
+rezultate calculează TTL-ul (pentru un răspuns negativ citește și SOA-ul
+din authority), și parse_message, care decodează toate secțiunile și
+toate numele. Parserul vechi nu face nimic din toate acestea, deci ele
+sunt mai lente decât el prin construcție. La fel și pentru MX: parserul
+vechi ignora înregistrările MX, iar cel nou le decodează.
+
+Rulare: python3 bench_dns_parse.py [numar_repetari]
+"""
+
+import struct
+import sys
+import time
+
+from dns_client import RCODE_NXDOMAIN, build_dns_query, parse_dns_response, parse_dns_response_ttl
+from dns_wire import (TYPE_A, TYPE_AAAA, TYPE_CNAME, TYPE_MX, TYPE_NS, TYPE_PTR, TYPE_SOA, TYPE_SRV,
+                      TYPE_TXT, parse_message)
+
+QUESTION_NAME = b'\xc0\x0c'     # pointer către numele din întrebare
+
+
+def name(text):
+    """Un nume necomprimat în formatul DNS."""
+    return b''.join(bytes([len(label)]) + label.encode() for label in text.split('.')) + b'\x00'
+
+
+def record(owner, rtype, ttl, rdata):
+    return owner + struct.pack('>HHIH', rtype, 1, ttl, len(rdata)) + rdata
+
+
+def response(domain, query_type, answers=(), authority=(), additional=(), rcode=0):
+    """Răspunsul (cu întrebarea copiată din query) care conține înregistrările date."""
+    query, transaction_id = build_dns_query(domain, query_type=query_type, payload=0)
+    header = struct.pack('>HHHHHH', transaction_id, 0x8180 | rcode, 1,
+                         len(answers), len(authority), len(additional))
+    return header + query[12:] + b''.join(answers) + b''.join(authority) + b''.join(additional)
+
+
+def soa(ttl=300):
+    return record(name('example.com'), TYPE_SOA, ttl, name('ns1.example.com') + name('admin.example.com')
+                  + struct.pack('>IIIII', 2024010101, 7200, 3600, 1209600, 60))
+
+
+SAMPLES = [
+    ('A', TYPE_A, response('www.example.com', TYPE_A, [record(QUESTION_NAME, TYPE_A, 300, bytes([93, 184, 216, 34]))])),
+    ('CNAME+4A', TYPE_A, response('www.example.com', TYPE_A, [
+        record(QUESTION_NAME, TYPE_CNAME, 3600, name('edge.cdn.example.net'))] + [
+        record(name('edge.cdn.example.net'), TYPE_A, 60, bytes([10, 0, 0, i])) for i in range(4)])),
+    ('NXDOMAIN', TYPE_A, response('nu-exista.example.com', TYPE_A, authority=[soa()], rcode=RCODE_NXDOMAIN)),
+    ('PTR', TYPE_PTR, response('34.216.184.93.in-addr.arpa', TYPE_PTR, [
+        record(QUESTION_NAME, TYPE_PTR, 86400, name('www.example.com'))])),
+    ('100 A', TYPE_A, response('mare.example.com', TYPE_A, [
+        record(QUESTION_NAME, TYPE_A, 30, bytes([10, 1, i // 256, i % 256])) for i in range(100)])),
+    ('MX+NS+glue', TYPE_MX, response('example.com', TYPE_MX, [
+        record(QUESTION_NAME, TYPE_MX, 3600, struct.pack('>H', 10) + b'\x04mail\xc0\x0c'),
+        record(QUESTION_NAME, TYPE_TXT, 3600, b'\x0dv=spf1 -all x'),
+        record(b'\x04_sip\x04_tcp\xc0\x0c', TYPE_SRV, 3600, struct.pack('>HHH', 10, 5, 5060) + b'\x03sip\xc0\x0c')],
+        [record(QUESTION_NAME, TYPE_NS, 3600, b'\x03ns1\xc0\x0c'), record(QUESTION_NAME, TYPE_NS, 3600, b'\x03ns2\xc0\x0c')],
+        [record(b'\x03ns1\xc0\x0c', TYPE_A, 3600, bytes([192, 0, 2, 1])),
+         record(b'\x03ns1\xc0\x0c', TYPE_AAAA, 3600, bytes(15) + b'\x01')])),
+]
+
+
+# --- Parserul de dinainte de dns_wire (parse_dns_response din dns_client), neschimbat ---
+
+def legacy_parse_dns_response(response, query_type):
+    """Parsează răspunsul DNS și extrage adresele."""
+    results = []
+    
+    # Header: 12 bytes
+    if len(response) < 12:
+        return results
+    
+    header = struct.unpack('>HHHHHH', response[:12])
+    answer_count = header[3]
+    
+    # Sari peste header și question section
+    offset = 12
+    
+    # Sari peste question section
+    while offset < len(response) and response[offset] != 0:
+        length = response[offset]
+        if length >= 192:  # Pointer
+            offset += 2
+            break
+        offset += length + 1
+    else:
+        offset += 1  # Null terminator
+    
+    offset += 4  # Query type și class
+    
+    # Parsează answer section
+    for _ in range(answer_count):
+        if offset >= len(response):
+            break
+        
+        # Name (poate fi pointer)
+        if response[offset] >= 192:
+            offset += 2
+        else:
+            while offset < len(response) and response[offset] != 0:
+                offset += response[offset] + 1
+            offset += 1
+        
+        if offset + 10 > len(response):
+            break
+        
+        rtype, rclass, ttl, rdlength = struct.unpack('>HHIH', response[offset:offset+10])
+        offset += 10
+        
+        if offset + rdlength > len(response):
+            break
+        
+        rdata = response[offset:offset+rdlength]
+        offset += rdlength
+        
+        if rtype == 1 and rdlength == 4:  # A record (IPv4)
+            ip = '.'.join(str(b) for b in rdata)
+            results.append(ip)
+        elif rtype == 12:  # PTR record
+            # Parsează numele de domeniu
+            name = legacy_parse_domain_name(response, offset - rdlength)
+            if name:
+                results.append(name)
+    
+    return results
+
+
+def legacy_parse_domain_name(response, offset):
+    """Parsează un nume de domeniu din răspunsul DNS."""
+    parts = []
+    visited = set()
+    
+    while offset < len(response):
+        if offset in visited:
+            break
+        visited.add(offset)
+        
+        length = response[offset]
+        
+        if length == 0:
+            break
+        elif length >= 192:  # Pointer
+            if offset + 1 >= len(response):
+                break
+            pointer = ((length & 0x3F) << 8) | response[offset + 1]
+            return legacy_parse_domain_name(response, pointer)
+        else:
+            offset += 1
+            if offset + length > len(response):
+                break
+            parts.append(response[offset:offset+length].decode('utf-8', errors='ignore'))
+            offset += length
+    
+    return '.'.join(parts) if parts else None
+
+
+def rates(funcs, repeat, rounds=7):
+    """
+    Operații pe secundă pentru fiecare funcție, cea mai bună din `rounds`
+    măsurători; funcțiile se măsoară pe rând în fiecare rundă, ca
+    zgomotul mașinii să le afecteze la fel.
+    """
+    best = [None] * len(funcs)
+    for _ in range(rounds):
+        for index, func in enumerate(funcs):
+            start = time.perf_counter()
+            for _ in range(repeat):
+                func()
+            elapsed = time.perf_counter() - start
+            if best[index] is None or elapsed < best[index]:
+                best[index] = elapsed
+    return [repeat / elapsed for elapsed in best]
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+
+    print(f"{'răspuns':<12} {'octeți':>7} {'vechi/s':>12} {'nou/s':>12} {'raport':>7} "
+          f"{'cu TTL/s':>12} {'parse_message/s':>16} {'raport':>7}")
+    for label, query_type, data in SAMPLES:
+        # Răspunsurile mari sunt mai lente; păstrăm durata totală rezonabilă
+        count = repeat if len(data) < 512 else max(1, repeat // 20)
+        legacy = legacy_parse_dns_response(data, query_type)
+        current = parse_dns_response(data, query_type)
+        if query_type in (TYPE_A, TYPE_PTR) and legacy != current:
+            raise SystemExit(f"[EROARE] {label}: parserele nu sunt de acord: {legacy} != {current}")
+        legacy_rate, current_rate, ttl_rate, full_rate = rates([
+            lambda: legacy_parse_dns_response(data, query_type),
+            lambda: parse_dns_response(data, query_type),
+            lambda: parse_dns_response_ttl(data, query_type),
+            lambda: parse_message(data)], count)
+        print(f"{label:<12} {len(data):>7} {legacy_rate:>12,.0f} {current_rate:>12,.0f} "
+              f"{current_rate / legacy_rate:>6.2f}x {ttl_rate:>12,.0f} {full_rate:>16,.0f} "
+              f"{full_rate / legacy_rate:>6.2f}x")
+    print("\ncu TTL și parse_message fac mai mult decât parserul vechi (TTL, SOA, toate numele), "
+          "iar pentru MX nou/s decodează înregistrări pe care parserul vechi le ignora.")
+
+
+if __name__ == "__main__":
+    main()
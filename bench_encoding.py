@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: codificarea JSON față de codificarea binară compactă
+din chat_protocol, pentru câteva mesaje tipice ale serverului de chat.
+
+Rulare: python3 bench_encoding.py [numar_repetari]
+"""
+
+import sys
+import time
+
+from chat_protocol import BINARY, JSON, decode_payload, encode_payload
+
+SAMPLES = [
+    ('message', {'from': 'alexandru', 'message': 'Salut tuturor! Ce mai faceți?',
+                 'type': 'broadcast', 'seq': 123456}),
+    ('private', {'to': 'maria', 'message': 'Ne vedem la 5?'}),
+    ('registered', {'nickname': 'alexandru', 'ip': '127.0.0.1', 'port': 54321, 'encoding': 'binary'}),
+    ('user_list', {'users': [f'utilizator{i}' for i in range(1000)]}),
+]
+
+
+def rate(func, repeat):
+    """Operații pe secundă pentru func()."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return repeat / (time.perf_counter() - start)
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+
+    print(f"{'mesaj':<12} {'codificare':<10} {'octeți':>8} {'encode/s':>12} {'decode/s':>12}")
+    for msg_type, data in SAMPLES:
+        # Listele mari sunt mai lente; păstrăm durata totală rezonabilă
+        count = repeat if msg_type != 'user_list' else max(1, repeat // 200)
+        for encoding in (JSON, BINARY):
+            payload = encode_payload(msg_type, data, encoding)
+            encode_rate = rate(lambda: encode_payload(msg_type, data, encoding), count)
+            decode_rate = rate(lambda: decode_payload(payload), count)
+            print(f"{msg_type:<12} {encoding:<10} {len(payload):>8} {encode_rate:>12,.0f} {decode_rate:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
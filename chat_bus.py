@@ -0,0 +1,258 @@
+"""
+Magistrala locală pub/sub dintre procesele worker ale serverului de chat.
+
+Procesul principal rulează hub-ul pe un socket Unix; fiecare worker se
+conectează la el și schimbă mesaje încadrate ca în chat_protocol:
+
+  worker -> hub: hello, claim, release, broadcast, private,
+                 room_subscribe, room_unsubscribe, room
+  hub -> worker: snapshot, claim_result, user_joined, user_left,
+                 broadcast, private, room
+
+Hub-ul este singura sursă de adevăr pentru unicitatea nickname-urilor;
+workerii țin o copie a utilizatorilor conectați la ceilalți workeri,
+actualizată prin user_joined/user_left. Pentru camere, hub-ul știe doar
+ce workeri au cel puțin un membru local și le trimite numai lor mesajele.
+"""
+
+import asyncio
+import os
+import socket
+
+from chat_log import log
+from chat_protocol import FRAMED, FrameDecoder, encode_message
+
+
+def listen_hub(path):
+    """Creează socket-ul Unix al hub-ului înainte de pornirea workerilor."""
+    if os.path.exists(path):
+        os.unlink(path)
+    hub_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    hub_socket.bind(path)
+    hub_socket.listen()
+    return hub_socket
+
+
+class BusHub:
+    """Starea hub-ului: workerii conectați și cine deține fiecare nickname."""
+
+    def __init__(self):
+        self.workers = {}       # worker_id -> transport
+        self.owners = {}        # nickname -> worker_id
+        self.room_workers = {}  # room -> {worker_id} care au membri locali
+
+    def send(self, worker_id, msg_type, data):
+        transport = self.workers.get(worker_id)
+        if transport is not None:
+            transport.write(encode_message(msg_type, data))
+
+    def publish(self, msg_type, data, exclude_worker=None):
+        """Trimite același cadru tuturor workerilor, mai puțin expeditorului."""
+        frame = encode_message(msg_type, data)
+        for worker_id, transport in self.workers.items():
+            if worker_id != exclude_worker:
+                transport.write(frame)
+
+    def publish_room(self, room, msg_type, data, exclude_worker=None):
+        """Trimite cadrul doar workerilor care au membri în cameră."""
+        frame = encode_message(msg_type, data)
+        for worker_id in self.room_workers.get(room, ()):
+            transport = self.workers.get(worker_id)
+            if worker_id != exclude_worker and transport is not None:
+                transport.write(frame)
+
+    def handle(self, worker_id, msg):
+        msg_type = msg['type']
+        data = msg['data']
+
+        if msg_type == 'claim':
+            nickname = data['nickname']
+            ok = nickname not in self.owners
+            if ok:
+                self.owners[nickname] = worker_id
+                self.publish('user_joined', {'nickname': nickname, 'worker': worker_id},
+                             exclude_worker=worker_id)
+            self.send(worker_id, 'claim_result', {'request': data['request'], 'ok': ok})
+
+        elif msg_type == 'release':
+            nickname = data['nickname']
+            if self.owners.get(nickname) == worker_id:
+                del self.owners[nickname]
+                self.publish('user_left', {'nickname': nickname}, exclude_worker=worker_id)
+
+        elif msg_type == 'broadcast':
+            self.publish('broadcast', data, exclude_worker=worker_id)
+
+        elif msg_type == 'private':
+            owner = self.owners.get(data['to'])
+            if owner is not None:
+                self.send(owner, 'private', data)
+
+        elif msg_type == 'room_subscribe':
+            self.room_workers.setdefault(data['room'], set()).add(worker_id)
+
+        elif msg_type == 'room_unsubscribe':
+            self.unsubscribe(data['room'], worker_id)
+
+        elif msg_type == 'room':
+            self.publish_room(data['room'], 'room', data, exclude_worker=worker_id)
+
+    def unsubscribe(self, room, worker_id):
+        workers = self.room_workers.get(room)
+        if workers is not None:
+            workers.discard(worker_id)
+            if not workers:
+                del self.room_workers[room]
+
+    def drop_worker(self, worker_id):
+        """Un worker a căzut: utilizatorii lui dispar din tot clusterul."""
+        self.workers.pop(worker_id, None)
+        for room in [r for r, workers in self.room_workers.items() if worker_id in workers]:
+            self.unsubscribe(room, worker_id)
+        for nickname in [n for n, owner in self.owners.items() if owner == worker_id]:
+            del self.owners[nickname]
+            self.publish('user_left', {'nickname': nickname})
+
+
+class HubConnection(asyncio.Protocol):
+    """Conexiunea hub-ului cu un singur worker."""
+
+    def __init__(self, hub):
+        self.hub = hub
+        self.worker_id = None
+        self.decoder = FrameDecoder(mode=FRAMED)
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def data_received(self, data):
+        for msg in self.decoder.feed(data):
+            if self.worker_id is None:
+                if msg['type'] != 'hello':
+                    self.transport.close()
+                    return
+                self.worker_id = msg['data']['worker']
+                self.hub.workers[self.worker_id] = self.transport
+                users = {nickname: owner for nickname, owner in self.hub.owners.items()}
+                self.transport.write(encode_message('snapshot', {'users': users}))
+            else:
+                self.hub.handle(self.worker_id, msg)
+
+    def connection_lost(self, exc):
+        if self.worker_id is not None:
+            log.warning('bus', 'Worker-ul {worker} s-a deconectat.', worker=self.worker_id)
+            self.hub.drop_worker(self.worker_id)
+
+
+async def serve_hub(hub_socket):
+    """Rulează hub-ul pe socket-ul creat de listen_hub() până la anulare."""
+    loop = asyncio.get_running_loop()
+    hub = BusHub()
+    server = await loop.create_unix_server(lambda: HubConnection(hub), sock=hub_socket)
+    async with server:
+        await server.serve_forever()
+
+
+class BusClient(asyncio.Protocol):
+    """
+    Capătul din worker al magistralei.
+    on_broadcast(msg_type, data, exclude_nickname), on_private(target, msg_type, data)
+    și on_room(room, msg_type, data) livrează mesajele venite de la ceilalți
+    workeri clienților locali; on_presence(nickname, joined) anunță intrările
+    și ieșirile utilizatorilor de pe ceilalți workeri.
+    """
+
+    def __init__(self, worker_id, on_broadcast, on_private, on_room, on_presence=None):
+        self.worker_id = worker_id
+        self.on_broadcast = on_broadcast
+        self.on_private = on_private
+        self.on_room = on_room
+        self.on_presence = on_presence
+        self.decoder = FrameDecoder(mode=FRAMED)
+        self.remote = {}            # nickname -> worker_id, pentru ceilalți workeri
+        self.pending_claims = {}    # request -> callback(ok)
+        self.next_request = 0
+        loop = asyncio.get_running_loop()
+        self.ready = loop.create_future()
+        self.closed = loop.create_future()
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.send('hello', {'worker': self.worker_id})
+
+    def send(self, msg_type, data):
+        self.transport.write(encode_message(msg_type, data))
+
+    def data_received(self, data):
+        for msg in self.decoder.feed(data):
+            msg_type = msg['type']
+            data = msg['data']
+
+            if msg_type == 'snapshot':
+                self.remote = {nickname: owner for nickname, owner in data['users'].items()
+                               if owner != self.worker_id}
+                if not self.ready.done():
+                    self.ready.set_result(True)
+
+            elif msg_type == 'claim_result':
+                callback = self.pending_claims.pop(data['request'], None)
+                if callback is not None:
+                    callback(data['ok'])
+
+            elif msg_type == 'user_joined':
+                self.remote[data['nickname']] = data['worker']
+                if self.on_presence is not None:
+                    self.on_presence(data['nickname'], True)
+
+            elif msg_type == 'user_left':
+                self.remote.pop(data['nickname'], None)
+                if self.on_presence is not None:
+                    self.on_presence(data['nickname'], False)
+
+            elif msg_type == 'broadcast':
+                self.on_broadcast(data['msg_type'], data['data'], data['exclude'])
+
+            elif msg_type == 'private':
+                self.on_private(data['to'], data['msg_type'], data['data'])
+
+            elif msg_type == 'room':
+                self.on_room(data['room'], data['msg_type'], data['data'])
+
+    def connection_lost(self, exc):
+        log.warning('bus', 'Conexiunea cu procesul principal s-a pierdut.')
+        for callback in self.pending_claims.values():
+            callback(False)
+        self.pending_claims.clear()
+        if not self.closed.done():
+            self.closed.set_result(True)
+
+    def claim(self, nickname, callback):
+        """Rezervă nickname-ul în tot clusterul; callback(ok) primește rezultatul."""
+        self.next_request += 1
+        self.pending_claims[self.next_request] = callback
+        self.send('claim', {'nickname': nickname, 'request': self.next_request})
+
+    def release(self, nickname):
+        self.send('release', {'nickname': nickname})
+
+    def publish_broadcast(self, msg_type, data, exclude_nickname=None):
+        self.send('broadcast', {'msg_type': msg_type, 'data': data, 'exclude': exclude_nickname})
+
+    def send_private(self, target, msg_type, data):
+        self.send('private', {'to': target, 'msg_type': msg_type, 'data': data})
+
+    def subscribe_room(self, room):
+        """Primul membru local al camerei: hub-ul începe să ne trimită mesajele ei."""
+        self.send('room_subscribe', {'room': room})
+
+    def unsubscribe_room(self, room):
+        self.send('room_unsubscribe', {'room': room})
+
+    def publish_room(self, room, msg_type, data):
+        self.send('room', {'room': room, 'msg_type': msg_type, 'data': data})
+
+    def has_user(self, nickname):
+        return nickname in self.remote
+
+    def remote_users(self):
+        return list(self.remote)
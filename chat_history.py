@@ -0,0 +1,84 @@
+"""
+Istoricul recent al serverului de chat (mesaje generale și din camere).
+
+Mesajele se păstrează deja codificate (cadre framed, în JSON și în
+codificarea binară), fiecare cu un număr de secvență crescător, deci
+reluarea lor la conectare nu mai serializează nimic. Memoria ocupată
+este limitată de un buget în octeți: când bugetul este depășit se
+elimină cele mai vechi mesaje, indiferent de cameră.
+"""
+
+import collections
+import sys
+import threading
+
+from chat_protocol import ENCODINGS, encode_message
+
+# Costul aproximativ al unei intrări, pe lângă octeții cadrului
+ENTRY_OVERHEAD = 64
+
+
+def entry_size(frames):
+    return sum(sys.getsizeof(frame) for frame in frames.values()) + ENTRY_OVERHEAD
+
+
+class MessageHistory:
+    """Buffer circular per scop (None = general, altfel numele camerei)."""
+
+    def __init__(self, byte_budget=1024 * 1024):
+        self.byte_budget = byte_budget
+        self.seq = 0
+        self.used_bytes = 0
+        self.scopes = {}                    # scope -> deque[(seq, {encoding: frame})]
+        self.order = collections.deque()    # scope-ul fiecărei intrări, în ordinea sosirii
+        self.lock = threading.Lock()
+
+    def record(self, scope, msg_type, data):
+        """
+        Adaugă mesajul cu următorul număr de secvență (în data['seq']).
+        Returnează {codificare: cadru framed}, gata de trimis tuturor destinatarilor.
+        """
+        with self.lock:
+            self.seq += 1
+            stamped = dict(data, seq=self.seq)
+            frames = {encoding: encode_message(msg_type, stamped, encoding=encoding)
+                      for encoding in ENCODINGS}
+            size = entry_size(frames)
+
+            if size <= self.byte_budget:
+                self.scopes.setdefault(scope, collections.deque()).append((self.seq, frames))
+                self.order.append(scope)
+                self.used_bytes += size
+                self._evict()
+            return frames
+
+    def _evict(self):
+        while self.used_bytes > self.byte_budget and self.order:
+            scope = self.order.popleft()
+            entries = self.scopes[scope]
+            _, frames = entries.popleft()
+            self.used_bytes -= entry_size(frames)
+            if not entries:
+                del self.scopes[scope]
+
+    def replay(self, scope, encoding, last=None, since=None):
+        """
+        Returnează (cadre, ultima secvență) pentru ultimele `last` mesaje sau
+        pentru cele cu secvența mai mare decât `since`, în ordine cronologică.
+        """
+        frames = []
+        with self.lock:
+            for seq, encoded in reversed(self.scopes.get(scope, ())):
+                if since is not None and seq <= since:
+                    break
+                if last is not None and len(frames) >= last:
+                    break
+                frames.append(encoded[encoding])
+            last_seq = self.seq
+        frames.reverse()
+        return frames, last_seq
+
+    def stats(self):
+        with self.lock:
+            return {'messages': len(self.order), 'bytes': self.used_bytes,
+                    'byte_budget': self.byte_budget, 'seq': self.seq}
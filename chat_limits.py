@@ -0,0 +1,163 @@
+"""
+Limitele serverului de chat: rate limiting cu token bucket și admiterea
+conexiunilor.
+
+Fiecare tip de mesaj are o regulă (rată pe secundă, rafală maximă),
+separat pentru nickname și pentru adresa IP; '*' se aplică tipurilor
+fără regulă proprie. Găleata unei chei se creează la primul mesaj și
+dispare la prune() după ce s-a umplut la loc, deci memoria urmărește
+doar clienții activi.
+
+Regulile vin din configurație (fișier JSON sau linia de comandă), de forma:
+
+  {"nickname": {"broadcast": [10, 50]}, "ip": {"*": [200, 400]},
+   "max_connections": 0, "max_connections_per_ip": 0, "max_pending_registrations": 1024}
+
+O rată 0 scoate limita tipului respectiv; un maxim 0 înseamnă nelimitat.
+"""
+
+import json
+import threading
+
+SCOPES = ('nickname', 'ip')
+CONNECTION_LIMITS = ('max_connections', 'max_connections_per_ip', 'max_pending_registrations')
+
+
+class TokenBucket:
+    """`burst` jetoane, reîncărcate cu `rate` pe secundă; un mesaj consumă un jeton."""
+
+    __slots__ = ('rate', 'burst', 'tokens', 'stamp')
+
+    def __init__(self, rate, burst, now):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.stamp = now
+
+    def take(self, now):
+        tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+        if tokens < 1:
+            self.tokens = tokens
+            return False
+        self.tokens = tokens - 1
+        return True
+
+    def full(self, now):
+        return self.tokens + (now - self.stamp) * self.rate >= self.burst
+
+
+class RateLimiter:
+    """Câte o găleată pentru fiecare (cheie, tip de mesaj) cu regulă."""
+
+    def __init__(self, rules=None):
+        self.rules = {}         # tip -> (rată, rafală)
+        self.buckets = {}       # (cheie, tip) -> TokenBucket
+        self.lock = threading.Lock()
+        for msg_type, (rate, burst) in (rules or {}).items():
+            self.set_rule(msg_type, rate, burst)
+
+    def set_rule(self, msg_type, rate, burst=None):
+        """Setează limita tipului; rate 0 o scoate. Rafala implicită este o secundă de trafic."""
+        with self.lock:
+            if not rate:
+                self.rules.pop(msg_type, None)
+            else:
+                self.rules[msg_type] = (float(rate), float(burst or max(1, rate)))
+            # Gălețile existente se recreează cu noua regulă
+            self.buckets = {key: bucket for key, bucket in self.buckets.items() if key[1] != msg_type}
+
+    def allow(self, key, msg_type, now):
+        """Returnează False dacă cheia și-a depășit limita pentru tipul de mesaj."""
+        rule = self.rules.get(msg_type) or self.rules.get('*')
+        if rule is None:
+            return True
+        with self.lock:
+            bucket = self.buckets.get((key, msg_type))
+            if bucket is None:
+                bucket = self.buckets[(key, msg_type)] = TokenBucket(rule[0], rule[1], now)
+            return bucket.take(now)
+
+    def prune(self, now):
+        """Uită gălețile pline (echivalente cu una nouă); returnează câte au rămas."""
+        with self.lock:
+            self.buckets = {key: bucket for key, bucket in self.buckets.items() if not bucket.full(now)}
+            return len(self.buckets)
+
+
+class Admission:
+    """
+    Numărul de conexiuni deschise (total și per IP) și al celor încă
+    neînregistrate, verificat la accept() înainte de orice altă muncă.
+    """
+
+    def __init__(self, max_connections=0, max_connections_per_ip=0, max_pending_registrations=0):
+        self.max_connections = max_connections
+        self.max_connections_per_ip = max_connections_per_ip
+        self.max_pending_registrations = max_pending_registrations
+        self.connections = 0
+        self.pending = 0
+        self.per_ip = {}
+        self.lock = threading.Lock()
+
+    def admit(self, ip):
+        """Înregistrează conexiunea nouă; returnează motivul refuzului sau None."""
+        with self.lock:
+            if self.max_connections and self.connections >= self.max_connections:
+                return 'max_connections'
+            if self.max_pending_registrations and self.pending >= self.max_pending_registrations:
+                return 'max_pending_registrations'
+            count = self.per_ip.get(ip, 0)
+            if self.max_connections_per_ip and count >= self.max_connections_per_ip:
+                return 'max_connections_per_ip'
+            self.connections += 1
+            self.pending += 1
+            self.per_ip[ip] = count + 1
+            return None
+
+    def registered(self):
+        """Conexiunea admisă s-a înregistrat (sau și-a reluat sesiunea)."""
+        with self.lock:
+            self.pending -= 1
+
+    def release(self, ip, pending):
+        """Conexiunea admisă s-a închis; `pending` = încă neînregistrată."""
+        with self.lock:
+            self.connections -= 1
+            if pending:
+                self.pending -= 1
+            count = self.per_ip.pop(ip, 1) - 1
+            if count:
+                self.per_ip[ip] = count
+
+
+def parse_rule(text):
+    """
+    Citește o regulă din linia de comandă: 'SCOPE:TIP=RATĂ[/RAFALĂ]',
+    de exemplu 'nickname:broadcast=5/20' sau 'ip:*=100'.
+    Returnează (scope, tip, rată, rafală).
+    """
+    try:
+        target, value = text.split('=', 1)
+        scope, msg_type = target.split(':', 1)
+        rate, _, burst = value.partition('/')
+        rate, burst = float(rate), float(burst) if burst else None
+    except ValueError:
+        raise ValueError(f"Regulă invalidă: {text!r} (se așteaptă SCOPE:TIP=RATĂ[/RAFALĂ])")
+    if scope not in SCOPES:
+        raise ValueError(f"Scope necunoscut: {scope!r} (nickname sau ip)")
+    return scope, msg_type, rate, burst
+
+
+def load_limits(path):
+    """Citește fișierul JSON cu limite și îl validează."""
+    with open(path, encoding='utf-8') as f:
+        limits = json.load(f)
+    for key in limits:
+        if key not in SCOPES and key not in CONNECTION_LIMITS:
+            raise ValueError(f"Cheie necunoscută în {path}: {key!r}")
+    for scope in SCOPES:
+        for msg_type, rule in limits.get(scope, {}).items():
+            if not isinstance(rule, (list, tuple)) or not 1 <= len(rule) <= 2:
+                raise ValueError(f"Regula {scope}.{msg_type} trebuie să fie [rată] sau [rată, rafală]")
+    return limits
@@ -0,0 +1,154 @@
+"""
+Jurnalul structurat al serverului de chat.
+
+Firele care tratează clienții doar adaugă înregistrarea (un tuplu) într-o
+coadă limitată; formatarea și scrierea pe stdout se fac într-un thread
+separat, care golește coada periodic. Dacă ieșirea nu ține pasul, coada
+se umple și înregistrările noi se pierd (și se numără), dar serverul nu
+așteaptă niciodată după terminal.
+
+Textul fiecărei înregistrări este un șablon completat cu câmpurile ei
+('{nickname} s-a conectat.'), tot în thread-ul de scriere. Evenimentele
+foarte dese (mesajele de chat) pot fi eșantionate: 1 din N, sau deloc.
+"""
+
+import atexit
+import collections
+import json
+import os
+import sys
+import threading
+import time
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+
+LEVELS = {'debug': DEBUG, 'info': INFO, 'warning': WARNING, 'error': ERROR}
+LEVEL_NAMES = {value: name.upper() for name, value in LEVELS.items()}
+
+# Cât de des golește thread-ul de scriere coada (secunde)
+FLUSH_INTERVAL = 0.05
+
+
+class StructuredLogger:
+    """Jurnal cu niveluri, eșantionare și ieșire text sau JSON."""
+
+    def __init__(self, level=INFO, json_output=False, queue_size=10000, stream=None):
+        self.level = level
+        self.json_output = json_output
+        self.queue_size = queue_size
+        self.stream = stream                    # None = sys.stdout la momentul scrierii
+        self.sample_rates = {}                  # eveniment -> 1 din N (0 = oprit)
+        self.sample_counts = collections.Counter()
+        self.dropped = 0
+        self.written = 0
+        self._reset()
+        if hasattr(os, 'register_at_fork'):
+            # Thread-ul de scriere nu supraviețuiește unui fork
+            os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self.records = collections.deque()
+        self.closing = threading.Event()
+        self.start_lock = threading.Lock()
+        self.writer = None
+
+    def configure(self, level=None, json_output=None, queue_size=None):
+        if level is not None:
+            self.level = level
+        if json_output is not None:
+            self.json_output = json_output
+        if queue_size is not None:
+            self.queue_size = queue_size
+
+    def sample(self, event, every):
+        """Păstrează doar una din `every` înregistrări ale evenimentului (0 = niciuna)."""
+        self.sample_rates[event] = every
+
+    def log(self, level, event, text, **fields):
+        if level < self.level:
+            return
+        every = self.sample_rates.get(event)
+        if every is not None:
+            if not every:
+                return
+            self.sample_counts[event] += 1
+            if self.sample_counts[event] % every:
+                return
+        if len(self.records) >= self.queue_size:
+            self.dropped += 1
+            return
+
+        self.records.append((time.time(), level, event, text, fields))
+        if self.writer is None:
+            self._start()
+
+    def debug(self, event, text, **fields):
+        self.log(DEBUG, event, text, **fields)
+
+    def info(self, event, text, **fields):
+        self.log(INFO, event, text, **fields)
+
+    def warning(self, event, text, **fields):
+        self.log(WARNING, event, text, **fields)
+
+    def error(self, event, text, **fields):
+        self.log(ERROR, event, text, **fields)
+
+    def _start(self):
+        with self.start_lock:
+            if self.writer is None:
+                writer = threading.Thread(target=self._run, name='chat-log', daemon=True)
+                writer.start()
+                self.writer = writer
+
+    def _run(self):
+        while True:
+            closing = self.closing.wait(FLUSH_INTERVAL)
+            self.flush()
+            if closing:
+                return
+
+    def flush(self):
+        """Scrie tot ce se află în coadă."""
+        lines = []
+        while self.records:
+            try:
+                lines.append(self.format(self.records.popleft()))
+            except IndexError:
+                break
+        if not lines:
+            return
+        stream = self.stream or sys.stdout
+        try:
+            stream.write('\n'.join(lines) + '\n')
+            stream.flush()
+        except (OSError, ValueError):
+            pass
+        self.written += len(lines)
+
+    def format(self, record):
+        timestamp, level, event, text, fields = record
+        try:
+            message = text.format(**fields)
+        except (KeyError, IndexError, ValueError):
+            message = f'{text} {fields}'
+
+        if self.json_output:
+            return json.dumps(dict({'ts': round(timestamp, 3), 'level': LEVEL_NAMES[level], 'event': event,
+                                    'msg': message}, **fields), ensure_ascii=False, default=str)
+        clock = time.strftime('%H:%M:%S', time.localtime(timestamp))
+        return f"{clock}.{int(timestamp * 1000) % 1000:03d} {LEVEL_NAMES[level]:<7} [{event}] {message}"
+
+    def close(self):
+        """Golește coada și oprește thread-ul de scriere."""
+        self.closing.set()
+        if self.writer is not None:
+            self.writer.join(timeout=2)
+        self.flush()
+
+
+log = StructuredLogger()
+atexit.register(log.close)
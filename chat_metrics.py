@@ -0,0 +1,219 @@
+"""
+Metricile serverului de chat: contoare, histograme, indicatori (gauges)
+și timpul de așteptare la lock-urile importante.
+
+Colectarea este gândită să rămână pornită permanent: un contor sau o
+histogramă costă o achiziție de lock necontestat și câteva operații pe
+întregi (histogramele au bucket-uri logaritmice calculate cu bit_length),
+iar indicatorii sunt funcții evaluate doar când cineva cere statisticile.
+
+Numele pot conține etichete în stilul Prometheus, de exemplu
+'messages_in{type="broadcast"}'; render_text() le scrie neschimbate.
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Fiecare putere a lui 2 este împărțită în 4 bucket-uri (eroare relativă < 25%)
+SUB_BUCKET_BITS = 2
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+BUCKET_COUNT = 64 * SUB_BUCKETS
+
+QUANTILES = ((0.5, 'p50'), (0.9, 'p90'), (0.99, 'p99'), (0.999, 'p999'))
+
+
+def bucket_index(value):
+    bits = value.bit_length()
+    if bits <= SUB_BUCKET_BITS:
+        return value
+    shift = bits - SUB_BUCKET_BITS - 1
+    return (shift + 1) * SUB_BUCKETS + ((value >> shift) & (SUB_BUCKETS - 1))
+
+
+def bucket_upper_bound(index):
+    """Cea mai mare valoare care cade în bucket-ul dat."""
+    if index < SUB_BUCKETS:
+        return index
+    shift = index // SUB_BUCKETS - 1
+    lower = (SUB_BUCKETS + index % SUB_BUCKETS) << shift
+    return lower + (1 << shift) - 1
+
+
+class Histogram:
+    """Distribuția unor valori întregi nenegative (de obicei nanosecunde)."""
+
+    def __init__(self):
+        self.buckets = [0] * BUCKET_COUNT
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def observe(self, value):
+        value = max(0, int(value))
+        self.buckets[bucket_index(value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q):
+        """Limita superioară a bucket-ului în care se află cuantila q."""
+        if not self.count:
+            return 0
+        rank = max(1, round(self.count * q))
+        seen = 0
+        for index, bucket in enumerate(self.buckets):
+            seen += bucket
+            if seen >= rank:
+                return min(bucket_upper_bound(index), self.max)
+        return self.max
+
+    def summary(self):
+        result = {'count': self.count, 'sum': self.total, 'max': self.max,
+                  'mean': self.total // self.count if self.count else 0}
+        for q, key in QUANTILES:
+            result[key] = self.quantile(q)
+        return result
+
+
+class TimedLock:
+    """
+    threading.Lock care măsoară cât se așteaptă la el. Achiziția fără
+    concurență costă o singură încercare neblocantă în plus; contoarele se
+    actualizează cât timp lock-ul este deținut, deci nu au nevoie de alt lock.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.acquires = 0
+        self.contended = 0
+        self.wait_ns = Histogram()
+
+    def acquire(self, blocking=True, timeout=-1):
+        if not self._lock.acquire(False):
+            if not blocking:
+                return False
+            start = time.perf_counter_ns()
+            if not self._lock.acquire(True, timeout):
+                return False
+            self.contended += 1
+            self.wait_ns.observe(time.perf_counter_ns() - start)
+        self.acquires += 1
+        return True
+
+    def release(self):
+        self._lock.release()
+
+    def locked(self):
+        return self._lock.locked()
+
+    __enter__ = acquire
+
+    def __exit__(self, *exc_info):
+        self._lock.release()
+
+    def summary(self):
+        return {'acquires': self.acquires, 'contended': self.contended, 'wait_ns': self.wait_ns.summary()}
+
+
+class MetricsRegistry:
+    """Registrul metricilor unui proces."""
+
+    def __init__(self, counters=()):
+        self.lock = threading.Lock()
+        self.counters = dict.fromkeys(counters, 0)
+        self.histograms = {}
+        self.gauges = {}        # nume -> funcție fără argumente
+        self.locks = {}         # nume -> TimedLock
+        self.started = time.time()
+
+    def inc(self, name, amount=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def observe(self, name, value):
+        with self.lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.observe(value)
+
+    def gauge(self, name, func):
+        """Înregistrează un indicator calculat de func() la fiecare citire."""
+        self.gauges[name] = func
+
+    def timed_lock(self, name):
+        """Creează un TimedLock raportat în statistici sub numele dat."""
+        lock = self.locks[name] = TimedLock()
+        return lock
+
+    def snapshot(self):
+        """Toate metricile, ca dicționar serializabil în JSON."""
+        # Indicatorii pot lua alte lock-uri, deci se evaluează în afara self.lock
+        gauges = {name: func() for name, func in self.gauges.items()}
+        with self.lock:
+            counters = dict(self.counters)
+            histograms = {name: h.summary() for name, h in self.histograms.items()}
+        return {
+            'uptime_s': round(time.time() - self.started, 3),
+            'counters': counters,
+            'gauges': gauges,
+            'histograms': histograms,
+            'locks': {name: lock.summary() for name, lock in self.locks.items()},
+        }
+
+    def render_text(self, prefix='chat_'):
+        """Metricile în formatul text folosit de Prometheus."""
+        snapshot = self.snapshot()
+        lines = [f'{prefix}uptime_seconds {snapshot["uptime_s"]}']
+        for name, value in sorted(snapshot['counters'].items()):
+            lines.append(f'{prefix}{name} {value}')
+        for name, value in sorted(snapshot['gauges'].items()):
+            lines.append(f'{prefix}{name} {value}')
+
+        histograms = dict(snapshot['histograms'])
+        for name, lock in snapshot['locks'].items():
+            lines.append(f'{prefix}{name}_acquires {lock["acquires"]}')
+            lines.append(f'{prefix}{name}_contended {lock["contended"]}')
+            histograms[f'{name}_wait_ns'] = lock['wait_ns']
+        for name, summary in sorted(histograms.items()):
+            for q, key in QUANTILES:
+                lines.append(f'{prefix}{name}{{quantile="{q}"}} {summary[key]}')
+            lines.append(f'{prefix}{name}_sum {summary["sum"]}')
+            lines.append(f'{prefix}{name}_count {summary["count"]}')
+        return '\n'.join(lines) + '\n'
+
+
+def serve_http(registry, host, port):
+    """
+    Pornește, într-un thread separat, un endpoint HTTP local:
+    /metrics (text) și /stats (JSON). Returnează serverul HTTP.
+    """
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == '/metrics':
+                body = registry.render_text().encode()
+                content_type = 'text/plain; version=0.0.4; charset=utf-8'
+            elif self.path == '/stats':
+                body = json.dumps(registry.snapshot()).encode()
+                content_type = 'application/json'
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    http_server = ThreadingHTTPServer((host, port), MetricsHandler)
+    http_server.daemon_threads = True
+    thread = threading.Thread(target=http_server.serve_forever, daemon=True)
+    thread.start()
+    return http_server
@@ -0,0 +1,82 @@
+"""
+Prezența utilizatorilor în serverul de chat, versionată.
+
+Fiecare intrare sau ieșire din chat crește versiunea și se păstrează în
+ultimele modificări (un număr limitat). Un client care ține rosterul
+local cere doar modificările de după versiunea lui; dacă acestea nu mai
+sunt păstrate, sau sunt mai multe decât utilizatorii, primește tot
+rosterul. Epoca identifică instanța (procesul): versiunile din epoci
+diferite nu se compară.
+"""
+
+import collections
+import secrets
+import threading
+
+
+class Presence:
+    """Utilizatorii conectați, versiunea curentă și ultimele modificări."""
+
+    def __init__(self, max_changes=4096):
+        self.epoch = secrets.token_hex(4)
+        self.version = 0
+        self.users = {}                         # nickname -> None (set ordonat)
+        self.changes = collections.deque()      # (versiune, nickname, a intrat)
+        self.max_changes = max_changes
+        self.lock = threading.Lock()
+
+    def join(self, nickname):
+        return self._change(nickname, True)
+
+    def leave(self, nickname):
+        return self._change(nickname, False)
+
+    def _change(self, nickname, joined):
+        """Aplică modificarea; returnează noua versiune sau None dacă nu s-a schimbat nimic."""
+        with self.lock:
+            if (nickname in self.users) == joined:
+                return None
+            if joined:
+                self.users[nickname] = None
+            else:
+                del self.users[nickname]
+            self.version += 1
+            self.changes.append((self.version, nickname, joined))
+            while len(self.changes) > self.max_changes:
+                self.changes.popleft()
+            return self.version
+
+    def snapshot(self):
+        with self.lock:
+            return self._snapshot()
+
+    def _snapshot(self):
+        return {'epoch': self.epoch, 'version': self.version, 'users': list(self.users)}
+
+    def since(self, version, epoch):
+        """
+        Modificările de după `version`, compactate (doar starea finală a
+        fiecărui nickname): {'epoch', 'version', 'joined', 'left'}. Dacă nu se
+        pot calcula sau ar fi mai mari decât rosterul, returnează snapshot-ul.
+        """
+        with self.lock:
+            oldest = self.changes[0][0] if self.changes else self.version + 1
+            if (epoch != self.epoch or not isinstance(version, int)
+                    or version > self.version or version + 1 < oldest):
+                return self._snapshot()
+
+            final = {}
+            for change_version, nickname, joined in reversed(self.changes):
+                if change_version <= version:
+                    break
+                final.setdefault(nickname, joined)
+            if len(final) > len(self.users):
+                return self._snapshot()
+            changes = list(final.items())[::-1]     # în ordinea în care s-au petrecut
+            return {'epoch': self.epoch, 'version': self.version,
+                    'joined': [nickname for nickname, joined in changes if joined],
+                    'left': [nickname for nickname, joined in changes if not joined]}
+
+    def stats(self):
+        with self.lock:
+            return {'users': len(self.users), 'version': self.version, 'changes': len(self.changes)}
@@ -0,0 +1,421 @@
+"""
+Protocolul aplicației de chat: încadrarea mesajelor pe fluxul TCP.
+
+Format nou (framed): fiecare mesaj JSON este precedat de lungimea sa
+pe 4 octeți (big-endian), deci oricâte mesaje pot sosi într-un singur
+recv() sau un mesaj poate fi împărțit în mai multe recv().
+
+Format vechi (legacy): obiecte JSON trimise unul după altul, fără
+delimitator. Serverul îl recunoaște după primul octet ('{'), deoarece
+un mesaj framed începe mereu cu octetul cel mai semnificativ al lungimii,
+care este 0 sau 1 pentru limita MAX_FRAME_SIZE.
+
+Conținutul unui cadru framed poate fi JSON (implicit) sau codificarea
+binară compactă, negociată la register cu {"encoding": "binary"}.
+Decodorul le deosebește după primul octet: JSON începe cu '{', iar un
+mesaj binar cu codul tipului (< 0x7B). Mesajele binare au forma:
+
+  cod tip (u8) | câmpuri prezente (u16, bitmap) | câmpuri, în ordinea schemei
+
+Șirurile sunt UTF-8 precedate de lungime (u16 sau u32), numerele au
+lățime fixă. Un mesaj fără schemă, sau cu câmpuri necunoscute schemei,
+se trimite ca JSON și clientului binar.
+
+Cererile clientului pot avea în data un câmp "id" (întreg pe 32 de biți);
+serverul îl repetă în răspunsul direct la cerere (registered, user_list,
+info, joined, left, error etc.), ca răspunsurile să poată fi asociate
+cererilor fără să se aștepte un timp fix.
+
+Compresia (negociată la register cu {"compression": "zlib"}) marchează
+cadrele comprimate cu bitul cel mai semnificativ al lungimii. Fiecare
+sens al conexiunii are un singur context zlib, golit cu Z_SYNC_FLUSH
+după fiecare mesaj, deci nickname-urile și cheile repetate în mesaje
+diferite se comprimă tot mai bine.
+
+Sesiunile (register cu {"resumable": true}, doar framed): registered
+conține tokenul sesiunii. Clientul numără cadrele primite, în afară de
+'resumed'; după o reconectare trimite ca prim mesaj
+{"type": "resume", "data": {"session": token, "last": N}} și primește
+'resumed', urmat de cadrele de după al N-lea. 'logout' închide sesiunea.
+
+Prezența (register cu {"presence": true}): clientul primește rosterul
+('presence' cu users, epoch și version), apoi, în locul notificărilor
+text de intrare/ieșire, delte 'presence' {version, joined | left}.
+list_users cu {"since": V, "epoch": E} răspunde cu modificările de după
+versiunea V ('presence' cu joined și left) sau, dacă sunt prea vechi, cu
+tot rosterul.
+
+Heartbeat: după o perioadă fără niciun mesaj de la client serverul
+trimite 'ping', iar clientul răspunde cu 'pong' (și invers, serverul
+răspunde la 'ping' cu 'pong'). O conexiune tăcută prea mult este închisă.
+
+Mesajele private către un utilizator deconectat (doar cu spool pe server)
+sunt confirmate cu tipul 'private_queued' în loc de 'private_sent' și îi
+sunt livrate destinatarului după 'registered', în ordine, cu câmpul "sent"
+(momentul trimiterii, în secunde Unix).
+"""
+
+import json
+import struct
+import time
+import zlib
+
+FRAMED = 'framed'
+LEGACY = 'legacy'
+
+JSON = 'json'
+BINARY = 'binary'
+ENCODINGS = (JSON, BINARY)
+
+ZLIB = 'zlib'
+
+HEADER = struct.Struct('>I')
+MAX_FRAME_SIZE = 16 * 1024 * 1024
+COMPRESSED_FLAG = 0x80000000
+COMPRESS_THRESHOLD = 512
+
+# Layout-uri precompilate pentru codificarea binară
+BINARY_HEAD = struct.Struct('>BH')
+U16 = struct.Struct('>H')
+U32 = struct.Struct('>I')
+U64 = struct.Struct('>Q')
+LIST_HEAD = struct.Struct('>II')
+
+# Tipuri de câmpuri: S = șir scurt (u16), T = text (u32), H/I/Q = întregi
+# fără semn pe 16/32/64 biți, L = listă de șiruri (u32 număr, u32 lungime,
+# elementele unite prin NUL), J = JSON (u32)
+BINARY_SCHEMAS = {
+    # client -> server
+    'register': (1, (('nickname', 'S'), ('history', 'J'), ('encoding', 'S'), ('compression', 'S'),
+                     ('id', 'I'), ('resumable', 'J'), ('presence', 'J'))),
+    'broadcast': (2, (('message', 'T'),)),
+    'private': (3, (('to', 'S'), ('message', 'T'), ('id', 'I'))),
+    'list_users': (4, (('id', 'I'), ('since', 'Q'), ('epoch', 'S'))),
+    'my_info': (5, (('id', 'I'),)),
+    'join': (6, (('room', 'S'), ('history', 'J'), ('id', 'I'))),
+    'leave': (7, (('room', 'S'), ('id', 'I'))),
+    'room_message': (8, (('room', 'S'), ('message', 'T'), ('id', 'I'))),
+    'stats': (9, (('metrics', 'J'), ('id', 'I'))),     # cererea fără metrics, răspunsul cu metrics
+    'resume': (10, (('session', 'S'), ('last', 'Q'), ('compression', 'S'), ('id', 'I'))),
+    'logout': (11, (('id', 'I'),)),
+    # în ambele sensuri
+    'ping': (12, (('id', 'I'),)),
+    'pong': (13, (('id', 'I'),)),
+    # server -> client
+    'registered': (32, (('nickname', 'S'), ('ip', 'S'), ('port', 'H'), ('encoding', 'S'),
+                        ('compression', 'S'), ('id', 'I'), ('session', 'S'))),
+    'message': (33, (('from', 'S'), ('message', 'T'), ('type', 'S'), ('room', 'S'), ('seq', 'Q'),
+                     ('id', 'I'), ('sent', 'Q'))),
+    'notification': (34, (('message', 'T'), ('room', 'S'))),
+    'user_list': (35, (('users', 'L'), ('id', 'I'))),
+    'info': (36, (('nickname', 'S'), ('ip', 'S'), ('port', 'H'), ('id', 'I'))),
+    'error': (37, (('message', 'T'), ('id', 'I'))),
+    'joined': (38, (('room', 'S'), ('id', 'I'))),
+    'left': (39, (('room', 'S'), ('id', 'I'))),
+    'history_end': (40, (('room', 'S'), ('count', 'I'), ('seq', 'Q'))),
+    'resumed': (41, (('nickname', 'S'), ('seq', 'Q'), ('missed', 'I'), ('compression', 'S'), ('id', 'I'))),
+    'presence': (42, (('epoch', 'S'), ('version', 'Q'), ('users', 'L'), ('joined', 'L'), ('left', 'L'),
+                      ('id', 'I'))),
+}
+
+# cod -> (tip, câmpuri) și numele câmpurilor fiecărui tip, pentru verificări rapide
+BINARY_TYPES = {code: (msg_type, fields) for msg_type, (code, fields) in BINARY_SCHEMAS.items()}
+BINARY_FIELD_NAMES = {msg_type: frozenset(name for name, _ in fields)
+                      for msg_type, (_, fields) in BINARY_SCHEMAS.items()}
+
+
+class FrameError(ValueError):
+    """Flux de octeți care nu poate fi decodat în mesaje."""
+
+
+def _pack_short(value):
+    raw = value.encode('utf-8')
+    return U16.pack(len(raw)) + raw
+
+
+def _pack_text(value):
+    raw = value.encode('utf-8')
+    return U32.pack(len(raw)) + raw
+
+
+def _pack_list(values):
+    # Numărul de elemente, apoi șirurile unite prin NUL ca un singur text
+    if not values:
+        return LIST_HEAD.pack(0, 0)
+    raw = '\0'.join(values).encode('utf-8')
+    if raw.count(0) != len(values) - 1:
+        raise TypeError("Separatorul NUL apare într-un element")
+    return LIST_HEAD.pack(len(values), len(raw)) + raw
+
+
+def _pack_json(value):
+    return _pack_text(json.dumps(value))
+
+
+FIELD_PACKERS = {
+    'S': _pack_short,
+    'T': _pack_text,
+    'H': U16.pack,
+    'I': U32.pack,
+    'Q': U64.pack,
+    'L': _pack_list,
+    'J': _pack_json,
+}
+
+
+FIELD_STRUCTS = {'H': U16, 'I': U32, 'Q': U64}
+
+
+def encode_binary(msg_type, data):
+    """Codificarea binară a mesajului sau None dacă nu se potrivește unei scheme."""
+    schema = BINARY_SCHEMAS.get(msg_type)
+    if schema is None or not BINARY_FIELD_NAMES[msg_type].issuperset(data):
+        return None
+
+    code, fields = schema
+    present = 0
+    parts = [b'']
+    try:
+        for bit, (name, kind) in enumerate(fields):
+            value = data.get(name)
+            if value is not None:
+                present |= 1 << bit
+                parts.append(FIELD_PACKERS[kind](value))
+    except (AttributeError, TypeError, struct.error):
+        # Valoare de alt tip sau prea mare pentru câmp: rămâne JSON
+        return None
+
+    parts[0] = BINARY_HEAD.pack(code, present)
+    return b''.join(parts)
+
+
+def decode_binary(payload):
+    """Transformă un mesaj binar înapoi în dicționarul {'type', 'data'}."""
+    code, present = BINARY_HEAD.unpack_from(payload, 0)
+    entry = BINARY_TYPES.get(code)
+    if entry is None:
+        raise FrameError(f"Cod de mesaj necunoscut: {code}")
+
+    msg_type, fields = entry
+    data = {}
+    offset = BINARY_HEAD.size
+    for bit, (name, kind) in enumerate(fields):
+        if not present & (1 << bit):
+            continue
+        if kind == 'S' or kind == 'T' or kind == 'J':
+            length_struct = U16 if kind == 'S' else U32
+            (length,) = length_struct.unpack_from(payload, offset)
+            offset += length_struct.size
+            value = str(payload[offset:offset + length], 'utf-8')
+            offset += length
+            if kind == 'J':
+                value = json.loads(value)
+        elif kind == 'L':
+            count, length = LIST_HEAD.unpack_from(payload, offset)
+            offset += LIST_HEAD.size
+            value = str(payload[offset:offset + length], 'utf-8').split('\0') if count else []
+            offset += length
+        else:
+            number = FIELD_STRUCTS[kind]
+            (value,) = number.unpack_from(payload, offset)
+            offset += number.size
+        data[name] = value
+    return {'type': msg_type, 'data': data}
+
+
+def encode_payload(msg_type, data, encoding=JSON):
+    """Serializează un mesaj (JSON sau binar), fără încadrare."""
+    if encoding == BINARY:
+        payload = encode_binary(msg_type, data)
+        if payload is not None:
+            return payload
+    return json.dumps({"type": msg_type, "data": data}).encode('utf-8')
+
+
+def frame_payload(payload, mode=FRAMED):
+    """Adaugă prefixul de lungime (nimic pentru clienții legacy)."""
+    if mode == LEGACY:
+        return payload
+    if len(payload) > MAX_FRAME_SIZE:
+        raise FrameError(f"Mesaj prea mare: {len(payload)} octeți")
+    return HEADER.pack(len(payload)) + payload
+
+
+def frame_view(frame, mode):
+    """Adaptează un cadru framed deja codificat la formatul clientului, fără copiere."""
+    if mode == LEGACY:
+        return memoryview(frame)[HEADER.size:]
+    return frame
+
+
+def encode_message(msg_type, data, mode=FRAMED, encoding=JSON):
+    """Serializează și încadrează un mesaj pentru trimitere pe socket."""
+    if mode == LEGACY:
+        encoding = JSON
+    return frame_payload(encode_payload(msg_type, data, encoding), mode)
+
+
+class FrameCompressor:
+    """
+    Comprimă cadrele framed ale unui sens al conexiunii cu un context zlib
+    comun. Cadrele mai mici decât pragul rămân necomprimate. Ordinea în care
+    se comprimă trebuie să fie ordinea în care cadrele ajung pe socket.
+    """
+
+    def __init__(self, threshold=COMPRESS_THRESHOLD, level=6):
+        self.threshold = threshold
+        self.deflater = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.cpu_ns = 0
+
+    def compress_frame(self, frame):
+        """Returnează cadrul, comprimat dacă mesajul depășește pragul."""
+        payload = memoryview(frame)[HEADER.size:]
+        if len(payload) < self.threshold:
+            return frame
+
+        start = time.thread_time_ns()
+        data = self.deflater.compress(payload) + self.deflater.flush(zlib.Z_SYNC_FLUSH)
+        self.cpu_ns += time.thread_time_ns() - start
+        self.bytes_in += len(payload)
+        self.bytes_out += len(data)
+        return HEADER.pack(len(data) | COMPRESSED_FLAG) + data
+
+
+def decode_payload(payload):
+    """Transformă octeții unui mesaj (JSON sau binar) în dicționarul mesajului."""
+    try:
+        if payload[:1] == b'{':
+            return json.loads(payload)
+        return decode_binary(payload)
+    except (ValueError, IndexError, struct.error) as e:
+        raise FrameError(f"Mesaj invalid: {e}") from e
+
+
+def find_json_end(buffer, start, state=None):
+    """
+    Caută sfârșitul obiectului JSON care începe la `start`. Returnează
+    (indexul de după '}', None) sau, dacă obiectul nu a sosit complet,
+    (-1, stare); cu starea primită înapoi, apelul următor continuă de unde
+    a rămas, fără să parcurgă din nou octeții deja văzuți.
+    Octeții ASCII căutați nu apar niciodată în interiorul unui caracter UTF-8 multi-octet.
+    """
+    position, depth, in_string, escaped = state or (start, 0, False, False)
+
+    for i in range(position, len(buffer)):
+        byte = buffer[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif byte == 0x5C:  # '\'
+                escaped = True
+            elif byte == 0x22:  # '"'
+                in_string = False
+        elif byte == 0x22:
+            in_string = True
+        elif byte == 0x7B or byte == 0x5B:  # '{' sau '['
+            depth += 1
+        elif byte == 0x7D or byte == 0x5D:  # '}' sau ']'
+            depth -= 1
+            if depth == 0:
+                return i + 1, None
+    return -1, (len(buffer), depth, in_string, escaped)
+
+
+class FrameDecoder:
+    """
+    Decodor incremental: păstrează octeții incompleți între apeluri și
+    returnează, la fiecare feed(), toate mesajele complete sosite.
+    Cu mode=None formatul (framed/legacy) se detectează din primul octet.
+    """
+
+    def __init__(self, mode=None, max_frame_size=MAX_FRAME_SIZE):
+        self.mode = mode
+        self.max_frame_size = max_frame_size
+        self.buffer = bytearray()
+        self.scan = None        # legacy: starea find_json_end pentru obiectul incomplet de la începutul bufferului
+        self.inflater = None
+        self.inflate_ns = 0
+
+    def enable_compression(self):
+        """Acceptă de acum cadre comprimate (bitul COMPRESSED_FLAG din lungime)."""
+        if self.inflater is None:
+            self.inflater = zlib.decompressobj(-zlib.MAX_WBITS)
+
+    def _inflate(self, data):
+        start = time.thread_time_ns()
+        payload = self.inflater.decompress(data, self.max_frame_size + 1)
+        self.inflate_ns += time.thread_time_ns() - start
+        if len(payload) > self.max_frame_size or self.inflater.unconsumed_tail:
+            raise FrameError("Mesaj decomprimat prea mare")
+        return payload
+
+    def feed(self, data):
+        """Adaugă octeții primiți și returnează lista de mesaje complete."""
+        self.buffer += data
+
+        if self.mode is None:
+            stripped = self.buffer.lstrip()
+            if not stripped:
+                return []
+            self.mode = LEGACY if stripped[0] == 0x7B else FRAMED
+
+        if self.mode == LEGACY:
+            return self._feed_legacy()
+        return self._feed_framed()
+
+    def _feed_framed(self):
+        buffer = self.buffer
+        messages = []
+        offset = 0
+        size = len(buffer)
+
+        while size - offset >= HEADER.size:
+            (length,) = HEADER.unpack_from(buffer, offset)
+            compressed = length & COMPRESSED_FLAG and self.inflater is not None
+            if compressed:
+                length &= ~COMPRESSED_FLAG
+            if length > self.max_frame_size:
+                raise FrameError(f"Cadru prea mare: {length} octeți")
+            end = offset + HEADER.size + length
+            if end > size:
+                break
+            payload = bytes(buffer[offset + HEADER.size:end])
+            if compressed:
+                payload = self._inflate(payload)
+            messages.append(decode_payload(payload))
+            offset = end
+
+        if offset:
+            del buffer[:offset]
+        return messages
+
+    def _feed_legacy(self):
+        buffer = self.buffer
+        messages = []
+        offset = 0
+        size = len(buffer)
+        scan, self.scan = self.scan, None
+
+        while offset < size:
+            # Sari peste spațiile dintre obiecte
+            while offset < size and buffer[offset] in b' \t\r\n':
+                offset += 1
+            if offset >= size:
+                break
+            if buffer[offset] != 0x7B:
+                raise FrameError("Mesajul nu începe cu un obiect JSON")
+            end, scan = find_json_end(buffer, offset, scan)
+            if end < 0:
+                if size - offset > self.max_frame_size:
+                    raise FrameError("Mesaj legacy prea mare")
+                # Obiectul ajunge la începutul bufferului după del de mai jos
+                self.scan = (scan[0] - offset,) + scan[1:]
+                break
+            messages.append(decode_payload(bytes(buffer[offset:end])))
+            offset = end
+
+        if offset:
+            del buffer[:offset]
+        return messages
@@ -0,0 +1,55 @@
+"""
+Sesiunile reluabile ale serverului de chat.
+
+O sesiune numără cadrele trimise clientului (numărul de secvență al
+sesiunii) și păstrează ultimele dintre ele, până la un buget în octeți.
+Clientul numără la rândul lui cadrele primite; după o reconectare trimite
+acest număr (resume), iar serverul îi retrimite doar cadrele de după el.
+Cadrele păstrate sunt cele framed, necomprimate, exact cum au ieșit din
+coada de ieșire; cât timp clientul lipsește, mesajele pentru el ajung
+direct aici.
+"""
+
+import collections
+import secrets
+import threading
+
+
+class Session:
+    """Starea unei sesiuni: token, secvență și cadrele recente."""
+
+    def __init__(self, nickname, encoding, byte_budget):
+        self.token = secrets.token_urlsafe(18)
+        self.nickname = nickname
+        self.encoding = encoding
+        self.byte_budget = byte_budget
+        self.seq = 0                            # ultimul cadru trimis (sau păstrat) pentru client
+        self.frames = collections.deque()       # (seq, cadru)
+        self.used_bytes = 0
+        self.lock = threading.Lock()
+        self.conn = None                        # conexiunea curentă a sesiunii
+        self.expiry = None                      # timer-ul de expirare cât timp clientul lipsește
+
+    def record(self, frames):
+        """Numerotează cadrele trimise clientului și le păstrează pentru o eventuală reluare."""
+        with self.lock:
+            for frame in frames:
+                self.seq += 1
+                self.frames.append((self.seq, frame))
+                self.used_bytes += len(frame)
+            while self.used_bytes > self.byte_budget and self.frames:
+                _, frame = self.frames.popleft()
+                self.used_bytes -= len(frame)
+
+    def replay(self, last):
+        """
+        Returnează cadrele cu secvența mai mare decât `last` (ultimul cadru
+        primit de client), sau None dacă unele dintre ele nu mai sunt păstrate.
+        """
+        with self.lock:
+            if not isinstance(last, int) or last < 0 or last > self.seq:
+                return None
+            first = self.frames[0][0] if self.frames else self.seq + 1
+            if last + 1 < first:
+                return None
+            return [frame for seq, frame in self.frames if seq > last]
@@ -0,0 +1,533 @@
+"""
+Spool-ul durabil pentru mesajele private trimise utilizatorilor deconectați.
+
+Pe disc, în directorul spool-ului:
+
+  NNNNNNNN.log    segmente append-only; fiecare înregistrare are forma
+                  lungime (u32) | crc32 (u32) | JSON
+  index/HEX.idx   indexul unui destinatar (nickname-ul în hex): intrări de
+                  12 octeți segment | offset | lungime, în ordinea livrării
+
+O înregistrare este un mesaj ({"to", "data"}, plus "from" = poziția
+originalului pentru o copie făcută la compactare) sau confirmarea unei
+livrări ({"ack", "upto"}: tot ce era în indexul destinatarului până la
+intrarea "upto" inclusiv a fost livrat). Un singur thread scrie: adună
+tot ce s-a cerut între timp într-un lot, îl scrie în segmentul activ, face
+un singur fsync, apoi actualizează indexurile și rulează callback-urile
+mesajelor, deci costul fsync se împarte între toate mesajele lotului.
+
+Dacă scrierea lotului eșuează, segmentul este trunchiat înapoi la mărimea
+dinainte (sau, dacă nici asta nu merge, următorul lot începe un segment
+nou), mesajele lotului nu mai ocupă cota destinatarilor, iar callback-urile
+lor primesc eroarea. Indexurile care nu au putut fi actualizate se rescriu
+din memorie la următorul lot reușit.
+
+Segmentele închise se eliberează de la cel mai vechi: unul fără mesaje
+nelivrate se șterge, unul cu puțini octeți nelivrați este compactat
+(mesajele rămase se copiază în segmentul activ, apoi se șterge). Așa o
+confirmare nu dispare de pe disc înaintea mesajelor la care se referă.
+Copierea și fsync-ul se fac în afara lock-ului, la fel ca citirile din
+take(); sub lock se schimbă doar intrările din memorie.
+
+La pornire indexurile se citesc prin mmap, iar toate segmentele sunt
+parcurse din nou, în ordine: mesajele scrise, dar neindexate, copiile
+făcute la compactare și confirmările neaplicate înainte de o oprire
+bruscă se refac. Livrarea este "cel puțin o dată": după o cădere un
+mesaj poate ajunge de două ori.
+"""
+
+import json
+import mmap
+import os
+import struct
+import threading
+import zlib
+
+RECORD_HEAD = struct.Struct('>II')
+INDEX_ENTRY = struct.Struct('>III')
+SEGMENT_SUFFIX = '.log'
+INDEX_SUFFIX = '.idx'
+
+# Un segment închis cu mai puțin de atât din octeți încă nelivrați se compactează
+COMPACT_RATIO = 0.25
+
+# Numele fișierului de index (nickname-ul în hex) trebuie să încapă într-un nume de fișier
+MAX_NICKNAME_BYTES = 120
+
+
+def encode_record(payload):
+    body = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return RECORD_HEAD.pack(len(body), zlib.crc32(body)) + body
+
+
+def decode_record(record):
+    """Returnează conținutul înregistrării sau None dacă este incompletă sau coruptă."""
+    if len(record) < RECORD_HEAD.size:
+        return None
+    length, crc = RECORD_HEAD.unpack_from(record)
+    body = record[RECORD_HEAD.size:RECORD_HEAD.size + length]
+    if len(body) != length or zlib.crc32(body) != crc:
+        return None
+    return json.loads(body)
+
+
+class Spool:
+    """
+    Mesajele în așteptare, pe destinatar. append() și take() pot fi apelate
+    din orice thread; callback-urile rulează prin dispatch(callback, eroare)
+    (implicit direct, pe thread-ul spool-ului), cu eroarea None dacă mesajul
+    este pe disc, iar erorile de disc ajung și la on_error(excepție).
+    """
+
+    def __init__(self, directory, segment_bytes=4 * 1024 * 1024, max_per_recipient=1000,
+                 dispatch=None, on_error=None):
+        self.directory = directory
+        self.index_dir = os.path.join(directory, 'index')
+        self.segment_bytes = segment_bytes
+        self.max_per_recipient = max_per_recipient
+        self.dispatch = dispatch or (lambda callback, *args: callback(*args))
+        self.on_error = on_error
+        self.entries = {}       # nickname -> [(segment, offset, lungime)], în ordinea livrării
+        self.queued = {}        # nickname -> mesaje din lotul încă nescris
+        self.sizes = {}         # segment -> octeți scriși
+        self.live = {}          # segment -> [mesaje nelivrate, octeți nelivrați]
+        self.readers = {}       # segment -> descriptor pentru citire
+        self.batch = []         # (nickname, înregistrare, callback, upto pentru confirmări)
+        self.segment = 0        # segmentul activ
+        self.writer = None
+        self.sealed = False     # segmentul activ are o scriere eșuată netrunchiată
+        self.stale = set()      # destinatari al căror index trebuie rescris
+        self.commits = 0
+        self.records = 0
+        self.closed = False
+        self.lock = threading.Lock()
+        self.pending = threading.Condition(self.lock)
+        self.thread = None
+
+    # --- API ---
+
+    def open(self):
+        """Reface starea de pe disc și pornește thread-ul care scrie loturile."""
+        os.makedirs(self.index_dir, exist_ok=True)
+        for name in os.listdir(self.directory):
+            stem = name[:-len(SEGMENT_SUFFIX)]
+            if name.endswith(SEGMENT_SUFFIX) and stem.isdigit():
+                self.sizes[int(stem)] = os.path.getsize(self._segment_path(int(stem)))
+
+        for name in os.listdir(self.index_dir):
+            path = os.path.join(self.index_dir, name)
+            if not name.endswith(INDEX_SUFFIX):
+                os.unlink(path)         # rămășița unei rescrieri întrerupte
+                continue
+            nickname = bytes.fromhex(name[:-len(INDEX_SUFFIX)]).decode('utf-8')
+            entries = [entry for entry in self._load_index(path)
+                       if entry[1] + entry[2] <= self.sizes.get(entry[0], -1)]
+            if entries:
+                self.entries[nickname] = entries
+
+        indexed = {entry for entries in self.entries.values() for entry in entries}
+        touched = set()
+        forwarded = {}
+        for segment in sorted(self.sizes):
+            self._recover(segment, indexed, touched, forwarded)
+        for recipient in touched:
+            entries = self.entries.get(recipient)
+            self._write_index(recipient, entries)
+            if not entries:
+                self.entries.pop(recipient, None)
+        if touched:
+            self._sync_directory(self.index_dir)
+        for entries in self.entries.values():
+            for segment, _, length in entries:
+                live = self.live.setdefault(segment, [0, 0])
+                live[0] += 1
+                live[1] += length
+
+        self._rotate()
+        self._compact()
+        self.thread = threading.Thread(target=self._run, name='chat-spool', daemon=True)
+        self.thread.start()
+        return self
+
+    def close(self):
+        """Scrie ce a rămas în lot și oprește thread-ul."""
+        with self.lock:
+            self.closed = True
+            self.pending.notify()
+        if self.thread is not None:
+            self.thread.join()
+        if self.writer is not None:
+            self.writer.close()
+        for fd in self.readers.values():
+            os.close(fd)
+        self.readers.clear()
+
+    def append(self, recipient, data, callback=None):
+        """
+        Pune mesajul în lotul următor; callback(None) rulează după ce este pe
+        disc, callback(eroare) dacă scrierea a eșuat. Returnează False dacă
+        destinatarul are deja prea multe mesaje în așteptare.
+        """
+        if len(recipient.encode('utf-8')) > MAX_NICKNAME_BYTES:
+            return False
+        record = encode_record({'to': recipient, 'data': data})
+        with self.lock:
+            waiting = len(self.entries.get(recipient, ())) + self.queued.get(recipient, 0)
+            if self.closed or waiting >= self.max_per_recipient:
+                return False
+            self.queued[recipient] = self.queued.get(recipient, 0) + 1
+            self.batch.append((recipient, record, callback, None))
+            self.pending.notify()
+        return True
+
+    def take(self, recipient):
+        """
+        Scoate și returnează, în ordine, mesajele scrise pentru destinatar.
+        Citirea de pe disc se face în afara lock-ului; segmentele nu pot fi
+        șterse între timp, fiindcă mesajele încă se numără ca nelivrate.
+        """
+        with self.lock:
+            entries = self.entries.pop(recipient, None)
+            if not entries:
+                return []
+            readers = {segment: self._reader(segment) for segment, _, _ in entries}
+        messages = []
+        try:
+            for segment, offset, length in entries:
+                record = decode_record(os.pread(readers[segment], length, offset))
+                if record is not None:
+                    messages.append(record['data'])
+        except OSError:
+            with self.lock:
+                # Mesajele rămân în așteptare, înaintea celor sosite între timp
+                self.entries[recipient] = entries + self.entries.get(recipient, [])
+            raise
+
+        with self.lock:
+            for segment, _, length in entries:
+                live = self.live[segment]
+                live[0] -= 1
+                live[1] -= length
+            upto = entries[-1]
+            self.batch.append((recipient, encode_record({'ack': recipient, 'upto': upto}), None, upto))
+            self.pending.notify()
+        return messages
+
+    def stats(self):
+        with self.lock:
+            return {'recipients': len(self.entries),
+                    'messages': sum(len(entries) for entries in self.entries.values()),
+                    'segments': len(self.sizes),
+                    'commits': self.commits,
+                    'records': self.records}
+
+    # --- scrierea loturilor ---
+
+    def _run(self):
+        while True:
+            with self.lock:
+                while not self.batch and not self.closed:
+                    self.pending.wait()
+                if not self.batch:
+                    return
+                batch, self.batch = self.batch, []
+            try:
+                self._commit(batch)
+                self._compact()
+            except OSError as e:
+                if self.on_error is None:
+                    raise
+                self.on_error(e)
+
+    def _commit(self, batch):
+        try:
+            if self.sealed or self.sizes[self.segment] >= self.segment_bytes:
+                self._rotate()
+            base = self.sizes[self.segment]
+            positions = []
+            data = bytearray()
+            for _, record, _, _ in batch:
+                positions.append((self.segment, base + len(data), len(record)))
+                data += record
+            self._write_segment(data)
+        except OSError as e:
+            self._fail(batch, e)
+            raise
+
+        appended = {}
+        acked = set()
+        callbacks = []
+        with self.lock:
+            acked |= self.stale
+            self.stale.clear()
+            for (recipient, _, callback, upto), position in zip(batch, positions):
+                if upto is not None:
+                    acked.add(recipient)
+                    continue
+                self.queued[recipient] -= 1
+                if not self.queued[recipient]:
+                    del self.queued[recipient]
+                self.entries.setdefault(recipient, []).append(position)
+                live = self.live.setdefault(self.segment, [0, 0])
+                live[0] += 1
+                live[1] += position[2]
+                appended.setdefault(recipient, []).append(position)
+                if callback is not None:
+                    callbacks.append(callback)
+            # După o livrare indexul se rescrie cu ce a rămas (inclusiv mesajele din acest lot)
+            rewrites = {recipient: list(self.entries.get(recipient, ())) for recipient in acked}
+            self.commits += 1
+            self.records += len(batch)
+
+        # Mesajele sunt deja pe disc (ultimul segment se reparcurge la pornire),
+        # deci expeditorii primesc confirmarea chiar dacă un index nu se poate scrie
+        try:
+            created = False
+            for recipient, entries in rewrites.items():
+                appended.pop(recipient, None)
+                self._write_index(recipient, entries)
+            for recipient, entries in appended.items():
+                created |= self._append_index(recipient, entries)
+            if rewrites or created:
+                self._sync_directory(self.index_dir)
+        except OSError:
+            with self.lock:
+                self.stale.update(rewrites, appended)
+            raise
+        finally:
+            for callback in callbacks:
+                self.dispatch(callback, None)
+
+    def _fail(self, batch, error):
+        """
+        Lotul nu a ajuns pe disc: mesajele lui nu mai ocupă cota destinatarilor
+        și expeditorii primesc eroarea. Confirmările deja aplicate în memorie
+        ajung pe disc prin rescrierea indexurilor la următorul lot.
+        """
+        callbacks = []
+        with self.lock:
+            for recipient, _, callback, upto in batch:
+                if upto is not None:
+                    self.stale.add(recipient)
+                    continue
+                self.queued[recipient] -= 1
+                if not self.queued[recipient]:
+                    del self.queued[recipient]
+                if callback is not None:
+                    callbacks.append(callback)
+        for callback in callbacks:
+            self.dispatch(callback, error)
+
+    def _compact(self):
+        # Doar thread-ul spool-ului schimbă sizes, deci îl putem parcurge fără lock
+        for segment in sorted(self.sizes):
+            if segment == self.segment:
+                return
+            with self.lock:
+                count, live_bytes = self.live.get(segment, (0, 0))
+            if count and live_bytes >= COMPACT_RATIO * self.sizes[segment]:
+                return
+            if count:
+                self._copy_forward(segment)
+            if not self._drop_segment(segment):
+                # Un take() încă citește din segment: îl reluăm la următorul lot
+                return
+
+    def _copy_forward(self, segment):
+        """
+        Copiază mesajele nelivrate ale segmentului în cel activ. Copierea și
+        fsync-ul se fac fără lock; sub lock se înlocuiesc doar intrările care
+        nu au fost livrate între timp.
+        """
+        with self.lock:
+            moved = [(recipient, entry) for recipient, entries in self.entries.items()
+                     for entry in entries if entry[0] == segment]
+            fd = self._reader(segment)
+        if self.sealed:
+            self._rotate()
+        copies = []
+        data = bytearray()
+        base = self.sizes[self.segment]
+        for recipient, entry in moved:
+            record = decode_record(os.pread(fd, entry[2], entry[1]))
+            if record is None:
+                # Oricum nu se mai poate livra
+                copies.append((recipient, entry, None))
+                continue
+            copy = encode_record({'to': recipient, 'data': record['data'], 'from': list(entry)})
+            copies.append((recipient, entry, (self.segment, base + len(data), len(copy))))
+            data += copy
+        if data:
+            self._write_segment(data)
+
+        changed = set()
+        with self.lock:
+            old = self.live.setdefault(segment, [0, 0])
+            live = self.live.setdefault(self.segment, [0, 0])
+            for recipient, entry, copy in copies:
+                entries = self.entries.get(recipient)
+                if not entries or entry not in entries:
+                    continue        # livrat cât timp copiam
+                if copy is None:
+                    entries.remove(entry)
+                else:
+                    entries[entries.index(entry)] = copy
+                    live[0] += 1
+                    live[1] += copy[2]
+                old[0] -= 1
+                old[1] -= entry[2]
+                changed.add(recipient)
+            rewrites = {recipient: list(self.entries[recipient]) for recipient in changed}
+            for recipient in changed:
+                if not self.entries[recipient]:
+                    del self.entries[recipient]
+        for recipient, entries in rewrites.items():
+            self._write_index(recipient, entries)
+        if rewrites:
+            self._sync_directory(self.index_dir)
+
+    # --- fișiere ---
+
+    def _segment_path(self, segment):
+        return os.path.join(self.directory, f'{segment:08d}{SEGMENT_SUFFIX}')
+
+    def _index_path(self, recipient):
+        return os.path.join(self.index_dir, recipient.encode('utf-8').hex() + INDEX_SUFFIX)
+
+    def _reader(self, segment):
+        fd = self.readers.get(segment)
+        if fd is None:
+            fd = self.readers[segment] = os.open(self._segment_path(segment), os.O_RDONLY)
+        return fd
+
+    def _rotate(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.segment = max(self.sizes, default=0) + 1
+        # Fără buffer în proces: după o eroare nu rămân octeți care să plece mai târziu
+        self.writer = open(self._segment_path(self.segment), 'ab', buffering=0)
+        self.sizes[self.segment] = 0
+        self.sealed = False
+        self._sync_directory(self.directory)
+
+    def _write_segment(self, data):
+        """Scrie și sincronizează; la eroare segmentul revine la mărimea de dinainte."""
+        size = self.sizes[self.segment]
+        try:
+            view = memoryview(data)
+            while view:
+                view = view[self.writer.write(view):]
+            os.fsync(self.writer.fileno())
+        except OSError:
+            try:
+                os.ftruncate(self.writer.fileno(), size)
+            except OSError:
+                # Bucata scrisă rămâne în segment: următoarea scriere începe unul nou
+                self.sealed = True
+            raise
+        self.sizes[self.segment] += len(data)
+
+    def _drop_segment(self, segment):
+        """Șterge segmentul dacă nu mai are mesaje nelivrate; returnează True dacă l-a șters."""
+        with self.lock:
+            if self.live.get(segment, (0, 0))[0]:
+                return False
+            fd = self.readers.pop(segment, None)
+            del self.sizes[segment]
+            self.live.pop(segment, None)
+        if fd is not None:
+            os.close(fd)
+        os.unlink(self._segment_path(segment))
+        return True
+
+    def _append_index(self, recipient, entries):
+        """Adaugă intrări la indexul destinatarului; returnează True dacă fișierul este nou."""
+        path = self._index_path(recipient)
+        created = not os.path.exists(path)
+        with open(path, 'ab') as f:
+            f.write(b''.join(INDEX_ENTRY.pack(*entry) for entry in entries))
+            f.flush()
+            os.fsync(f.fileno())
+        return created
+
+    def _write_index(self, recipient, entries):
+        path = self._index_path(recipient)
+        if not entries:
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            return
+        temp = path + '.tmp'
+        with open(temp, 'wb') as f:
+            f.write(b''.join(INDEX_ENTRY.pack(*entry) for entry in entries))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp, path)
+
+    def _sync_directory(self, path):
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def _load_index(self, path):
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            size -= size % INDEX_ENTRY.size     # o intrare scrisă pe jumătate se ignoră
+            if not size:
+                return []
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+                with memoryview(view)[:size] as entries:
+                    return list(INDEX_ENTRY.iter_unpack(entries))
+
+    def _recover(self, segment, indexed, touched, forwarded):
+        """
+        Parcurge un segment (în ordinea segmentelor): indexează mesajele care
+        nu apar în niciun index, mută intrările copiate la compactare,
+        reaplică confirmările și, în ultimul segment, taie o înregistrare
+        scrisă pe jumătate. `indexed` sunt pozițiile din indexuri, `touched`
+        primește destinatarii schimbați, iar `forwarded` ține minte unde a
+        ajuns fiecare copie (o confirmare poate arăta spre original).
+        """
+        path = self._segment_path(segment)
+        with open(path, 'rb') as f:
+            data = f.read()
+        offset = 0
+        while offset < len(data):
+            length = RECORD_HEAD.unpack_from(data, offset)[0] if offset + RECORD_HEAD.size <= len(data) else 0
+            end = offset + RECORD_HEAD.size + length
+            record = decode_record(data[offset:end])
+            if record is None:
+                break
+            position = (segment, offset, end - offset)
+            if 'ack' in record:
+                entries = self.entries.get(record['ack'], [])
+                upto = tuple(record['upto'])
+                while upto in forwarded:
+                    upto = forwarded[upto]
+                if upto in entries:
+                    del entries[:entries.index(upto) + 1]
+                    touched.add(record['ack'])
+            elif 'from' in record:
+                source = tuple(record['from'])
+                forwarded[source] = position
+                entries = self.entries.get(record['to'], [])
+                # Dacă originalul nu mai e în așteptare, a fost livrat înainte de copiere
+                if source in entries:
+                    if position in indexed:
+                        entries.remove(source)
+                    else:
+                        entries[entries.index(source)] = position
+                    touched.add(record['to'])
+            elif position not in indexed:
+                self.entries.setdefault(record['to'], []).append(position)
+                touched.add(record['to'])
+            offset = end
+
+        if offset < len(data) and segment == max(self.sizes):
+            with open(path, 'r+b') as f:
+                f.truncate(offset)
+                os.fsync(f.fileno())
+            self.sizes[segment] = offset
@@ -0,0 +1,126 @@
+"""
+Roată de timere ierarhică pentru timeout-urile conexiunilor.
+
+Fiecare nivel are SLOTS sloturi; nivelul 0 avansează cu un slot la fiecare
+tick, iar un slot de pe nivelul n acoperă SLOTS**n tick-uri. Un timer se
+pune direct în slotul expirării lui, pe cel mai de jos nivel care îl
+poate cuprinde, deci programarea și anularea costă O(1) indiferent câte
+timere există. Când nivelul 0 face o tură completă, slotul curent al
+nivelului următor se redistribuie pe nivelurile de dedesubt.
+
+Un timer nu expiră niciodată înainte de întârzierea cerută și întârzie
+cel mult două tick-uri (plus intervalul dintre apelurile run()).
+Callback-urile rulează în afara lock-ului, pe thread-ul (sau bucla) care
+apelează run().
+"""
+
+import math
+import threading
+import time
+
+SLOT_BITS = 6
+SLOTS = 1 << SLOT_BITS
+SLOT_MASK = SLOTS - 1
+LEVELS = 4
+
+
+class Timer:
+    """Un timer programat; cancel() îl scoate din roată."""
+
+    __slots__ = ('wheel', 'expires', 'callback', 'bucket')
+
+    def __init__(self, wheel, expires, callback):
+        self.wheel = wheel
+        self.expires = expires      # tick-ul expirării
+        self.callback = callback
+        self.bucket = None          # slotul în care se află (None = expirat sau anulat)
+
+    def cancel(self):
+        with self.wheel.lock:
+            if self.bucket is not None:
+                self.bucket.discard(self)
+                self.bucket = None
+                self.wheel.count -= 1
+
+
+class TimerWheel:
+    """Roată cu LEVELS niveluri de câte SLOTS sloturi și pasul `tick` secunde."""
+
+    def __init__(self, tick=0.1, clock=time.monotonic, on_error=None):
+        self.tick = tick
+        self.clock = clock
+        self.on_error = on_error    # on_error(timer, excepție); fără el excepția se propagă
+        self.started = clock()
+        self.current = 0            # ultimul tick procesat
+        self.count = 0              # timere programate
+        self.wheels = [[set() for _ in range(SLOTS)] for _ in range(LEVELS)]
+        self.lock = threading.Lock()
+
+    def schedule(self, delay, callback):
+        """Rulează callback() după `delay` secunde; returnează Timer-ul."""
+        with self.lock:
+            # Tick-ul curent poate fi deja parțial scurs: mai adăugăm unul
+            ticks = max(1, math.ceil(delay / self.tick)) + 1
+            timer = Timer(self, self.current + ticks, callback)
+            self._place(timer)
+            self.count += 1
+        return timer
+
+    def _place(self, timer):
+        expires = timer.expires
+        level = 0
+        # Cel mai de jos nivel pe care expirarea și tick-ul curent au aceleași cifre superioare
+        while level < LEVELS - 1 and (expires >> (SLOT_BITS * (level + 1))) != (
+                self.current >> (SLOT_BITS * (level + 1))):
+            level += 1
+        bucket = self.wheels[level][(expires >> (SLOT_BITS * level)) & SLOT_MASK]
+        bucket.add(timer)
+        timer.bucket = bucket
+
+    def _advance(self, target):
+        """Avansează până la tick-ul `target`; returnează timerele expirate."""
+        expired = []
+        while self.current < target:
+            self.current += 1
+            # La capătul unei ture, slotul curent al nivelului superior coboară
+            level = 1
+            while level < LEVELS and not self.current & ((1 << (SLOT_BITS * level)) - 1):
+                index = (self.current >> (SLOT_BITS * level)) & SLOT_MASK
+                bucket = self.wheels[level][index]
+                self.wheels[level][index] = set()
+                for timer in bucket:
+                    if timer.expires <= self.current:
+                        expired.append(timer)
+                    else:
+                        self._place(timer)
+                level += 1
+
+            index = self.current & SLOT_MASK
+            bucket = self.wheels[0][index]
+            if bucket:
+                self.wheels[0][index] = set()
+                for timer in bucket:
+                    if timer.expires <= self.current:
+                        expired.append(timer)
+                    else:
+                        self._place(timer)
+
+        for timer in expired:
+            timer.bucket = None
+        self.count -= len(expired)
+        return expired
+
+    def run(self, now=None):
+        """Rulează callback-urile timerelor expirate până la momentul `now`."""
+        if now is None:
+            now = self.clock()
+        with self.lock:
+            expired = self._advance(int((now - self.started) / self.tick))
+        for timer in expired:
+            try:
+                timer.callback()
+            except Exception as e:
+                if self.on_error is None:
+                    raise
+                self.on_error(timer, e)
+        return len(expired)
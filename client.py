@@ -1,80 +1,459 @@
 import socket
 import threading
+import argparse
+import collections
+import concurrent.futures
+import itertools
 import json
+import random
 import sys
+import time
+
+from chat_protocol import (ENCODINGS, FRAMED, JSON, ZLIB, FrameCompressor, FrameDecoder, FrameError,
+                           encode_message)
 
 HOST = '127.0.0.1'
 PORT = 65432
 
+# Câte mesaje anterioare cerem serverului la înregistrare și la intrarea într-o cameră
+HISTORY_ON_JOIN = 20
+
+# Cât așteptăm răspunsul serverului la o cerere (secunde)
+REQUEST_TIMEOUT = 5
+
+# Reconectarea după o întrerupere: prima pauză, pauza maximă (se dublează la
+# fiecare încercare eșuată, cu o parte aleatoare) și numărul de încercări
+RECONNECT_DELAY = 0.5
+RECONNECT_MAX_DELAY = 30
+RECONNECT_ATTEMPTS = 10
+
+# Mesajele care pot pleca înainte ca serverul să confirme înregistrarea sau reluarea
+HANDSHAKE_TYPES = ('register', 'resume', 'logout')
+
+# Modul headless: cererile la care serverul răspunde (și care ocupă un loc în
+# fereastra de cereri în zbor) și câte cadre pleacă cel mult într-un sendall()
+REPLY_TYPES = ('private', 'join', 'leave', 'list_users', 'my_info', 'stats')
+HEADLESS_WINDOW = 64
+HEADLESS_BATCH_FRAMES = 256
+HEADLESS_CHUNK = 64 * 1024
+
 running = True
 
+# Unde scrie clientul mesajele lui de stare; în modul headless stdout este doar pentru NDJSON
+status_output = sys.stdout
+# Liniile NDJSON vin din thread-ul de primire și din cel care citește intrarea: se scriu pe rând
+stdout_lock = threading.Lock()
+
+# Conexiunea curentă; după o reconectare thread-ul de primire o înlocuiește
+server_address = (HOST, PORT)
+client_socket = None
+send_lock = threading.RLock()
+
+# Setat după 'registered' sau 'resumed'; șters cât timp conexiunea lipsește
+ready = threading.Event()
+
+# Cererea de înregistrare (refolosită dacă sesiunea nu mai poate fi reluată),
+# tokenul sesiunii și câte mesaje am primit în sesiune ('resumed' nu se numără)
+registration = None
+session = None
+received = 0
+
+# Rosterul local (nickname -> None, în ordinea intrării), ținut la zi din delte 'presence'
+roster = {}
+roster_version = None
+roster_epoch = None
+
+# Codificarea mesajelor trimise (json sau binary); serverul o confirmă în 'registered'
+encoding = JSON
+
+# Compresia zlib: o cerem la register, iar după confirmare comprimăm și mesajele trimise
+compression = False
+compressor = None
+
+# Cererile fără răspuns încă: id -> Future completat de thread-ul de primire
+pending = {}
+pending_lock = threading.Lock()
+request_ids = itertools.count(1)
+
+
+def send_message(msg_type, data):
+    """
+    Trimite un mesaj încadrat către server, în codificarea aleasă. În timpul
+    unei reconectări mesajele obișnuite așteaptă reluarea sesiunii.
+    """
+    if msg_type not in HANDSHAKE_TYPES and not ready.wait(REQUEST_TIMEOUT):
+        raise ConnectionError("Nu există conexiune cu serverul")
+    frame = encode_message(msg_type, data, encoding=encoding)
+    with send_lock:
+        # Contextul zlib trebuie folosit în ordinea în care cadrele ajung pe socket
+        if compressor is not None:
+            frame = compressor.compress_frame(frame)
+        client_socket.sendall(frame)
+
+
+def send_frames(frames):
+    """Trimite mai multe cadre deja codificate într-un singur sendall()."""
+    if not frames:
+        return
+    if not ready.wait(REQUEST_TIMEOUT):
+        raise ConnectionError("Nu există conexiune cu serverul")
+    with send_lock:
+        if compressor is not None:
+            frames = [compressor.compress_frame(frame) for frame in frames]
+        client_socket.sendall(b''.join(frames))
+
+
+def prepare_request(data):
+    """Adaugă un id nou cererii; returnează (data cu id, Future pentru răspuns)."""
+    request_id = next(request_ids)
+    future = concurrent.futures.Future()
+    with pending_lock:
+        pending[request_id] = future
+    return dict(data, id=request_id), future
+
+
+def send_request(msg_type, data):
+    """
+    Trimite o cerere cu un id nou și returnează un Future care primește
+    răspunsul serverului (mesajul cu același id). Se pot trimite mai multe
+    cereri una după alta, fără să se aștepte răspunsurile.
+    """
+    data, future = prepare_request(data)
+    try:
+        send_message(msg_type, data)
+    except OSError:
+        with pending_lock:
+            pending.pop(data['id'], None)
+        raise
+    return future
+
+
+def wait_response(future, timeout=REQUEST_TIMEOUT):
+    """Așteaptă răspunsul unei cereri; returnează mesajul sau None."""
+    try:
+        return future.result(timeout=timeout)
+    except concurrent.futures.TimeoutError:
+        future.cancel()
+        print(f"\n[EROARE] Serverul nu a răspuns în {timeout} secunde.", file=status_output)
+    except ConnectionError:
+        pass
+    return None
+
+
+def complete_request(msg):
+    """Dacă mesajul este răspunsul unei cereri, completează Future-ul ei."""
+    request_id = msg['data'].get('id')
+    if request_id is None:
+        return
+    with pending_lock:
+        future = pending.pop(request_id, None)
+    if future is not None and future.set_running_or_notify_cancel():
+        future.set_result(msg)
+
+
+def fail_pending_requests():
+    """Conexiunea s-a închis: nicio cerere în așteptare nu mai primește răspuns."""
+    with pending_lock:
+        futures = list(pending.values())
+        pending.clear()
+    for future in futures:
+        if future.set_running_or_notify_cancel():
+            future.set_exception(ConnectionError("Conexiunea cu serverul s-a închis"))
+
+
+def register():
+    """Trimite cererea de înregistrare; numărătoarea mesajelor sesiunii începe de la zero."""
+    global received
+    received = 0
+    return send_request('register', registration)
+
+
+def resume_done(future):
+    """Răspunsul la 'resume': dacă sesiunea a expirat, clientul se înregistrează din nou."""
+    global session
+    if future.cancelled() or future.exception() is not None:
+        return
+    if future.result()['type'] == 'error':
+        session = None
+        print("\n[INFO] Sesiunea nu a mai putut fi reluată; te înregistrezi din nou.", file=status_output)
+        try:
+            register()
+        except OSError:
+            pass
+
+
+def reconnect():
+    """
+    Reface conexiunea după o întrerupere, cu pauze care cresc exponențial
+    între încercări, și cere reluarea sesiunii. Returnează noul socket sau
+    None dacă serverul nu a putut fi contactat.
+    """
+    global client_socket, compressor
+    delay = RECONNECT_DELAY
+    for attempt in range(1, RECONNECT_ATTEMPTS + 1):
+        # Partea aleatoare împiedică reconectarea simultană a tuturor clienților
+        time.sleep(random.uniform(delay / 2, delay))
+        if not running:
+            return None
+        try:
+            new_socket = socket.create_connection(server_address, timeout=REQUEST_TIMEOUT)
+            new_socket.settimeout(None)
+        except OSError as e:
+            print(f"\n[INFO] Reconectarea {attempt}/{RECONNECT_ATTEMPTS} a eșuat: {e}", file=status_output)
+            delay = min(delay * 2, RECONNECT_MAX_DELAY)
+            continue
+
+        resume = {'session': session, 'last': received}
+        if compression:
+            resume['compression'] = ZLIB
+        with send_lock:
+            # 'resume' trebuie să fie primul mesaj pe noua conexiune
+            client_socket = new_socket
+            compressor = None
+            try:
+                send_request('resume', resume).add_done_callback(resume_done)
+            except OSError:
+                new_socket.close()
+                continue
+        return new_socket
+    return None
+
+
+def request_roster():
+    """Cere modificările de prezență de după versiunea rosterului local."""
+    return send_request('list_users', {'since': roster_version or 0, 'epoch': roster_epoch})
+
+
+def apply_presence(msg_data):
+    """
+    Actualizează rosterul local. Un snapshot îl înlocuiește, iar răspunsul
+    la o cerere 'since' (are 'epoch') se aplică dacă nu e mai vechi decât
+    rosterul. O deltă trimisă de server se aplică doar dacă urmează exact
+    versiunii locale: una mai veche se ignoră, iar una care sare versiuni
+    (livrările concurente pot ajunge în altă ordine) cere modificările lipsă.
+    Returnează True dacă delta a fost aplicată.
+    """
+    global roster_version, roster_epoch
+    version = msg_data['version']
+    if 'users' in msg_data:
+        roster.clear()
+        roster.update(dict.fromkeys(msg_data['users']))
+        roster_version, roster_epoch = version, msg_data['epoch']
+        return True
+    if roster_version is None or version <= roster_version:
+        return False
+    if 'epoch' not in msg_data and version != roster_version + 1:
+        try:
+            request_roster()
+        except OSError:
+            pass
+        return False
+
+    for nickname in msg_data.get('joined', ()):
+        roster[nickname] = None
+    for nickname in msg_data.get('left', ()):
+        roster.pop(nickname, None)
+    roster_version = version
+    return True
+
+
+def answer_ping():
+    """Heartbeat: serverul închide conexiunile care nu răspund."""
+    try:
+        send_message('pong', {})
+    except OSError:
+        pass
+
 
-def send_message(client_socket, msg_type, data):
-    """Trimite un mesaj JSON către server."""
-    message = json.dumps({"type": msg_type, "data": data})
-    client_socket.sendall(message.encode('utf-8'))
+def new_decoder():
+    decoder = FrameDecoder(mode=FRAMED)
+    if compression:
+        decoder.enable_compression()
+    return decoder
 
 
-def receive_messages(client_socket):
-    """Primește mesaje de la server și le afișează."""
-    global running
+def update_state(msg):
+    """
+    Aplică efectele unui mesaj asupra stării clientului (compresie, sesiune,
+    roster), indiferent cum este afișat. Pentru 'presence' returnează dacă
+    modificarea a fost aplicată rosterului.
+    """
+    global compressor, session
+    msg_type = msg['type']
+    msg_data = msg['data']
+    if msg_type in ('registered', 'resumed'):
+        if msg_data.get('compression') == ZLIB:
+            compressor = FrameCompressor()
+        if msg_type == 'registered':
+            session = msg_data.get('session')
+        ready.set()
+    elif msg_type == 'presence':
+        return apply_presence(msg_data)
+    return True
+
+
+def display_message(msg):
+    """Afișează un mesaj primit de la server."""
+    msg_type = msg['type']
+    msg_data = msg['data']
+    applied = update_state(msg)
+    
+    if msg_type == 'registered':
+        print(f"\n[OK] Înregistrat ca: {msg_data['nickname']}")
+        print(f"[INFO] IP-ul tău: {msg_data['ip']}:{msg_data['port']}")
+    
+    elif msg_type == 'resumed':
+        print(f"\n[OK] Reconectat ca {msg_data['nickname']}; "
+              f"{msg_data['missed']} mesaje primite între timp.")
+    
+    elif msg_type == 'message':
+        if msg_data['type'] == 'broadcast':
+            print(f"\n[GENERAL] {msg_data['from']}: {msg_data['message']}")
+        elif msg_data['type'] == 'private' and msg_data.get('sent'):
+            sent = time.strftime('%d.%m %H:%M', time.localtime(msg_data['sent']))
+            print(f"\n[PRIVAT de la {msg_data['from']}, trimis la {sent}]: {msg_data['message']}")
+        elif msg_data['type'] == 'private':
+            print(f"\n[PRIVAT de la {msg_data['from']}]: {msg_data['message']}")
+        elif msg_data['type'] == 'private_sent':
+            print(f"\n[PRIVAT] {msg_data['from']}: {msg_data['message']}")
+        elif msg_data['type'] == 'private_queued':
+            print(f"\n[PRIVAT] {msg_data['from']} (deconectat, îl primește la conectare): {msg_data['message']}")
+        elif msg_data['type'] == 'room':
+            print(f"\n[#{msg_data['room']}] {msg_data['from']}: {msg_data['message']}")
+    
+    elif msg_type == 'history_end':
+        if msg_data['count']:
+            where = f"camera {msg_data['room']}" if msg_data.get('room') else "chat"
+            print(f"\n[ISTORIC] {msg_data['count']} mesaje anterioare din {where}")
+    
+    elif msg_type == 'joined':
+        print(f"\n[OK] Ai intrat în camera {msg_data['room']}")
+    
+    elif msg_type == 'left':
+        print(f"\n[OK] Ai părăsit camera {msg_data['room']}")
+    
+    elif msg_type == 'notification':
+        print(f"\n[NOTIFICARE] {msg_data['message']}")
+    
+    elif msg_type == 'user_list':
+        print("\n=== UTILIZATORI CONECTAȚI ===")
+        for i, user in enumerate(msg_data['users'], 1):
+            print(f"  {i}. {user}")
+        print("=============================")
+    
+    elif msg_type == 'presence':
+        if 'id' in msg_data:
+            print("\n=== UTILIZATORI CONECTAȚI ===")
+            for i, user in enumerate(list(roster), 1):
+                print(f"  {i}. {user}")
+            print("=============================")
+        elif applied and 'epoch' not in msg_data:
+            # Delta trimisă de server ține locul notificării text
+            for nickname in msg_data.get('joined', ()):
+                print(f"\n[NOTIFICARE] {nickname} s-a alăturat chat-ului!")
+            for nickname in msg_data.get('left', ()):
+                print(f"\n[NOTIFICARE] {nickname} a părăsit chat-ul.")
+    
+    elif msg_type == 'info':
+        print(f"\n=== INFORMAȚIILE TALE ===")
+        print(f"  Nickname: {msg_data['nickname']}")
+        print(f"  IP: {msg_data['ip']}")
+        print(f"  Port: {msg_data['port']}")
+        print("==========================")
+    
+    elif msg_type == 'stats':
+        stats = msg_data['metrics']
+        print(f"\n=== STATISTICI SERVER (de {stats['uptime_s']:.0f} s) ===")
+        for name, value in sorted({**stats['gauges'], **stats['counters']}.items()):
+            print(f"  {name}: {value}")
+        for name, summary in sorted(stats['histograms'].items()):
+            print(f"  {name}: p50 {summary['p50']}, p99 {summary['p99']}, max {summary['max']} "
+                  f"({summary['count']} eșantioane)")
+        for name, lock in stats['locks'].items():
+            print(f"  {name}: {lock['contended']}/{lock['acquires']} achiziții cu așteptare, "
+                  f"p99 {lock['wait_ns']['p99']} ns")
+        print("=============================")
+
+    elif msg_type == 'error':
+        print(f"\n[EROARE] {msg_data['message']}")
+    
+    print("\n> ", end="", flush=True)
+
+
+def emit_line(record, flush=False):
+    """Modul headless: scrie o linie JSON întreagă pe stdout."""
+    line = json.dumps(record, ensure_ascii=False) + '\n'
+    with stdout_lock:
+        sys.stdout.write(line)
+        if flush:
+            sys.stdout.flush()
+
+
+def emit_message(msg):
+    """Modul headless: fiecare mesaj primit devine o linie JSON pe stdout."""
+    update_state(msg)
+    emit_line(msg)
+
+
+# Cum se tratează mesajele primite: afișate pentru om sau, în modul headless, ca NDJSON
+message_handler = display_message
+
+
+def receive_messages():
+    """
+    Primește mesaje de la server și le afișează. Dacă serverul a dat o sesiune
+    și conexiunea cade, se reconectează și reia sesiunea.
+    """
+    global running, received
+    current_socket = client_socket
+    decoder = new_decoder()
     while running:
         try:
-            data = client_socket.recv(4096)
-            if not data:
-                print("\n[INFO] Serverul a închis conexiunea.")
-                running = False
-                break
-            
-            msg = json.loads(data.decode('utf-8'))
-            msg_type = msg['type']
-            msg_data = msg['data']
-            
-            if msg_type == 'registered':
-                print(f"\n[OK] Înregistrat ca: {msg_data['nickname']}")
-                print(f"[INFO] IP-ul tău: {msg_data['ip']}:{msg_data['port']}")
-            
-            elif msg_type == 'message':
-                if msg_data['type'] == 'broadcast':
-                    print(f"\n[GENERAL] {msg_data['from']}: {msg_data['message']}")
-                elif msg_data['type'] == 'private':
-                    print(f"\n[PRIVAT de la {msg_data['from']}]: {msg_data['message']}")
-                elif msg_data['type'] == 'private_sent':
-                    print(f"\n[PRIVAT] {msg_data['from']}: {msg_data['message']}")
-            
-            elif msg_type == 'notification':
-                print(f"\n[NOTIFICARE] {msg_data['message']}")
-            
-            elif msg_type == 'user_list':
-                print("\n=== UTILIZATORI CONECTAȚI ===")
-                for i, user in enumerate(msg_data['users'], 1):
-                    print(f"  {i}. {user}")
-                print("=============================")
-            
-            elif msg_type == 'info':
-                print(f"\n=== INFORMAȚIILE TALE ===")
-                print(f"  Nickname: {msg_data['nickname']}")
-                print(f"  IP: {msg_data['ip']}")
-                print(f"  Port: {msg_data['port']}")
-                print("==========================")
-            
-            elif msg_type == 'error':
-                print(f"\n[EROARE] {msg_data['message']}")
-            
-            print("\n> ", end="", flush=True)
+            data = current_socket.recv(4096)
+            if data:
+                # Un recv() poate conține mai multe mesaje sau doar o parte dintr-unul
+                for msg in decoder.feed(data):
+                    if msg['type'] != 'resumed':
+                        received += 1
+                    if msg['type'] == 'ping':
+                        answer_ping()
+                        continue
+                    message_handler(msg)
+                    complete_request(msg)
+                with stdout_lock:
+                    sys.stdout.flush()
+                continue
+            reason = "Serverul a închis conexiunea."
         
-        except json.JSONDecodeError:
-            print("\n[EROARE] Mesaj invalid de la server.")
-        except ConnectionResetError:
-            print("\n[INFO] Conexiunea a fost întreruptă de server.")
+        except FrameError:
+            print("\n[EROARE] Mesaj invalid de la server.", file=status_output)
             running = False
             break
+        except ConnectionResetError:
+            reason = "Conexiunea a fost întreruptă de server."
         except OSError:
-            break
+            if not running:
+                break
+            reason = "Conexiunea a fost întreruptă."
         except Exception as e:
             if running:
-                print(f"\n[EROARE] {e}")
+                print(f"\n[EROARE] {e}", file=status_output)
+            break
+
+        ready.clear()
+        fail_pending_requests()
+        if session is None or not running:
+            print(f"\n[INFO] {reason}", file=status_output)
+            running = False
+            break
+        print(f"\n[INFO] {reason} Reconectare...", file=status_output)
+        current_socket = reconnect()
+        if current_socket is None:
+            print("\n[EROARE] Serverul nu mai poate fi contactat.", file=status_output)
+            running = False
             break
+        decoder = new_decoder()
+    fail_pending_requests()
 
 
 def show_menu():
@@ -84,81 +463,304 @@ def show_menu():
     print("  2. Trimite mesaj privat")
     print("  3. Vezi utilizatori conectați")
     print("  4. Vezi informațiile tale (IP)")
-    print("  5. Ieșire")
+    print("  5. Intră într-o cameră")
+    print("  6. Părăsește o cameră")
+    print("  7. Trimite mesaj într-o cameră")
+    print("  8. Statistici server")
+    print("  9. Ieșire")
     print("=============================")
 
 
+def handle_choice(choice):
+    """Execută opțiunea aleasă din meniu; returnează False la ieșire."""
+    if choice == '1':
+        message = input("Mesaj pentru toți: ").strip()
+        if message:
+            send_message('broadcast', {'message': message})
+    
+    elif choice == '2':
+        # Mai întâi arată lista de utilizatori
+        wait_response(request_roster())
+        
+        target = input("Către cine (nickname): ").strip()
+        if target:
+            message = input("Mesaj privat: ").strip()
+            if message:
+                wait_response(send_request('private', {'to': target, 'message': message}))
+    
+    elif choice == '3':
+        # Serverul trimite doar ce s-a schimbat față de rosterul local
+        wait_response(request_roster())
+    
+    elif choice == '4':
+        wait_response(send_request('my_info', {}))
+    
+    elif choice == '5':
+        room = input("Numele camerei: ").strip()
+        if room:
+            wait_response(send_request('join', {'room': room, 'history': {'last': HISTORY_ON_JOIN}}))
+    
+    elif choice == '6':
+        room = input("Numele camerei: ").strip()
+        if room:
+            wait_response(send_request('leave', {'room': room}))
+    
+    elif choice == '7':
+        room = input("Camera: ").strip()
+        if room:
+            message = input(f"Mesaj pentru #{room}: ").strip()
+            if message:
+                send_message('room_message', {'room': room, 'message': message})
+    
+    elif choice == '8':
+        wait_response(send_request('stats', {}))
+    
+    elif choice == '9':
+        print("[INFO] Deconectare...")
+        return False
+    
+    else:
+        print("[EROARE] Opțiune invalidă!")
+    return True
+
+
+def parse_line(line):
+    """
+    Transformă o linie de intrare a modului headless în (tip, data):
+
+      text                  mesaj pentru toți (//text trimite un text care începe cu /)
+      /msg NICK text        mesaj privat
+      /join CAMERĂ, /leave CAMERĂ, /room CAMERĂ text
+      /users, /info, /stats
+      /sleep SECUNDE        pauză (('sleep', secunde)), /quit oprește citirea (('quit', None))
+      {"type": ..., "data": ...}   mesaj trimis exact așa
+
+    Ridică ValueError pentru o linie invalidă.
+    """
+    if line.startswith('{'):
+        msg = json.loads(line)
+        if not isinstance(msg, dict) or not isinstance(msg.get('type'), str):
+            raise ValueError('mesajul JSON trebuie să aibă un câmp "type"')
+        data = msg.get('data', {})
+        if not isinstance(data, dict):
+            raise ValueError('câmpul "data" trebuie să fie un obiect JSON')
+        return msg['type'], data
+    if line.startswith('//'):
+        return 'broadcast', {'message': line[1:]}
+    if not line.startswith('/'):
+        return 'broadcast', {'message': line}
+
+    command, _, rest = line.partition(' ')
+    first, _, text = rest.strip().partition(' ')
+    if command == '/msg' and first and text:
+        return 'private', {'to': first, 'message': text}
+    if command == '/room' and first and text:
+        return 'room_message', {'room': first, 'message': text}
+    if command in ('/join', '/leave') and first:
+        return command[1:], {'room': first}
+    if command == '/sleep' and first:
+        return 'sleep', float(first)
+    simple = {'/users': 'list_users', '/info': 'my_info', '/stats': 'stats', '/quit': 'quit'}
+    if command in simple and not rest.strip():
+        return simple[command], ({} if command != '/quit' else None)
+    raise ValueError(f'comandă invalidă: {line}')
+
+
+def read_chunks(source):
+    """
+    Citește intrarea în bucăți de până la HEADLESS_CHUNK octeți și le dă ca
+    liste de linii complete; tot ce sosește deodată pleacă apoi deodată.
+    """
+    partial = b''
+    while True:
+        chunk = source.read1(HEADLESS_CHUNK)
+        if not chunk:
+            break
+        lines = (partial + chunk).split(b'\n')
+        partial = lines.pop()
+        yield [line.decode('utf-8', 'replace').rstrip('\r') for line in lines]
+    if partial:
+        yield [partial.decode('utf-8', 'replace').rstrip('\r')]
+
+
+def run_headless(source, window, linger):
+    """
+    Trimite liniile de intrare cât de repede acceptă serverul: cadrele unei
+    bucăți de intrare pleacă într-un singur sendall(), iar cererile cu
+    răspuns nu se așteaptă una pe alta (cel mult `window` în zbor).
+    Returnează numărul de mesaje trimise. O linie invalidă nu se trimite;
+    în locul ei apare pe stdout un mesaj de tip error, cu linia în "line".
+    """
+    frames = []
+    in_flight = collections.deque()
+    sent = 0
+    timeouts = 0
+    stop = False
+
+    def wait_oldest():
+        nonlocal timeouts
+        future = in_flight.popleft()
+        try:
+            future.result(timeout=REQUEST_TIMEOUT)
+        except concurrent.futures.TimeoutError:
+            # Serverul nu răspunde la orice (de exemplu peste limita de mesaje)
+            future.cancel()
+            timeouts += 1
+        except ConnectionError:
+            pass
+
+    for lines in read_chunks(source):
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                msg_type, data = parse_line(line)
+            except ValueError as e:
+                emit_line({'type': 'error', 'data': {'message': f'Linie ignorată: {e}', 'line': line}}, flush=True)
+                continue
+            if msg_type == 'quit':
+                stop = True
+                break
+            if msg_type == 'sleep':
+                send_frames(frames)
+                frames.clear()
+                time.sleep(data)
+                continue
+
+            if msg_type in REPLY_TYPES:
+                while in_flight and in_flight[0].done():
+                    in_flight.popleft()
+                if len(in_flight) >= window:
+                    # Fereastra e plină: ce am adunat trebuie să plece înainte să așteptăm răspunsuri
+                    send_frames(frames)
+                    frames.clear()
+                    wait_oldest()
+                data, future = prepare_request(data)
+                in_flight.append(future)
+            frames.append(encode_message(msg_type, data, encoding=encoding))
+            sent += 1
+            if len(frames) >= HEADLESS_BATCH_FRAMES:
+                send_frames(frames)
+                frames.clear()
+        send_frames(frames)
+        frames.clear()
+        if stop:
+            break
+
+    while in_flight:
+        wait_oldest()
+    time.sleep(linger)
+    if timeouts:
+        print(f"[INFO] {timeouts} cereri fără răspuns în {REQUEST_TIMEOUT} s.", file=status_output)
+    return sent
+
+
+def parse_args():
+    """Citește opțiunile din linia de comandă."""
+    parser = argparse.ArgumentParser(description='Client de chat TCP')
+    parser.add_argument('--host', default=HOST, help='adresa serverului')
+    parser.add_argument('--port', type=int, default=PORT, help='portul serverului')
+    parser.add_argument('--encoding', choices=ENCODINGS, default=JSON,
+                        help='codificarea mesajelor (binary este mai compactă)')
+    parser.add_argument('--compression', action='store_true',
+                        help='cere serverului compresie zlib pentru mesajele mari')
+    parser.add_argument('--headless', action='store_true',
+                        help='fără meniu: trimite liniile din --input și scrie mesajele primite pe stdout, '
+                             'ca NDJSON')
+    parser.add_argument('--nickname', help='nickname-ul (obligatoriu cu --headless)')
+    parser.add_argument('--input', default='-',
+                        help='fișierul citit în modul headless (implicit stdin)')
+    parser.add_argument('--window', type=int, default=HEADLESS_WINDOW,
+                        help='câte cereri cu răspuns pot fi în zbor în modul headless')
+    parser.add_argument('--linger', type=float, default=1.0,
+                        help='cât se mai primesc mesaje după sfârșitul intrării, în modul headless (s)')
+    args = parser.parse_args()
+    if args.headless and not args.nickname:
+        parser.error('--headless necesită --nickname')
+    if args.window < 1:
+        parser.error('--window trebuie să fie cel puțin 1')
+    return args
+
+
 def main():
-    global running
+    global running, encoding, compression, server_address, client_socket, registration
+    global message_handler, status_output
+    args = parse_args()
+    host, port = args.host, args.port
+    encoding = args.encoding
+    compression = args.compression
+    server_address = (host, port)
     client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    if args.headless:
+        message_handler = emit_message
+        status_output = sys.stderr
     
     try:
-        client_socket.connect((HOST, PORT))
-        print(f"[CONECTAT] Conectat la server {HOST}:{PORT}")
-        
-        # Cere nickname
-        nickname = input("Introdu nickname-ul tău: ").strip()
-        while not nickname:
-            nickname = input("Nickname-ul nu poate fi gol. Introdu nickname-ul: ").strip()
+        client_socket.connect((host, port))
+        print(f"[CONECTAT] Conectat la server {host}:{port}", file=status_output)
         
-        send_message(client_socket, 'register', {'nickname': nickname})
+        if args.headless:
+            registration = {'nickname': args.nickname, 'encoding': encoding, 'resumable': True}
+        else:
+            # Cere nickname
+            nickname = input("Introdu nickname-ul tău: ").strip()
+            while not nickname:
+                nickname = input("Nickname-ul nu poate fi gol. Introdu nickname-ul: ").strip()
+            registration = {'nickname': nickname, 'history': {'last': HISTORY_ON_JOIN}, 'encoding': encoding,
+                            'resumable': True, 'presence': True}
+        if compression:
+            registration['compression'] = ZLIB
         
         # Pornește thread-ul pentru primirea mesajelor
-        receive_thread = threading.Thread(target=receive_messages, args=(client_socket,))
+        receive_thread = threading.Thread(target=receive_messages)
         receive_thread.daemon = True
         receive_thread.start()
         
-        # Așteaptă puțin pentru confirmare
-        import time
-        time.sleep(0.5)
+        # Așteaptă confirmarea înregistrării (sau eroarea, dacă nickname-ul e ocupat)
+        response = wait_response(register())
+        if response is None or response['type'] != 'registered':
+            if args.headless:
+                raise SystemExit(1)
+            return
+        
+        if args.headless:
+            source = sys.stdin.buffer if args.input == '-' else open(args.input, 'rb')
+            start = time.perf_counter()
+            with source:
+                sent = run_headless(source, args.window, args.linger)
+            elapsed = time.perf_counter() - start - args.linger
+            print(f"[HEADLESS] {sent} mesaje trimise în {elapsed:.3f} s "
+                  f"({sent / max(elapsed, 1e-9):.0f} mesaje/s), {received} primite.", file=status_output)
+            return
         
         while running:
             show_menu()
             choice = input("> ").strip()
             
-            if choice == '1':
-                message = input("Mesaj pentru toți: ").strip()
-                if message:
-                    send_message(client_socket, 'broadcast', {'message': message})
-            
-            elif choice == '2':
-                # Mai întâi arată lista de utilizatori
-                send_message(client_socket, 'list_users', {})
-                import time
-                time.sleep(0.3)
-                
-                target = input("Către cine (nickname): ").strip()
-                if target:
-                    message = input("Mesaj privat: ").strip()
-                    if message:
-                        send_message(client_socket, 'private', {'to': target, 'message': message})
-            
-            elif choice == '3':
-                send_message(client_socket, 'list_users', {})
-            
-            elif choice == '4':
-                send_message(client_socket, 'my_info', {})
-            
-            elif choice == '5':
-                print("[INFO] Deconectare...")
-                running = False
-                break
-            
-            else:
-                print("[EROARE] Opțiune invalidă!")
+            try:
+                if not handle_choice(choice):
+                    break
+            except OSError as e:
+                # Conexiunea lipsește (thread-ul de primire încearcă să o refacă)
+                print(f"[EROARE] Mesajul nu a fost trimis: {e}")
     
     except ConnectionRefusedError:
-        print(f"[EROARE] Nu s-a putut conecta la server {HOST}:{PORT}")
-        print("[INFO] Asigură-te că serverul este pornit.")
+        print(f"[EROARE] Nu s-a putut conecta la server {host}:{port}", file=status_output)
+        print("[INFO] Asigură-te că serverul este pornit.", file=status_output)
     except KeyboardInterrupt:
-        print("\n[INFO] Deconectare...")
-        running = False
+        print("\n[INFO] Deconectare...", file=status_output)
     except Exception as e:
-        print(f"[EROARE] {e}")
+        print(f"[EROARE] {e}", file=status_output)
     finally:
         running = False
+        if session is not None:
+            # Ieșire voită: serverul nu mai păstrează sesiunea
+            try:
+                send_message('logout', {})
+            except OSError:
+                pass
         client_socket.close()
-        print("[DECONECTAT] Conexiunea a fost închisă.")
+        print("[DECONECTAT] Conexiunea a fost închisă.", file=status_output)
 
 
 if __name__ == "__main__":
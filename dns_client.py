@@ -4,17 +4,95 @@ Aplicație de tip client DNS
 - resolve <domain> - găsește IP-urile pentru un domeniu
 - resolve <ip> - găsește domeniile pentru un IP (reverse DNS)
 - use dns <ip> - schimbă serverul DNS utilizat
+- cache clear - golește cache-ul de rezolvări (status arată și statisticile lui)
+- resolve-file <cale> - rezolvă toate numele (sau IP-urile) dintr-un fișier
+
+Fără meniu, --resolve-file FIȘIER (sau - pentru stdin) rezolvă în masă:
+cel mult --window interogări UDP în zbor, reîncercate la timeout, cu
+rezultatele scrise pe măsură ce sosesc (CSV sau NDJSON) și un sumar al
+vitezei pe stderr. Interogările împart câteva socket-uri (--sockets);
+un răspuns e acceptat doar dacă vine de la server și se potrivește cu
+id-ul și întrebarea unei interogări în așteptare.
+
+Interogările anunță prin EDNS0 (RFC 6891) cât de mare poate fi un
+răspuns UDP (--edns-payload, 0 = fără EDNS). Un răspuns trunchiat (bitul
+TC) se cere din nou pe TCP, cu lungimea pe 2 octeți în față (RFC 7766),
+pe conexiuni păstrate deschise și refolosite pentru același server.
+
+Răspunsurile se păstrează în cache cât permite TTL-ul lor; "nu există"
+(NXDOMAIN sau un răspuns fără înregistrări) se păstrează cât spune
+minimul din SOA-ul zonei.
 """
 
+import argparse
+import asyncio
+import collections
+import csv
+import json
 import socket
 import struct
-import random
 import re
 import os
+import secrets
+import sys
+import time
+
+from dns_wire import TYPE_OPT, parse_answers
 
 # DNS server implicit (Google DNS)
 current_dns_server = None  # None = folosește DNS-ul sistemului
 
+# Comenzile interactive folosesc câte un QueryEngine pe server (server -> motor),
+# pe o buclă asyncio păstrată între comenzi, deci și socket-urile lui
+interactive_loop = None
+engines = {}
+
+# Cheia de cache pentru rezolvările făcute de sistem (fără TTL cunoscut)
+SYSTEM_RESOLVER = 'system'
+# Cât păstrăm un răspuns al sistemului, respectiv un "nu există" de la sistem (secunde)
+SYSTEM_TTL = 60
+SYSTEM_NEGATIVE_TTL = 30
+# Niciun răspuns nu stă în cache mai mult de atât, orice TTL ar avea (secunde)
+MAX_CACHE_TTL = 86400
+
+# Codurile de răspuns DNS care contează pentru cache
+RCODE_NOERROR = 0
+RCODE_NXDOMAIN = 3
+
+# Costul aproximativ al unei intrări în cache, pe lângă șirurile ei
+CACHE_ENTRY_OVERHEAD = 128
+
+DNS_PORT = 53
+
+# EDNS0: mărimea maximă a unui răspuns UDP anunțată serverului
+# (1232 evită fragmentarea IP pe aproape orice rută; 0 = fără EDNS)
+EDNS_PAYLOAD = 1232
+FLAG_TC = 0x0200
+# Câte conexiuni TCP deschide motorul în masă către un server, pentru răspunsurile trunchiate
+TCP_CONNECTIONS = 4
+
+# Rezolvarea în masă: interogări în zbor, timeout-ul unei încercări (s) și reîncercări
+BULK_WINDOW = 256
+BULK_TIMEOUT = 2.0
+BULK_RETRIES = 2
+BULK_CHUNK = 64 * 1024
+BULK_SOCKETS = 4
+# Bufferul de recepție al unui socket partajat: ține o rafală de răspunsuri
+BULK_RECEIVE_BUFFER = 1024 * 1024
+BULK_FORMATS = ('csv', 'ndjson')
+BULK_COLUMNS = ('name', 'type', 'status', 'results', 'ttl', 'ms', 'attempts', 'cached')
+
+# Comenzile interactive: socket-uri UDP, timeout-ul unei încercări (s) și reîncercări
+QUERY_SOCKETS = 2
+QUERY_TIMEOUT = 2.0
+QUERY_RETRIES = 2
+
+# Starea unui răspuns fără rezultate, după codul de răspuns (restul: "rcodeN")
+RCODE_STATUS = {RCODE_NOERROR: 'notfound', RCODE_NXDOMAIN: 'notfound', 2: 'servfail', 5: 'refused'}
+
+# Mărimea anunțată prin EDNS0 (--edns-payload)
+edns_payload = EDNS_PAYLOAD
+
 # Culori pentru terminal
 COLORS = {
     'red': '\033[91m',
@@ -74,6 +152,86 @@ def print_list_item(index, item):
     color_print(item, 'result')
 
 
+class ResolverCache:
+    """
+    Cache LRU pentru rezolvări, cheia fiind (nume, tip, server). O intrare
+    expiră după TTL-ul ei; când se depășește numărul de intrări sau bugetul
+    de octeți se elimină cea mai demult folosită.
+    """
+
+    def __init__(self, max_entries=1024, max_bytes=1024 * 1024, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.clock = clock
+        self.entries = collections.OrderedDict()   # cheie -> (expiră la, rezultate, mărime)
+        self.used_bytes = 0
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def get(self, key):
+        """Returnează (rezultate, secunde rămase) sau None dacă cheia lipsește ori a expirat."""
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires, results, _ = entry
+        remaining = expires - self.clock()
+        if remaining <= 0:
+            self._remove(key)
+            self.expired += 1
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        if not results:
+            self.negative_hits += 1
+        return results, remaining
+
+    def put(self, key, results, ttl):
+        """Păstrează rezultatele (o listă goală = răspuns negativ) timp de `ttl` secunde."""
+        ttl = min(ttl, MAX_CACHE_TTL)
+        if ttl <= 0 or self.max_entries <= 0:
+            return
+        size = CACHE_ENTRY_OVERHEAD + len(key[0]) + sum(len(result) for result in results)
+        if size > self.max_bytes:
+            return
+        if key in self.entries:
+            self._remove(key)
+        self.entries[key] = (self.clock() + ttl, list(results), size)
+        self.used_bytes += size
+        while len(self.entries) > self.max_entries or self.used_bytes > self.max_bytes:
+            self._remove(next(iter(self.entries)))
+            self.evicted += 1
+
+    def _remove(self, key):
+        _, _, size = self.entries.pop(key)
+        self.used_bytes -= size
+
+    def clear(self):
+        self.entries.clear()
+        self.used_bytes = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self.entries),
+            'bytes': self.used_bytes,
+            'hits': self.hits,
+            'negative_hits': self.negative_hits,
+            'misses': self.misses,
+            'expired': self.expired,
+            'evicted': self.evicted,
+            'hit_ratio': self.hits / lookups if lookups else 0.0,
+        }
+
+
+# Cache-ul comun tuturor rezolvărilor (limitele se pot schimba din linia de comandă)
+resolver_cache = ResolverCache()
+
+
 def is_valid_ip(address):
     """Verifică dacă adresa este un IP valid."""
     try:
@@ -88,18 +246,23 @@ def get_system_dns():
     return "DNS-ul sistemului"
 
 
-def build_dns_query(domain, query_type=1):
+def build_dns_query(domain, query_type=1, payload=None):
     """
     Construiește un pachet DNS query.
     query_type: 1 = A (IPv4), 12 = PTR (reverse)
+    payload: mărimea UDP anunțată prin EDNS0 (implicit edns_payload; 0 = fără OPT)
     """
+    if payload is None:
+        payload = edns_payload
+    
     # Header DNS
-    transaction_id = random.randint(0, 65535)
+    # Id-ul trebuie să fie greu de ghicit: împreună cu portul sursă apără de răspunsuri falsificate
+    transaction_id = secrets.randbits(16)
     flags = 0x0100  # Standard query, recursion desired
     questions = 1
     answer_rrs = 0
     authority_rrs = 0
-    additional_rrs = 0
+    additional_rrs = 1 if payload else 0
     
     header = struct.pack('>HHHHHH', transaction_id, flags, questions, 
                          answer_rrs, authority_rrs, additional_rrs)
@@ -113,112 +276,121 @@ def build_dns_query(domain, query_type=1):
     # Query type și class
     question += struct.pack('>HH', query_type, 1)  # Type și Class IN
     
-    return header + question, transaction_id
+    # OPT pseudo-record: nume rădăcină, tip 41, "clasa" = mărimea UDP, fără opțiuni
+    opt = b'\x00' + struct.pack('>HHIH', TYPE_OPT, payload, 0, 0) if payload else b''
+    
+    return header + question + opt, transaction_id
 
 
-def parse_dns_response(response, query_type):
-    """Parsează răspunsul DNS și extrage adresele."""
-    results = []
-    
-    # Header: 12 bytes
-    if len(response) < 12:
-        return results
-    
-    header = struct.unpack('>HHHHHH', response[:12])
-    answer_count = header[3]
-    
-    # Sari peste header și question section
-    offset = 12
-    
-    # Sari peste question section
-    while offset < len(response) and response[offset] != 0:
+def skip_domain_name(response, offset):
+    """Returnează offset-ul de după un nume de domeniu (etichete, terminate cu 0 sau cu un pointer)."""
+    while offset < len(response):
         length = response[offset]
+        if length == 0:
+            return offset + 1
         if length >= 192:  # Pointer
-            offset += 2
-            break
+            return offset + 2
         offset += length + 1
-    else:
-        offset += 1  # Null terminator
-    
-    offset += 4  # Query type și class
-    
-    # Parsează answer section
-    for _ in range(answer_count):
-        if offset >= len(response):
-            break
-        
-        # Name (poate fi pointer)
-        if response[offset] >= 192:
-            offset += 2
-        else:
-            while offset < len(response) and response[offset] != 0:
-                offset += response[offset] + 1
-            offset += 1
-        
-        if offset + 10 > len(response):
-            break
-        
-        rtype, rclass, ttl, rdlength = struct.unpack('>HHIH', response[offset:offset+10])
-        offset += 10
-        
-        if offset + rdlength > len(response):
-            break
-        
-        rdata = response[offset:offset+rdlength]
-        offset += rdlength
-        
-        if rtype == 1 and rdlength == 4:  # A record (IPv4)
-            ip = '.'.join(str(b) for b in rdata)
-            results.append(ip)
-        elif rtype == 12:  # PTR record
-            # Parsează numele de domeniu
-            name = parse_domain_name(response, offset - rdlength)
-            if name:
-                results.append(name)
-    
-    return results
+    return offset
 
 
-def parse_domain_name(response, offset):
-    """Parsează un nume de domeniu din răspunsul DNS."""
-    parts = []
-    visited = set()
-    
-    while offset < len(response):
-        if offset in visited:
-            break
-        visited.add(offset)
-        
-        length = response[offset]
-        
-        if length == 0:
-            break
-        elif length >= 192:  # Pointer
-            if offset + 1 >= len(response):
-                break
-            pointer = ((length & 0x3F) << 8) | response[offset + 1]
-            return parse_domain_name(response, pointer)
-        else:
-            offset += 1
-            if offset + length > len(response):
-                break
-            parts.append(response[offset:offset+length].decode('utf-8', errors='ignore'))
-            offset += length
-    
-    return '.'.join(parts) if parts else None
+def parse_dns_response_ttl(response, query_type):
+    """
+    Parsează răspunsul DNS; returnează (rezultate, ttl). Rezultatele sunt
+    valorile înregistrărilor de tipul cerut din answer section. ttl este cel
+    mai mic TTL al înregistrărilor din răspuns sau, dacă numele nu există ori
+    nu are înregistrări de tipul cerut, TTL-ul negativ din SOA (minimul dintre
+    TTL-ul SOA și câmpul minimum). ttl este None când răspunsul nu trebuie
+    păstrat. Un răspuns invalid ridică dns_wire.WireError.
+    """
+    rcode, results, ttl = parse_answers(response, query_type)
+    if not results and rcode not in (RCODE_NOERROR, RCODE_NXDOMAIN):
+        # SERVFAIL, REFUSED etc. nu spun nimic despre nume
+        return results, None
+    return results, ttl
 
 
-def resolve_with_custom_dns(query, dns_server):
-    """Trimite query DNS către un server specific."""
-    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-    sock.settimeout(5)
-    
+def parse_dns_response(response, query_type):
+    """Parsează răspunsul DNS și extrage adresele."""
+    return parse_answers(response, query_type, negative=False)[1]
+
+
+def question_section(message):
+    """Secțiunea de întrebare a unui mesaj DNS (nume, tip, clasă), cu numele în litere mici."""
+    return bytes(message[12:skip_domain_name(message, 12) + 4]).lower()
+
+
+def reply_matches(response, transaction_id, question):
+    """Verifică dacă `response` este răspunsul interogării cu id-ul și întrebarea date."""
+    return (len(response) >= 12 and response[2] & 0x80
+            and struct.unpack('>H', response[:2])[0] == transaction_id
+            and question_section(response) == question)
+
+
+def truncated(response):
+    """Bitul TC: răspunsul nu a încăput în datagramă și trebuie cerut pe TCP."""
+    return struct.unpack('>H', response[2:4])[0] & FLAG_TC != 0
+
+
+def query_engine(dns_server):
+    """Motorul comenzilor interactive pentru server, deschis la prima folosire."""
+    global interactive_loop
+    if interactive_loop is None:
+        interactive_loop = asyncio.new_event_loop()
+    engine = engines.get(dns_server)
+    if engine is None:
+        engine = QueryEngine(dns_server, QUERY_SOCKETS, tcp_connections=1)
+        interactive_loop.run_until_complete(engine.open())
+        engines[dns_server] = engine
+    return engine
+
+
+def resolve_with_custom_dns(name, query_type, dns_server, timeout=QUERY_TIMEOUT, retries=QUERY_RETRIES):
+    """
+    Întreabă un server specific prin QueryEngine-ul lui și returnează
+    răspunsul. Răspunsurile care nu vin de la server sau nu se potrivesc cu
+    id-ul și întrebarea (întârziate, falsificate) sunt ignorate; un răspuns
+    trunchiat se cere din nou pe TCP. Ridică asyncio.TimeoutError sau
+    TcpTimeout dacă serverul nu răspunde.
+    """
+    engine = query_engine(dns_server)
+    response, _ = interactive_loop.run_until_complete(engine.query(name, query_type, timeout, retries))
+    return response
+
+
+def cache_key(name, query_type):
+    """Cheia de cache: numele normalizat, tipul și serverul DNS curent."""
+    return name.lower().rstrip('.'), query_type, current_dns_server or SYSTEM_RESOLVER
+
+
+def cached_results(key):
+    """Returnează rezultatele din cache (anunțând asta) sau None."""
+    cached = resolver_cache.get(key)
+    if cached is None:
+        return None
+    results, remaining = cached
+    color_print(f"ℹ  Din cache (mai e valabil {remaining:.0f} s)", 'info')
+    return results
+
+
+def query_custom_dns(name, query_type):
+    """Întreabă serverul DNS personalizat și păstrează răspunsul cât permite TTL-ul lui."""
+    key = cache_key(name, query_type)
+    results = cached_results(key)
+    if results is not None:
+        return results
     try:
-        sock.sendto(query, (dns_server, 53))
-        response, _ = sock.recvfrom(512)
-        return response
-    finally:
-        sock.close()
+        response = resolve_with_custom_dns(name, query_type, current_dns_server)
+        results, ttl = parse_dns_response_ttl(response, query_type)
+    except (asyncio.TimeoutError, TcpTimeout):
+        color_print(f"✗ EROARE: Timeout la conectarea cu DNS server {current_dns_server}", 'error')
+        return []
+    except Exception as e:
+        color_print(f"✗ EROARE: {e}", 'error')
+        return []
+    if ttl is not None:
+        resolver_cache.put(key, results, ttl)
+    return results
 
 
 def resolve_domain(domain):
@@ -227,24 +399,27 @@ def resolve_domain(domain):
     
     if current_dns_server:
         # Folosește DNS-ul personalizat
-        try:
-            query, _ = build_dns_query(domain, query_type=1)
-            response = resolve_with_custom_dns(query, current_dns_server)
-            return parse_dns_response(response, query_type=1)
-        except socket.timeout:
-            color_print(f"✗ EROARE: Timeout la conectarea cu DNS server {current_dns_server}", 'error')
-            return []
-        except Exception as e:
-            color_print(f"✗ EROARE: {e}", 'error')
-            return []
-    else:
-        # Folosește DNS-ul sistemului
-        try:
-            _, _, ip_list = socket.gethostbyname_ex(domain)
-            return ip_list
-        except socket.gaierror as e:
-            color_print(f"✗ EROARE: Nu s-a putut rezolva domeniul: {e}", 'error')
-            return []
+        return query_custom_dns(domain, 1)
+    
+    # Folosește DNS-ul sistemului (TTL-ul nu se cunoaște: îl păstrăm SYSTEM_TTL)
+    key = cache_key(domain, 1)
+    ip_list = cached_results(key)
+    if ip_list is not None:
+        return ip_list
+    try:
+        _, _, ip_list = socket.gethostbyname_ex(domain)
+        resolver_cache.put(key, ip_list, SYSTEM_TTL)
+        return ip_list
+    except socket.gaierror as e:
+        if e.errno == socket.EAI_NONAME:
+            resolver_cache.put(key, [], SYSTEM_NEGATIVE_TTL)
+        color_print(f"✗ EROARE: Nu s-a putut rezolva domeniul: {e}", 'error')
+        return []
+
+
+def reverse_name(ip_address):
+    """Numele PTR al unui IPv4: 1.2.3.4 -> 4.3.2.1.in-addr.arpa."""
+    return '.'.join(reversed(ip_address.split('.'))) + '.in-addr.arpa'
 
 
 def resolve_ip(ip_address):
@@ -252,29 +427,360 @@ def resolve_ip(ip_address):
     global current_dns_server
     
     # Construiește adresa PTR (reverse)
-    parts = ip_address.split('.')
-    ptr_domain = '.'.join(reversed(parts)) + '.in-addr.arpa'
+    ptr_domain = reverse_name(ip_address)
     
     if current_dns_server:
         # Folosește DNS-ul personalizat
+        return query_custom_dns(ptr_domain, 12)
+    
+    # Folosește DNS-ul sistemului
+    key = cache_key(ptr_domain, 12)
+    hostnames = cached_results(key)
+    if hostnames is not None:
+        return hostnames
+    try:
+        hostname, _, _ = socket.gethostbyaddr(ip_address)
+        resolver_cache.put(key, [hostname], SYSTEM_TTL)
+        return [hostname]
+    except socket.herror as e:
+        resolver_cache.put(key, [], SYSTEM_NEGATIVE_TTL)
+        color_print(f"✗ EROARE: Nu s-a putut rezolva IP-ul: {e}", 'error')
+        return []
+
+
+def system_nameserver():
+    """Primul server DNS IPv4 din /etc/resolv.conf, pentru interogările directe."""
+    try:
+        with open('/etc/resolv.conf') as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) >= 2 and fields[0] == 'nameserver' and is_valid_ip(fields[1]):
+                    return fields[1]
+    except OSError:
+        pass
+    return None
+
+
+class TcpTimeout(Exception):
+    """
+    Răspunsul UDP a venit, dar trunchiat, iar reluarea lui pe TCP a expirat.
+    `attempts` sunt încercările UDP făcute până la răspuns.
+    """
+
+    def __init__(self, attempts):
+        super().__init__(attempts)
+        self.attempts = attempts
+
+
+class EngineProtocol(asyncio.DatagramProtocol):
+    """Un socket din grupul unui QueryEngine; datagramele primite merg la motor."""
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    def datagram_received(self, data, addr):
+        self.engine.receive(data, addr)
+
+    def error_received(self, exc):
+        # ICMP (port închis etc.) nu spune cărei interogări îi aparține: o lăsăm să expire
+        self.engine.errors += 1
+
+
+class TcpPool:
+    """
+    Conexiunile TCP ale unui QueryEngine către server, pentru răspunsurile
+    trunchiate: cel mult `size` deschise, fiecare cu câte o interogare pe
+    rând, iar cele libere sunt refolosite de următoarele interogări.
+    """
+
+    def __init__(self, address, size=TCP_CONNECTIONS):
+        self.address = address
+        self.slots = asyncio.Semaphore(size)
+        self.idle = []          # (reader, writer) libere
+        self.connects = 0
+        self.reused = 0
+
+    async def query(self, query, timeout):
+        """Trimite query-ul pe o conexiune (liberă sau nouă) și returnează răspunsul."""
+        transaction_id = struct.unpack('>H', query[:2])[0]
+        question = question_section(query)
+        async with self.slots:
+            while True:
+                reused = bool(self.idle)
+                if reused:
+                    reader, writer = self.idle.pop()
+                    self.reused += 1
+                else:
+                    reader, writer = await asyncio.wait_for(asyncio.open_connection(*self.address), timeout)
+                    self.connects += 1
+                try:
+                    writer.write(struct.pack('>H', len(query)) + query)
+                    length = struct.unpack('>H', await asyncio.wait_for(reader.readexactly(2), timeout))[0]
+                    response = await asyncio.wait_for(reader.readexactly(length), timeout)
+                except asyncio.TimeoutError:
+                    writer.close()
+                    raise
+                except (OSError, asyncio.IncompleteReadError):
+                    writer.close()
+                    # Serverul a închis între timp conexiunea liberă: încă o dată pe una nouă
+                    if reused:
+                        continue
+                    raise
+                if not reply_matches(response, transaction_id, question):
+                    writer.close()
+                    raise ValueError('răspuns TCP care nu corespunde interogării')
+                self.idle.append((reader, writer))
+                return response
+
+    def close(self):
+        for _, writer in self.idle:
+            writer.close()
+        self.idle = []
+
+
+class QueryEngine:
+    """
+    Interogările în zbor către un server împart un grup mic de socket-uri
+    UDP, deschise o singură dată (porturile sursă le alege aleator
+    sistemul). Un răspuns e potrivit cu interogarea după id, întrebare și
+    adresa serverului; timeout-ul fiecărei încercări e un timer al buclei
+    asyncio, nu un recvfrom blocant. Răspunsurile trunchiate se cer din nou
+    prin TcpPool.
+    """
+
+    def __init__(self, server, sockets=BULK_SOCKETS, port=DNS_PORT, tcp_connections=TCP_CONNECTIONS):
+        self.address = (server, port)
+        self.sockets = sockets
+        self.transports = []
+        self.pending = {}       # id -> (întrebare, future)
+        self.tcp = TcpPool(self.address, tcp_connections)
+        self.mismatched = 0
+        self.truncated = 0
+        self.errors = 0
+
+    async def open(self):
+        loop = asyncio.get_running_loop()
+        for _ in range(self.sockets):
+            transport, _ = await loop.create_datagram_endpoint(
+                lambda: EngineProtocol(self), remote_addr=self.address)
+            transport.get_extra_info('socket').setsockopt(
+                socket.SOL_SOCKET, socket.SO_RCVBUF, BULK_RECEIVE_BUFFER)
+            self.transports.append(transport)
+
+    def close(self):
+        for transport in self.transports:
+            transport.close()
+        self.transports = []
+        self.tcp.close()
+
+    async def query(self, name, query_type, timeout, retries):
+        """
+        Trimite interogarea și o retrimite după fiecare timeout, de cel mult
+        `retries` ori; un răspuns trunchiat se cere din nou pe TCP.
+        Returnează (răspuns, încercări); după ultima încercare ridică
+        asyncio.TimeoutError, iar dacă reluarea pe TCP expiră, TcpTimeout.
+        """
+        # Id-ul trebuie să fie unic printre interogările în așteptare
+        query, transaction_id = build_dns_query(name, query_type=query_type)
+        while transaction_id in self.pending:
+            query, transaction_id = build_dns_query(name, query_type=query_type)
+        future = asyncio.get_running_loop().create_future()
+        self.pending[transaction_id] = (question_section(query), future)
         try:
-            query, _ = build_dns_query(ptr_domain, query_type=12)
-            response = resolve_with_custom_dns(query, current_dns_server)
-            return parse_dns_response(response, query_type=12)
-        except socket.timeout:
-            color_print(f"✗ EROARE: Timeout la conectarea cu DNS server {current_dns_server}", 'error')
-            return []
-        except Exception as e:
-            color_print(f"✗ EROARE: {e}", 'error')
-            return []
-    else:
-        # Folosește DNS-ul sistemului
+            for attempt in range(1, retries + 2):
+                secrets.choice(self.transports).sendto(query)
+                try:
+                    response = await asyncio.wait_for(asyncio.shield(future), timeout)
+                    break
+                except asyncio.TimeoutError:
+                    if attempt > retries:
+                        raise
+        finally:
+            del self.pending[transaction_id]
+        if truncated(response):
+            self.truncated += 1
+            try:
+                response = await self.tcp.query(query, timeout)
+            except asyncio.TimeoutError:
+                raise TcpTimeout(attempt) from None
+        return response, attempt
+
+    def receive(self, data, addr):
+        """Completează interogarea căreia îi aparține răspunsul; restul se numără și se ignoră."""
+        entry = self.pending.get(struct.unpack('>H', data[:2])[0]) if len(data) >= 12 else None
         try:
-            hostname, _, _ = socket.gethostbyaddr(ip_address)
-            return [hostname]
-        except socket.herror as e:
-            color_print(f"✗ EROARE: Nu s-a putut rezolva IP-ul: {e}", 'error')
-            return []
+            matches = (entry is not None and not entry[1].done() and addr[:2] == self.address
+                       and reply_matches(data, struct.unpack('>H', data[:2])[0], entry[0]))
+        except IndexError:
+            matches = False
+        if matches:
+            entry[1].set_result(data)
+        else:
+            self.mismatched += 1
+
+
+def bulk_row(name):
+    """Rândul de rezultat, încă gol, pentru un nume (sau un IP) din modul în masă."""
+    return {'name': name, 'type': 'PTR' if is_valid_ip(name) else 'A', 'status': 'ok', 'results': [],
+            'ttl': None, 'ms': 0.0, 'attempts': 0, 'cached': False}
+
+
+async def bulk_lookup(name, engine, timeout, retries, inflight):
+    """Rezolvă un nume (sau un IP, prin PTR) pentru modul în masă; returnează rândul de rezultat."""
+    query_type, query_name = (12, reverse_name(name)) if is_valid_ip(name) else (1, name)
+    row = bulk_row(name)
+    key = (query_name.lower().rstrip('.'), query_type, engine.address[0])
+    start = time.perf_counter()
+
+    cached = resolver_cache.get(key)
+    if cached is None and key in inflight:
+        # Același nume e deja în zbor: așteptăm răspunsul lui în loc să întrebăm din nou
+        await asyncio.shield(inflight[key])
+        cached = resolver_cache.get(key)
+    if cached is not None:
+        results, remaining = cached
+        row.update(results=results, ttl=int(remaining), cached=True,
+                   status='ok' if results else 'notfound')
+        return row
+
+    done = inflight[key] = asyncio.get_running_loop().create_future()
+    try:
+        response, row['attempts'] = await engine.query(query_name, query_type, timeout, retries)
+        results, ttl = parse_dns_response_ttl(response, query_type)
+        if ttl is not None:
+            resolver_cache.put(key, results, ttl)
+        rcode = response[3] & 0x0F
+        row.update(results=results, ttl=ttl,
+                   status='ok' if results else RCODE_STATUS.get(rcode, f'rcode{rcode}'))
+    except asyncio.TimeoutError:
+        row.update(status='timeout', attempts=retries + 1)
+    except TcpTimeout as e:
+        row.update(status='tcp_timeout', attempts=e.attempts)
+    except (OSError, EOFError, ValueError, UnicodeError) as e:
+        # EOFError: serverul a închis conexiunea TCP înainte de răspuns (IncompleteReadError)
+        row.update(status='error', results=[str(e)])
+    finally:
+        del inflight[key]
+        done.set_result(None)
+    row['ms'] = round((time.perf_counter() - start) * 1000, 2)
+    return row
+
+
+def write_row(output, writer, row):
+    """Scrie un rând de rezultat (writer = csv.writer sau None pentru NDJSON)."""
+    if writer is None:
+        output.write(json.dumps(row) + '\n')
+    else:
+        writer.writerow([' '.join(row['results']) if column == 'results' else
+                         ('' if row[column] is None else row[column]) for column in BULK_COLUMNS])
+    output.flush()
+
+
+async def resolve_bulk(source, output, server, output_format='csv', window=BULK_WINDOW,
+                       timeout=BULK_TIMEOUT, retries=BULK_RETRIES, sockets=BULK_SOCKETS,
+                       tcp_connections=TCP_CONNECTIONS):
+    """
+    Rezolvă câte un nume (sau IP) de pe fiecare linie din `source` (fișier
+    binar), cu cel mult `window` interogări în zbor pe `sockets` socket-uri,
+    și scrie rezultatele în `output` în ordinea în care se termină.
+    Returnează statisticile rulării.
+    """
+    loop = asyncio.get_running_loop()
+    engine = QueryEngine(server, sockets, tcp_connections=tcp_connections)
+    await engine.open()
+    writer = csv.writer(output) if output_format == 'csv' else None
+    if writer is not None:
+        writer.writerow(BULK_COLUMNS)
+    slots = asyncio.Semaphore(window)
+    inflight = {}
+    tasks = {}      # task -> numele rezolvat
+    stats = collections.Counter()
+    latencies = []
+
+    def finished(task):
+        name = tasks.pop(task)
+        slots.release()
+        if task.cancelled():
+            row = dict(bulk_row(name), status='error', results=['anulat'])
+        elif task.exception() is not None:
+            # O eroare neprevăzută pierde doar rândul ei, nu și numărătoarea
+            error = task.exception()
+            row = dict(bulk_row(name), status='error', results=[str(error) or type(error).__name__])
+        else:
+            row = task.result()
+        stats[row['status']] += 1
+        stats['retries'] += max(0, row['attempts'] - 1)
+        if row['cached']:
+            stats['cached'] += 1
+        elif row['attempts']:
+            latencies.append(row['ms'])
+        write_row(output, writer, row)
+
+    start = time.perf_counter()
+    partial = b''
+    try:
+        while True:
+            # Citirea intrării nu blochează bucla (stdin poate veni încet, dintr-un pipe)
+            chunk = await loop.run_in_executor(None, source.read1, BULK_CHUNK)
+            lines = (partial + chunk).split(b'\n')
+            partial = lines.pop() if chunk else b''
+            for line in lines:
+                name = line.decode('utf-8', 'replace').strip()
+                if not name or name.startswith('#'):
+                    continue
+                await slots.acquire()
+                task = asyncio.create_task(bulk_lookup(name, engine, timeout, retries, inflight))
+                tasks[task] = name
+                task.add_done_callback(finished)
+                stats['names'] += 1
+            if not chunk:
+                break
+        while tasks:
+            await asyncio.wait(set(tasks))
+    finally:
+        engine.close()
+
+    stats['mismatched'] = engine.mismatched
+    stats['truncated'] = engine.truncated
+    stats['tcp_connects'] = engine.tcp.connects
+    stats['elapsed'] = time.perf_counter() - start
+    latencies.sort()
+    for label, fraction in (('p50_ms', 0.5), ('p99_ms', 0.99)):
+        stats[label] = latencies[min(len(latencies) - 1, int(len(latencies) * fraction))] if latencies else 0
+    return stats
+
+
+def report_bulk(stats, server):
+    """Sumarul unei rezolvări în masă, pe stderr (stdout poate fi chiar rezultatul)."""
+    names, elapsed = stats['names'], stats['elapsed']
+    statuses = ', '.join(f"{status}: {count}" for status, count in sorted(stats.items())
+                         if status in ('ok', 'notfound', 'timeout', 'tcp_timeout', 'error', 'servfail', 'refused')
+                         or status.startswith('rcode'))
+    print(f"[BULK] {names} nume prin {server} în {elapsed:.2f} s ({names / max(elapsed, 1e-9):.0f} nume/s); "
+          f"{statuses}; din cache: {stats['cached']}, reîncercări: {stats['retries']}, "
+          f"răspunsuri ignorate: {stats['mismatched']}, "
+          f"trunchiate: {stats['truncated']} (conexiuni TCP: {stats['tcp_connects']}), "
+          f"latență p50 {stats['p50_ms']} ms, p99 {stats['p99_ms']} ms", file=sys.stderr)
+
+
+def run_bulk(path, output, **options):
+    """
+    Rezolvă numele din fișierul `path` (sau stdin pentru '-'); opțiunile
+    merg la resolve_bulk. Returnează False la o eroare.
+    """
+    server = current_dns_server or system_nameserver()
+    if server is None:
+        color_print("✗ EROARE: Niciun server DNS (folosește use dns <ip> sau --server)", 'error')
+        return False
+    try:
+        source = sys.stdin.buffer if path == '-' else open(path, 'rb')
+    except OSError as e:
+        color_print(f"✗ EROARE: {e}", 'error')
+        return False
+    with source:
+        stats = asyncio.run(resolve_bulk(source, output, server, **options))
+    report_bulk(stats, server)
+    return True
 
 
 def handle_resolve(argument):
@@ -320,7 +826,9 @@ def show_help():
         ("resolve <ip>", "Găsește domeniile pentru un IP (reverse DNS)"),
         ("use dns <ip>", "Schimbă serverul DNS utilizat"),
         ("use dns system", "Revine la DNS-ul sistemului"),
-        ("status", "Afișează DNS-ul curent utilizat"),
+        ("status", "Afișează DNS-ul curent utilizat și statisticile cache-ului"),
+        ("cache clear", "Golește cache-ul de rezolvări"),
+        ("resolve-file <cale>", "Rezolvă toate numele dintr-un fișier (CSV pe ecran)"),
         ("help", "Afișează acest ajutor"),
         ("exit", "Ieșire din aplicație")
     ]
@@ -351,10 +859,74 @@ def show_status():
     else:
         print_result("DNS Server", "DNS-ul sistemului")
         color_print("ℹ  Se utilizează DNS-ul configurat în sistem", 'info')
+    print_result("EDNS0", f"răspunsuri UDP de până la {edns_payload} octeți" if edns_payload else "dezactivat")
+    print_result("Conexiuni TCP păstrate", ', '.join(server for server, engine in engines.items() if engine.tcp.idle)
+                 or "niciuna")
+    
+    stats = resolver_cache.stats()
+    print_section("🗄  CACHE")
+    print_result("Intrări", f"{stats['entries']} / {resolver_cache.max_entries} "
+                            f"({stats['bytes']} / {resolver_cache.max_bytes} octeți)")
+    print_result("Hit-uri", f"{stats['hits']} (din care negative: {stats['negative_hits']}), "
+                            f"rată {stats['hit_ratio']:.1%}")
+    print_result("Miss-uri", f"{stats['misses']} (din care expirate: {stats['expired']})")
+    print_result("Eliminate (LRU)", str(stats['evicted']))
+
+
+def parse_args():
+    """Citește opțiunile din linia de comandă."""
+    parser = argparse.ArgumentParser(description='Client DNS interactiv')
+    parser.add_argument('--cache-entries', type=int, default=resolver_cache.max_entries,
+                        help='câte rezolvări se păstrează în cache (0 = fără cache)')
+    parser.add_argument('--cache-bytes', type=int, default=resolver_cache.max_bytes,
+                        help='memoria maximă a cache-ului, în octeți')
+    parser.add_argument('--server', help='serverul DNS folosit (implicit DNS-ul sistemului)')
+    parser.add_argument('--resolve-file', metavar='FIȘIER',
+                        help='fără meniu: rezolvă câte un nume sau IP pe linie din FIȘIER (- = stdin)')
+    parser.add_argument('--format', choices=BULK_FORMATS, default='csv',
+                        help='formatul rezultatelor pentru --resolve-file')
+    parser.add_argument('--output', default='-', help='unde se scriu rezultatele (implicit stdout)')
+    parser.add_argument('--window', type=int, default=BULK_WINDOW,
+                        help='câte interogări pot fi în zbor simultan')
+    parser.add_argument('--timeout', type=float, default=BULK_TIMEOUT,
+                        help='cât se așteaptă răspunsul unei încercări (s)')
+    parser.add_argument('--retries', type=int, default=BULK_RETRIES,
+                        help='de câte ori se retrimite o interogare fără răspuns')
+    parser.add_argument('--sockets', type=int, default=BULK_SOCKETS,
+                        help='câte socket-uri UDP împart interogările în zbor')
+    parser.add_argument('--tcp-connections', type=int, default=TCP_CONNECTIONS,
+                        help='câte conexiuni TCP se pot deschide pentru răspunsurile trunchiate')
+    parser.add_argument('--edns-payload', type=int, default=EDNS_PAYLOAD,
+                        help='mărimea maximă a unui răspuns UDP anunțată prin EDNS0 (0 = fără EDNS)')
+    args = parser.parse_args()
+    if args.server is not None and not is_valid_ip(args.server):
+        parser.error(f"'{args.server}' nu este o adresă IP validă")
+    if args.window < 1:
+        parser.error('--window trebuie să fie cel puțin 1')
+    if args.sockets < 1:
+        parser.error('--sockets trebuie să fie cel puțin 1')
+    if args.tcp_connections < 1:
+        parser.error('--tcp-connections trebuie să fie cel puțin 1')
+    if args.edns_payload and not 512 <= args.edns_payload <= 65535:
+        parser.error('--edns-payload trebuie să fie 0 sau între 512 și 65535')
+    return args
 
 
 def main():
-    global current_dns_server
+    global current_dns_server, edns_payload
+    args = parse_args()
+    resolver_cache.max_entries = args.cache_entries
+    resolver_cache.max_bytes = args.cache_bytes
+    current_dns_server = args.server
+    edns_payload = args.edns_payload
+    
+    if args.resolve_file:
+        output = sys.stdout if args.output == '-' else open(args.output, 'w', newline='')
+        with output:
+            ok = run_bulk(args.resolve_file, output, output_format=args.format, window=args.window,
+                          timeout=args.timeout, retries=args.retries, sockets=args.sockets,
+                          tcp_connections=args.tcp_connections)
+        sys.exit(0 if ok else 1)
     
     print_header("🌍 APLICAȚIE CLIENT DNS")
     color_print("📝 Tastează 'help' pentru lista de comenzi.", 'info')
@@ -380,12 +952,25 @@ def main():
             elif cmd == 'status':
                 show_status()
             
+            elif cmd == 'cache':
+                if len(parts) == 2 and parts[1].lower() == 'clear':
+                    resolver_cache.clear()
+                    color_print("✓ Cache-ul a fost golit", 'success')
+                else:
+                    color_print("✗ EROARE: Utilizare: cache clear (statisticile apar în status)", 'error')
+            
             elif cmd == 'resolve':
                 if len(parts) < 2:
                     color_print("✗ EROARE: Utilizare: resolve <domain> sau resolve <ip>", 'error')
                 else:
                     handle_resolve(parts[1])
             
+            elif cmd == 'resolve-file':
+                if len(parts) < 2:
+                    color_print("✗ EROARE: Utilizare: resolve-file <cale>", 'error')
+                else:
+                    run_bulk(parts[1], sys.stdout)
+            
             elif cmd == 'use':
                 if len(parts) < 3 or parts[1].lower() != 'dns':
                     color_print("✗ EROARE: Utilizare: use dns <ip> sau use dns system", 'error')
@@ -0,0 +1,377 @@
+"""
+Parserul mesajelor DNS (RFC 1035) pentru dns_client.
+
+Mesajul este citit printr-un memoryview, cu layout-uri struct
+precompilate și unpack_from, deci câmpurile nu sunt copiate în bytes
+intermediare. Etichetele consecutive ale unui nume se decodează dintr-o
+dată, iar numele comprimate (pointeri către un nume apărut mai devreme)
+se rezolvă printr-un memo al mesajului: offset -> nume, completat doar la
+începutul fiecărui nume citit (inclusiv al celor la care duce un pointer),
+așa că un nume fără pointeri costă o singură scriere în memo, iar ținta
+unui pointer se decodează o singură dată. Un pointer trebuie să arate
+înaintea numelui din care face parte, deci un mesaj construit cu bucle
+nu poate bloca parserul.
+
+parse_message() returnează un dict cu id, flags, rcode, questions
+(nume, tip, clasă) și secțiunile answers, authority și additional, ale
+căror înregistrări sunt tupluri (nume, tip, clasă, ttl, valoare).
+Valoarea depinde de tip:
+
+  A, AAAA            adresa, ca șir
+  CNAME, NS, PTR     numele
+  MX                 (preferință, nume)
+  TXT                tuplul șirurilor
+  SOA                (mname, rname, serial, refresh, retry, expire, minimum)
+  SRV                (prioritate, pondere, port, țintă)
+  altele (și OPT)    octeții RDATA, ca bytes
+
+parse_answers() este varianta pentru rezolvare: citește doar ce trebuie
+pentru rezultatul unei interogări (vezi docstring-ul ei) și este mai
+rapidă decât parse_message pe răspunsurile obișnuite.
+
+Un mesaj trunchiat sau invalid ridică WireError.
+"""
+
+import socket
+import struct
+
+TYPE_A = 1
+TYPE_NS = 2
+TYPE_CNAME = 5
+TYPE_SOA = 6
+TYPE_PTR = 12
+TYPE_MX = 15
+TYPE_TXT = 16
+TYPE_AAAA = 28
+TYPE_SRV = 33
+TYPE_OPT = 41
+
+TYPE_NAMES = {TYPE_A: 'A', TYPE_NS: 'NS', TYPE_CNAME: 'CNAME', TYPE_SOA: 'SOA', TYPE_PTR: 'PTR',
+              TYPE_MX: 'MX', TYPE_TXT: 'TXT', TYPE_AAAA: 'AAAA', TYPE_SRV: 'SRV', TYPE_OPT: 'OPT'}
+
+# Layout-uri precompilate
+HEADER = struct.Struct('>HHHHHH')
+QUESTION = struct.Struct('>HH')
+RECORD = struct.Struct('>HHIH')
+U16 = struct.Struct('>H')
+SOA_FIELDS = struct.Struct('>IIIII')
+SRV_FIELDS = struct.Struct('>HHH')
+IPV4 = struct.Struct('>BBBB')
+
+POINTER = 0xC0
+MAX_LABEL = 63
+# Un nume are cel mult 255 de octeți, deci cel mult atâtea salturi utile
+MAX_NAME = 255
+MAX_POINTERS = 127
+DOT = ord('.')
+
+
+class WireError(ValueError):
+    """Mesaj DNS trunchiat sau invalid."""
+
+
+def read_name(view, offset, names, depth=0):
+    """
+    Citește numele de la `offset`; returnează (nume, offset-ul de după el).
+    `names` este memo-ul mesajului (offset -> nume), folosit și completat.
+    """
+    # O singură copie (un nume are cel mult MAX_NAME octeți), în care lungimile devin puncte
+    run = bytearray(view[offset:offset + MAX_NAME + 1])
+    limit = len(run)
+    if not limit:
+        raise WireError(f"Nume trunchiat la offset-ul {offset}")
+    position = 0
+    length = run[0]
+    while 0 < length <= MAX_LABEL:
+        run[position] = DOT
+        position += length + 1
+        if position >= limit:
+            if limit > MAX_NAME:
+                raise WireError(f"Nume prea lung la offset-ul {offset}")
+            if position > limit:
+                raise WireError(f"Etichetă trunchiată în numele de la offset-ul {offset}")
+            raise WireError(f"Nume trunchiat la offset-ul {offset}")
+        length = run[position]
+    if length == 0:
+        suffix = ''
+        end = position + 1
+    elif length >= POINTER:
+        if position + 1 >= limit:
+            raise WireError(f"Pointer trunchiat la offset-ul {offset + position}")
+        target = ((length & 0x3F) << 8) | run[position + 1]
+        if target >= offset or depth >= MAX_POINTERS:
+            raise WireError(f"Pointer invalid la offset-ul {offset + position}")
+        end = position + 2
+        suffix = names.get(target)
+        if suffix is None:
+            suffix = read_name(view, target, names, depth + 1)[0]
+    else:
+        raise WireError(f"Etichetă invalidă la offset-ul {offset + position}")
+    if not position:
+        return suffix, offset + end
+
+    try:
+        name = run[1:position].decode('ascii')
+    except UnicodeDecodeError:
+        # Etichete non-ASCII: un punct din șir poate fi și în interiorul unei etichete, deci pe rând
+        labels = []
+        index = 0
+        while index < position:
+            length = view[offset + index]
+            labels.append(str(view[offset + index + 1:offset + index + 1 + length], 'utf-8', 'replace'))
+            index += length + 1
+        name = '.'.join(labels)
+    if suffix:
+        name = f"{name}.{suffix}"
+    names[offset] = name
+    return name, offset + end
+
+
+def skip_name(view, offset):
+    """Returnează offset-ul de după numele de la `offset`, fără să-l decodeze."""
+    size = len(view)
+    while offset < size:
+        length = view[offset]
+        if length == 0:
+            return offset + 1
+        if length >= POINTER:
+            return offset + 2
+        if length > MAX_LABEL:
+            raise WireError(f"Etichetă invalidă la offset-ul {offset}")
+        offset += length + 1
+    raise WireError(f"Nume trunchiat la offset-ul {offset}")
+
+
+def decode_a(view, offset, end, names):
+    if end - offset != 4:
+        raise WireError(f"Înregistrare A de {end - offset} octeți")
+    return '%d.%d.%d.%d' % IPV4.unpack_from(view, offset)
+
+
+def decode_aaaa(view, offset, end, names):
+    if end - offset != 16:
+        raise WireError(f"Înregistrare AAAA de {end - offset} octeți")
+    return socket.inet_ntop(socket.AF_INET6, view[offset:end])
+
+
+def decode_name(view, offset, end, names):
+    return read_name(view, offset, names)[0]
+
+
+def decode_mx(view, offset, end, names):
+    if end - offset < 3:
+        raise WireError("Înregistrare MX trunchiată")
+    return U16.unpack_from(view, offset)[0], read_name(view, offset + 2, names)[0]
+
+
+def decode_txt(view, offset, end, names):
+    strings = []
+    while offset < end:
+        start = offset + 1
+        offset = start + view[offset]
+        if offset > end:
+            raise WireError("Șir TXT trunchiat")
+        strings.append(str(view[start:offset], 'utf-8', 'replace'))
+    return tuple(strings)
+
+
+def decode_soa(view, offset, end, names):
+    mname, offset = read_name(view, offset, names)
+    rname, offset = read_name(view, offset, names)
+    if offset + SOA_FIELDS.size > end:
+        raise WireError("Înregistrare SOA trunchiată")
+    return (mname, rname) + SOA_FIELDS.unpack_from(view, offset)
+
+
+def decode_srv(view, offset, end, names):
+    if offset + SRV_FIELDS.size >= end:
+        raise WireError("Înregistrare SRV trunchiată")
+    return SRV_FIELDS.unpack_from(view, offset) + (read_name(view, offset + SRV_FIELDS.size, names)[0],)
+
+
+DECODERS = {
+    TYPE_A: decode_a,
+    TYPE_AAAA: decode_aaaa,
+    TYPE_CNAME: decode_name,
+    TYPE_NS: decode_name,
+    TYPE_PTR: decode_name,
+    TYPE_MX: decode_mx,
+    TYPE_TXT: decode_txt,
+    TYPE_SOA: decode_soa,
+    TYPE_SRV: decode_srv,
+}
+
+
+def read_records(view, offset, count, names):
+    """Citește `count` înregistrări de la `offset`; returnează (lista lor, offset-ul de după)."""
+    records = []
+    size = len(view)
+    for _ in range(count):
+        # Cazul obișnuit: numele e doar un pointer către un nume deja în memo
+        length = view[offset] if offset + 1 < size else 0
+        name = names.get(((length & 0x3F) << 8) | view[offset + 1]) if length >= POINTER else None
+        if name is not None:
+            offset += 2
+        else:
+            name, offset = read_name(view, offset, names)
+        if offset + RECORD.size > size:
+            raise WireError(f"Înregistrare trunchiată la offset-ul {offset}")
+        rtype, rclass, ttl, rdlength = RECORD.unpack_from(view, offset)
+        offset += RECORD.size
+        end = offset + rdlength
+        if end > size:
+            raise WireError(f"RDATA trunchiat la offset-ul {offset}")
+        if rtype == TYPE_A and rdlength == 4:
+            value = '%d.%d.%d.%d' % IPV4.unpack_from(view, offset)
+        else:
+            decoder = DECODERS.get(rtype)
+            value = decoder(view, offset, end, names) if decoder else bytes(view[offset:end])
+        records.append((name, rtype, rclass, ttl, value))
+        offset = end
+    return records, offset
+
+
+def parse_message(data):
+    """Parsează un mesaj DNS complet (bytes, bytearray sau memoryview)."""
+    view = memoryview(data)
+    if len(view) < HEADER.size:
+        raise WireError(f"Mesaj de {len(view)} octeți, mai scurt decât header-ul")
+    transaction_id, flags, question_count, answer_count, authority_count, additional_count = \
+        HEADER.unpack_from(view, 0)
+    names = {}
+    offset = HEADER.size
+
+    questions = []
+    for _ in range(question_count):
+        name, offset = read_name(view, offset, names)
+        if offset + QUESTION.size > len(view):
+            raise WireError("Întrebare trunchiată")
+        questions.append((name,) + QUESTION.unpack_from(view, offset))
+        offset += QUESTION.size
+
+    answers, offset = read_records(view, offset, answer_count, names) if answer_count else ([], offset)
+    authority, offset = read_records(view, offset, authority_count, names) if authority_count else ([], offset)
+    additional = read_records(view, offset, additional_count, names)[0] if additional_count else []
+    return {
+        'id': transaction_id,
+        'flags': flags,
+        'rcode': flags & 0x000F,
+        'questions': questions,
+        'answers': answers,
+        'authority': authority,
+        'additional': additional,
+    }
+
+
+def skim_records(view, offset, count, wanted, names):
+    """
+    Ca read_records, dar fără numele proprietarilor: returnează (lista de
+    (tip, ttl, valoare), offset-ul de după). Valoarea este decodată doar
+    pentru tipul `wanted`, altfel None; la SOA numele mname și rname sunt
+    sărite, deci valoarea este (None, None, serial, refresh, retry, expire,
+    minimum).
+    """
+    records = []
+    size = len(view)
+    unpack = RECORD.unpack_from
+    for _ in range(count):
+        # Numele proprietarului e de obicei doar un pointer
+        if offset < size and view[offset] >= POINTER:
+            offset += 2
+        else:
+            offset = skip_name(view, offset)
+        if offset + 10 > size:
+            raise WireError(f"Înregistrare trunchiată la offset-ul {offset}")
+        rtype, _, ttl, rdlength = unpack(view, offset)
+        offset += 10
+        end = offset + rdlength
+        if end > size:
+            raise WireError(f"RDATA trunchiat la offset-ul {offset}")
+        value = None
+        if rtype == wanted:
+            if rtype == TYPE_A and rdlength == 4:
+                value = '%d.%d.%d.%d' % IPV4.unpack_from(view, offset)
+            elif rtype == TYPE_SOA:
+                fields = skip_name(view, skip_name(view, offset))
+                if fields + SOA_FIELDS.size > end:
+                    raise WireError("Înregistrare SOA trunchiată")
+                value = (None, None) + SOA_FIELDS.unpack_from(view, fields)
+            else:
+                decoder = DECODERS.get(rtype)
+                value = decoder(view, offset, end, names) if decoder else bytes(view[offset:end])
+        records.append((rtype, ttl, value))
+        offset = end
+    return records, offset
+
+
+def parse_answers(data, query_type, negative=True):
+    """
+    Citește doar ce trebuie pentru rezultatul unei interogări de tipul
+    `query_type`; returnează (rcode, rezultate, ttl). Rezultatele sunt
+    valorile înregistrărilor de tipul cerut din answers, iar ttl este cel
+    mai mic TTL din answers. Fără rezultate și cu `negative`, ttl vine din
+    SOA-ul din authority (minimul dintre TTL-ul lui și câmpul minimum) sau
+    este None. Numele (din întrebare și ale proprietarilor) sunt sărite, nu
+    decodate, iar additional (cu OPT-ul EDNS0) nu se citește deloc.
+    """
+    view = memoryview(data)
+    size = len(view)
+    if size < HEADER.size:
+        raise WireError(f"Mesaj de {size} octeți, mai scurt decât header-ul")
+    _, flags, question_count, answer_count, authority_count, _ = HEADER.unpack_from(view, 0)
+    rcode = flags & 0x000F
+    results = []
+    if not answer_count and not (negative and authority_count):
+        # Nimic de citit după întrebare
+        return rcode, results, None
+    offset = HEADER.size
+    for _ in range(question_count):
+        # skip_name, fără apelul de funcție: întrebarea e pe drumul fiecărui răspuns
+        length = view[offset] if offset < size else 0
+        while 0 < length <= MAX_LABEL:
+            offset += length + 1
+            length = view[offset] if offset < size else 0
+        if length >= POINTER:
+            offset += 2 + QUESTION.size
+        elif length:
+            raise WireError(f"Etichetă invalidă la offset-ul {offset}")
+        else:
+            offset += 1 + QUESTION.size
+    if offset > size:
+        raise WireError("Întrebare trunchiată")
+
+    names = {}
+    unpack = RECORD.unpack_from
+    answer_ttl = None
+    for _ in range(answer_count):
+        if offset < size and view[offset] >= POINTER:
+            offset += 2
+        else:
+            offset = skip_name(view, offset)
+        if offset + 10 > size:
+            raise WireError(f"Înregistrare trunchiată la offset-ul {offset}")
+        rtype, _, ttl, rdlength = unpack(view, offset)
+        offset += 10
+        end = offset + rdlength
+        if end > size:
+            raise WireError(f"RDATA trunchiat la offset-ul {offset}")
+        # Și CNAME-urile din lanț limitează cât e valabil răspunsul
+        if answer_ttl is None or ttl < answer_ttl:
+            answer_ttl = ttl
+        if rtype == query_type:
+            # Cazurile obișnuite (căutări directe și inverse) fără apelul decodorului
+            if rtype == TYPE_A and rdlength == 4:
+                results.append('%d.%d.%d.%d' % IPV4.unpack_from(view, offset))
+            elif rtype == TYPE_PTR:
+                results.append(read_name(view, offset, names)[0])
+            else:
+                decoder = DECODERS.get(rtype)
+                results.append(decoder(view, offset, end, names) if decoder else bytes(view[offset:end]))
+        offset = end
+    if results or not negative:
+        return rcode, results, answer_ttl
+
+    for rtype, ttl, value in skim_records(view, offset, authority_count, TYPE_SOA, names)[0]:
+        if rtype == TYPE_SOA:
+            return rcode, results, min(ttl, value[6])
+    return rcode, results, None
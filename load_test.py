@@ -0,0 +1,468 @@
+#!/usr/bin/env python3
+"""
+Generator de încărcare pentru server.py.
+
+Pornește mii de clienți sintetici care vorbesc protocolul real (register,
+broadcast, private, list_users) după un amestec configurabil și măsoară
+latența de livrare cap-la-cap: fiecare mesaj poartă momentul trimiterii
+(time.monotonic_ns, comun tuturor proceselor de pe aceeași mașină), iar
+destinatarul înregistrează diferența. Pentru list_users se măsoară timpul
+până la răspuns. Clienții rulează într-o buclă asyncio, opțional împărțiți
+pe mai multe procese (--processes) când un singur nucleu nu ține pasul.
+
+Rezultatele (percentile p50/p99/p999, mesaje/s, rata de conectare) se scriu
+în JSON, ca rulările să poată fi comparate între motoare și commit-uri.
+
+Rulare: python3 load_test.py --clients 2000 --duration 30 \\
+            --mix broadcast=1,private=8,list_users=1 --output rezultat.json
+"""
+
+import argparse
+import asyncio
+import collections
+import json
+import math
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+
+from chat_protocol import (ENCODINGS, FRAMED, JSON, ZLIB, FrameCompressor, FrameDecoder, FrameError,
+                           encode_message)
+
+HOST = '127.0.0.1'
+PORT = 65432
+
+MIX_TYPES = ('broadcast', 'private', 'list_users')
+DEFAULT_MIX = 'broadcast=1,private=8,list_users=1'
+
+# Prefixul mesajelor generate; urmează momentul trimiterii în nanosecunde
+LOAD_TAG = 'load:'
+
+# Histogramele au bucket-uri logaritmice cu o precizie de ~1%
+BUCKET_BASE_NS = 1000
+BUCKET_STEP = math.log(1.01)
+
+
+class LatencyHistogram:
+    """Histogramă compactă de latențe, care se poate combina între procese."""
+
+    def __init__(self, buckets=None):
+        self.buckets = collections.Counter(buckets or {})
+        self.max_ns = 0
+
+    def record(self, ns):
+        if ns > self.max_ns:
+            self.max_ns = ns
+        if ns <= BUCKET_BASE_NS:
+            self.buckets[0] += 1
+        else:
+            self.buckets[int(math.log(ns / BUCKET_BASE_NS) / BUCKET_STEP)] += 1
+
+    def merge(self, other):
+        self.buckets.update(other.buckets)
+        self.max_ns = max(self.max_ns, other.max_ns)
+
+    @property
+    def count(self):
+        return sum(self.buckets.values())
+
+    def percentile(self, p):
+        """Latența (ns) sub care se află p% din eșantioane."""
+        total = self.count
+        if not total:
+            return None
+        rank = math.ceil(total * p / 100)
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return min(BUCKET_BASE_NS * math.exp((bucket + 0.5) * BUCKET_STEP), self.max_ns)
+        return self.max_ns
+
+    def summary(self):
+        """Percentilele în milisecunde, pentru raport."""
+        def ms(ns):
+            return None if ns is None else round(ns / 1e6, 3)
+
+        return {'count': self.count, 'p50': ms(self.percentile(50)), 'p99': ms(self.percentile(99)),
+                'p999': ms(self.percentile(99.9)), 'max': ms(self.max_ns or None)}
+
+    def to_dict(self):
+        return {'buckets': dict(self.buckets), 'max_ns': self.max_ns}
+
+    @classmethod
+    def from_dict(cls, data):
+        histogram = cls(data['buckets'])
+        histogram.max_ns = data['max_ns']
+        return histogram
+
+
+def parse_mix(text):
+    """'broadcast=1,private=8' -> (['broadcast', 'private'], [1.0, 8.0])"""
+    types, weights = [], []
+    for item in text.split(','):
+        name, _, weight = item.partition('=')
+        name = name.strip()
+        if name not in MIX_TYPES:
+            raise ValueError(f"Tip de mesaj necunoscut în amestec: {name!r} (disponibile: {', '.join(MIX_TYPES)})")
+        types.append(name)
+        weights.append(float(weight) if weight else 1.0)
+    if sum(weights) <= 0:
+        raise ValueError("Amestecul trebuie să aibă cel puțin o pondere pozitivă")
+    return types, weights
+
+
+def nickname_for(args, index):
+    return f'{args.prefix}{index}'
+
+
+class WorkerStats:
+    """Contoarele și histogramele clienților dintr-un proces."""
+
+    def __init__(self):
+        self.sent = collections.Counter()
+        self.delivered = collections.Counter()
+        self.errors = 0
+        self.latency = {msg_type: LatencyHistogram() for msg_type in MIX_TYPES}
+
+    def to_dict(self):
+        return {'sent': dict(self.sent), 'delivered': dict(self.delivered), 'errors': self.errors,
+                'latency': {msg_type: h.to_dict() for msg_type, h in self.latency.items()}}
+
+
+class LoadClient:
+    """Un client sintetic: o conexiune, un decodor și coada cererilor list_users."""
+
+    def __init__(self, args, index, stats):
+        self.args = args
+        self.nickname = nickname_for(args, index)
+        self.stats = stats
+        self.decoder = FrameDecoder(mode=FRAMED)
+        self.compressor = None
+        self.pending_lists = collections.deque()    # momentele trimiterii list_users
+        self.reader = None
+        self.writer = None
+        self.receiver = None
+        self.registered = None
+
+    async def connect(self):
+        """Se conectează și se înregistrează; returnează True dacă a reușit."""
+        self.reader, self.writer = await asyncio.open_connection(self.args.host, self.args.port)
+        self.registered = asyncio.get_running_loop().create_future()
+        self.receiver = asyncio.create_task(self.receive())
+
+        register = {'nickname': self.nickname, 'encoding': self.args.encoding}
+        if self.args.compression:
+            register['compression'] = ZLIB
+            self.decoder.enable_compression()
+        self.send('register', register)
+        return await asyncio.wait_for(self.registered, self.args.connect_timeout)
+
+    def send(self, msg_type, data):
+        frame = encode_message(msg_type, data, encoding=self.args.encoding)
+        if self.compressor is not None:
+            frame = self.compressor.compress_frame(frame)
+        self.writer.write(frame)
+
+    async def receive(self):
+        try:
+            while True:
+                data = await self.reader.read(65536)
+                if not data:
+                    break
+                now = time.monotonic_ns()
+                for msg in self.decoder.feed(data):
+                    self.handle(msg, now)
+        except (ConnectionError, FrameError):
+            pass
+        finally:
+            if not self.registered.done():
+                self.registered.set_result(False)
+
+    def handle(self, msg, now):
+        msg_type = msg['type']
+        data = msg['data']
+
+        if msg_type == 'message':
+            text = data.get('message', '')
+            kind = data.get('type')
+            if kind in ('broadcast', 'private') and text.startswith(LOAD_TAG):
+                sent_ns = int(text[len(LOAD_TAG):text.index(' ')])
+                self.stats.latency[kind].record(now - sent_ns)
+                self.stats.delivered[kind] += 1
+
+        elif msg_type == 'user_list':
+            if self.pending_lists:
+                self.stats.latency['list_users'].record(now - self.pending_lists.popleft())
+                self.stats.delivered['list_users'] += 1
+
+        elif msg_type == 'ping':
+            self.send('pong', {})
+
+        elif msg_type == 'registered':
+            if data.get('compression') == ZLIB:
+                self.compressor = FrameCompressor()
+            self.registered.set_result(True)
+
+        elif msg_type == 'error':
+            if not self.registered.done():
+                self.registered.set_result(False)
+            else:
+                self.stats.errors += 1
+
+    async def drive(self, types, weights, targets, deadline):
+        """Trimite mesaje după amestec, la intervale exponențiale (proces Poisson)."""
+        rate = self.args.rate
+        padding = 'x' * self.args.message_size
+        await asyncio.sleep(random.uniform(0, 1 / rate))
+        while time.monotonic() < deadline and not self.writer.is_closing():
+            msg_type = random.choices(types, weights)[0]
+            message = f'{LOAD_TAG}{time.monotonic_ns()} {padding}'
+
+            if msg_type == 'broadcast':
+                self.send('broadcast', {'message': message})
+            elif msg_type == 'private':
+                self.send('private', {'to': random.choice(targets), 'message': message})
+            else:
+                self.pending_lists.append(time.monotonic_ns())
+                self.send('list_users', {})
+            self.stats.sent[msg_type] += 1
+
+            # Un server lent ne oprește aici, ca în cazul unui client real
+            await self.writer.drain()
+            await asyncio.sleep(min(random.expovariate(rate), max(0.0, deadline - time.monotonic())))
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except ConnectionError:
+                pass
+        if self.receiver is not None:
+            self.receiver.cancel()
+
+
+async def connect_clients(args, indices, stats):
+    """Conectează clienții cu rata cerută; returnează (clienți, eșecuri, secunde)."""
+    interval = args.processes / args.connect_rate if args.connect_rate else 0
+    limit = asyncio.Semaphore(args.connect_concurrency)
+    clients, failed = [], 0
+
+    async def connect_one(client):
+        nonlocal failed
+        async with limit:
+            try:
+                if await client.connect():
+                    clients.append(client)
+                    return
+            except (OSError, asyncio.TimeoutError):
+                pass
+            failed += 1
+            await client.close()
+
+    start = time.monotonic()
+    tasks = []
+    for i, index in enumerate(indices):
+        tasks.append(asyncio.create_task(connect_one(LoadClient(args, index, stats))))
+        if interval:
+            await asyncio.sleep(max(0.0, start + (i + 1) * interval - time.monotonic()))
+    await asyncio.gather(*tasks)
+    return clients, failed, time.monotonic() - start
+
+
+async def run_clients(args, indices, barrier=None):
+    """Rulează clienții unui proces și returnează rezultatele lui (serializabile)."""
+    stats = WorkerStats()
+    types, weights = parse_mix(args.mix)
+    targets = [nickname_for(args, index) for index in range(args.clients)]
+    loop = asyncio.get_running_loop()
+
+    clients, failed, connect_seconds = await connect_clients(args, indices, stats)
+    if barrier is not None:
+        # Toate procesele încep încărcarea în același moment
+        await loop.run_in_executor(None, barrier.wait)
+
+    start = time.monotonic()
+    deadline = start + args.duration
+    drivers = [asyncio.create_task(client.drive(types, weights, targets, deadline)) for client in clients]
+    await asyncio.gather(*drivers, return_exceptions=True)
+    # Mesajele aflate încă pe drum au la dispoziție --drain secunde
+    await asyncio.sleep(args.drain)
+    elapsed = time.monotonic() - start
+
+    await asyncio.gather(*(client.close() for client in clients), return_exceptions=True)
+
+    result = stats.to_dict()
+    result.update({'connected': len(clients), 'failed': failed,
+                   'connect_seconds': connect_seconds, 'elapsed': elapsed})
+    return result
+
+
+def worker_main(args, indices, barrier, results):
+    """Punctul de intrare al unui proces din --processes."""
+    results.put(asyncio.run(run_clients(args, indices, barrier)))
+
+
+def raise_file_limit(needed):
+    """Fiecare client are nevoie de un descriptor; ridicăm limita soft cât permite cea hard."""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    wanted = needed + 64
+    if soft != resource.RLIM_INFINITY and soft < wanted:
+        new_soft = wanted if hard == resource.RLIM_INFINITY else min(wanted, hard)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (new_soft, hard))
+        if new_soft < wanted:
+            print(f"[AVERTISMENT] Limita de fișiere deschise ({new_soft}) este mai mică decât "
+                  f"numărul de clienți; unele conexiuni vor eșua.")
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def build_report(args, results):
+    """Combină rezultatele proceselor în raportul final."""
+    sent, delivered = collections.Counter(), collections.Counter()
+    latency = {msg_type: LatencyHistogram() for msg_type in MIX_TYPES}
+    errors = connected = failed = 0
+    connect_seconds = elapsed = 0.0
+
+    for result in results:
+        sent.update(result['sent'])
+        delivered.update(result['delivered'])
+        errors += result['errors']
+        connected += result['connected']
+        failed += result['failed']
+        connect_seconds = max(connect_seconds, result['connect_seconds'])
+        elapsed = max(elapsed, result['elapsed'])
+        for msg_type, data in result['latency'].items():
+            latency[msg_type].merge(LatencyHistogram.from_dict(data))
+
+    total = LatencyHistogram()
+    for histogram in latency.values():
+        total.merge(histogram)
+
+    # Un broadcast ajunge la toți clienții conectați, inclusiv la expeditor
+    expected = {'broadcast': sent['broadcast'] * connected, 'private': sent['private'],
+                'list_users': sent['list_users']}
+
+    return {
+        'label': args.label,
+        'commit': git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'config': {name: getattr(args, name) for name in
+                   ('host', 'port', 'clients', 'processes', 'duration', 'rate', 'mix', 'message_size',
+                    'encoding', 'compression', 'connect_rate')},
+        'connect': {'connected': connected, 'failed': failed, 'seconds': round(connect_seconds, 3),
+                    'per_sec': round(connected / connect_seconds, 1) if connect_seconds else None},
+        'elapsed': round(elapsed, 3),
+        'sent': dict(sent),
+        'delivered': dict(delivered),
+        'delivery_ratio': {msg_type: round(delivered[msg_type] / count, 4)
+                           for msg_type, count in expected.items() if count},
+        'sent_per_sec': round(sum(sent.values()) / args.duration, 1),
+        'delivered_per_sec': round(sum(delivered.values()) / elapsed, 1) if elapsed else None,
+        'errors': errors,
+        'latency_ms': dict({msg_type: h.summary() for msg_type, h in latency.items()},
+                           all=total.summary()),
+    }
+
+
+def print_report(report):
+    connect = report['connect']
+    print(f"[CONECTARE] {connect['connected']} clienți în {connect['seconds']} s "
+          f"({connect['per_sec']} conexiuni/s), {connect['failed']} eșuați")
+    print(f"[TRAFIC] trimise {report['sent_per_sec']} mesaje/s, livrate {report['delivered_per_sec']} mesaje/s, "
+          f"{report['errors']} erori")
+    print(f"{'tip':<12} {'eșantioane':>11} {'p50 ms':>9} {'p99 ms':>9} {'p999 ms':>9} {'max ms':>9} {'livrate':>8}")
+    for msg_type, summary in report['latency_ms'].items():
+        ratio = report['delivery_ratio'].get(msg_type)
+        values = [summary[key] for key in ('p50', 'p99', 'p999', 'max')]
+        cells = ' '.join(f"{'-' if v is None else v:>9}" for v in values)
+        print(f"{msg_type:<12} {summary['count']:>11} {cells} {'' if ratio is None else f'{ratio:.1%}':>8}")
+
+
+def parse_args():
+    """Citește opțiunile din linia de comandă."""
+    parser = argparse.ArgumentParser(description='Generator de încărcare pentru serverul de chat')
+    parser.add_argument('--host', default=HOST, help='adresa serverului')
+    parser.add_argument('--port', type=int, default=PORT, help='portul serverului')
+    parser.add_argument('--clients', type=int, default=1000, help='numărul de clienți sintetici')
+    parser.add_argument('--processes', type=int, default=1,
+                        help='procese între care se împart clienții (fiecare cu bucla lui asyncio)')
+    parser.add_argument('--duration', type=float, default=10.0, help='durata încărcării, în secunde')
+    parser.add_argument('--rate', type=float, default=1.0, help='mesaje pe secundă trimise de fiecare client')
+    parser.add_argument('--mix', default=DEFAULT_MIX,
+                        help=f'ponderile tipurilor de mesaje (implicit {DEFAULT_MIX})')
+    parser.add_argument('--message-size', type=int, default=32, help='octeți de umplutură în fiecare mesaj')
+    parser.add_argument('--encoding', choices=ENCODINGS, default=JSON, help='codificarea cerută la register')
+    parser.add_argument('--compression', action='store_true', help='cere compresie zlib la register')
+    parser.add_argument('--connect-rate', type=float, default=0,
+                        help='conexiuni noi pe secundă, în total (0 = cât de repede se poate)')
+    parser.add_argument('--connect-concurrency', type=int, default=256,
+                        help='conectări simultane per proces')
+    parser.add_argument('--connect-timeout', type=float, default=30.0,
+                        help='secunde de așteptare pentru confirmarea înregistrării')
+    parser.add_argument('--drain', type=float, default=2.0,
+                        help='secunde de așteptare după încărcare pentru mesajele aflate pe drum')
+    parser.add_argument('--prefix', default='load', help='prefixul nickname-urilor generate')
+    parser.add_argument('--label', default=None, help='etichetă liberă în raport (ex. motorul serverului)')
+    parser.add_argument('--output', help='fișierul JSON cu rezultatele ("-" = stdout)')
+    args = parser.parse_args()
+
+    if args.clients < 1 or args.processes < 1 or args.rate <= 0 or args.duration <= 0:
+        parser.error('--clients, --processes, --rate și --duration trebuie să fie pozitive')
+    try:
+        parse_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+    args.processes = min(args.processes, args.clients)
+    return args
+
+
+def main():
+    args = parse_args()
+    raise_file_limit(-(-args.clients // args.processes))
+
+    print(f"[START] {args.clients} clienți, {args.processes} proces(e), {args.duration} s, "
+          f"{args.rate} mesaje/s per client, amestec {args.mix}")
+
+    if args.processes == 1:
+        results = [asyncio.run(run_clients(args, range(args.clients)))]
+    else:
+        context = multiprocessing.get_context('fork')
+        barrier = context.Barrier(args.processes)
+        queue = context.Queue()
+        workers = [context.Process(target=worker_main,
+                                   args=(args, range(i, args.clients, args.processes), barrier, queue))
+                   for i in range(args.processes)]
+        for worker in workers:
+            worker.start()
+        results = [queue.get() for _ in workers]
+        for worker in workers:
+            worker.join()
+
+    report = build_report(args, results)
+    print_report(report)
+
+    if args.output == '-':
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    elif args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"[OK] Rezultatele au fost scrise în {args.output}")
+
+
+if __name__ == "__main__":
+    main()
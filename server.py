@@ -1,143 +1,1755 @@
 import socket
 import threading
-import json
+import asyncio
+import argparse
+import collections
+import concurrent.futures
+import multiprocessing
+import os
+import tempfile
+import time
+
+from chat_bus import BusClient, listen_hub, serve_hub
+from chat_history import MessageHistory
+from chat_limits import Admission, RateLimiter, load_limits, parse_rule
+from chat_log import LEVELS, log
+from chat_metrics import MetricsRegistry, serve_http
+from chat_presence import Presence
+from chat_protocol import (BINARY, FRAMED, JSON, LEGACY, ZLIB, FrameCompressor, FrameDecoder, FrameError,
+                           encode_message, frame_view)
+from chat_session import Session
+from chat_spool import Spool
+from chat_timers import TimerWheel
 
 HOST = '127.0.0.1'
 PORT = 65432
 
-# Dict: nickname -> {socket, address}
+# Politici aplicate când coada de ieșire a unui client este plină
+OVERFLOW_POLICIES = ('drop_oldest', 'drop_new', 'disconnect')
+
+# Setări modificabile din linia de comandă
+config = {
+    'outbox_limit': 1024,           # cadre în așteptare per conexiune
+    'overflow_policy': 'drop_oldest',
+    'history_bytes': 1024 * 1024,   # memoria pentru istoricul mesajelor
+    'compress_threshold': 512,      # mesajele mai mari se comprimă (0 = fără compresie)
+    'metrics_host': '127.0.0.1',    # endpoint-ul HTTP al metricilor (--metrics-port)
+    'max_write_delay': 0.0,         # cât poate aștepta un cadru ca să fie grupat cu altele (s)
+    'session_ttl': 60.0,            # cât se păstrează sesiunea unui client deconectat (s; 0 = fără sesiuni)
+    'session_buffer_bytes': 256 * 1024,     # cadrele recente păstrate per sesiune, pentru reluare
+    'presence_changes': 4096,       # modificări de prezență păstrate pentru cererile "since"
+    'register_timeout': 10.0,       # cât poate rămâne o conexiune neînregistrată (s; 0 = oricât)
+    'read_timeout': 30.0,           # cât poate dura sosirea restului unui mesaj început (s)
+    'ping_interval': 30.0,          # după atâta liniște de la client serverul trimite ping (s)
+    'idle_timeout': 90.0,           # fără niciun mesaj de la client atâta timp, conexiunea se închide (s)
+    'max_connections': 0,           # conexiuni deschise simultan (0 = oricâte)
+    'max_connections_per_ip': 0,    # conexiuni deschise simultan de pe aceeași adresă (0 = oricâte)
+    'max_pending_registrations': 1024,  # conexiuni acceptate, dar încă neînregistrate (0 = oricâte)
+    # Limitele de mesaje (rată/s, rafală) per tip; '*' = restul tipurilor (vezi chat_limits).
+    # Implicit nu există niciuna: se activează din --limits sau --rate-limit
+    'rate_limits': {
+        'nickname': {},
+        'ip': {},
+    },
+    'spool_dir': None,              # mesajele private pentru utilizatorii deconectați (None = fără spool)
+    'spool_max_messages': 1000,     # mesaje în așteptare per destinatar
+    'spool_segment_bytes': 4 * 1024 * 1024,     # mărimea unui segment al spool-ului
+}
+
+# Un scriitor care a adunat atâtea cadre le trimite fără să mai aștepte max_write_delay
+WRITE_BATCH_FRAMES = 64
+
+# Numărul maxim de buffere acceptat de un singur sendmsg()
+try:
+    IOV_MAX = os.sysconf('SC_IOV_MAX')
+except (AttributeError, ValueError, OSError):
+    IOV_MAX = 1024
+
+# Pasul roții de timere (s): precizia timeout-urilor conexiunilor
+TIMER_TICK = 0.25
+
+# Motivele pentru care o conexiune este închisă de server din lipsă de activitate
+REAP_REASONS = {
+    'registration': 'nu s-a înregistrat la timp',
+    'read': 'mesaj început, dar netrimis la timp',
+    'idle': 'fără activitate (nu a răspuns la ping)',
+}
+REAP_COUNTERS = {reason: f'connections_reaped{{reason="{reason}"}}' for reason in REAP_REASONS}
+
+# Motivele pentru care o conexiune nouă este refuzată la accept() (vezi chat_limits.Admission)
+ADMISSION_REASONS = ('max_connections', 'max_connections_per_ip', 'max_pending_registrations')
+ADMISSION_COUNTERS = {reason: f'connections_rejected{{reason="{reason}"}}' for reason in ADMISSION_REASONS}
+
+# Cât de des se uită gălețile pline ale limitatoarelor (s)
+LIMITS_PRUNE_INTERVAL = 60.0
+
+# Evenimentele de jurnal pentru mesajele de chat; implicit nu se scriu (--log-messages)
+MESSAGE_LOG_EVENTS = ('broadcast', 'private', 'room_message')
+
+# Tipurile de mesaje numărate separat în metrici; restul apar ca "unknown"
+MESSAGE_TYPES = ('register', 'broadcast', 'private', 'join', 'leave', 'room_message',
+                 'list_users', 'my_info', 'stats', 'resume', 'logout', 'ping', 'pong')
+MESSAGE_COUNTERS = {msg_type: f'messages_in{{type="{msg_type}"}}' for msg_type in MESSAGE_TYPES}
+UNKNOWN_MESSAGE_COUNTER = 'messages_in{type="unknown"}'
+RATE_LIMITED_COUNTERS = {msg_type: f'messages_rate_limited{{type="{msg_type}"}}' for msg_type in MESSAGE_TYPES}
+UNKNOWN_RATE_LIMITED_COUNTER = 'messages_rate_limited{type="unknown"}'
+
+# Contoare, histograme și indicatori (vezi chat_metrics); disponibile prin
+# mesajul 'stats' și, opțional, prin HTTP
+metrics = MetricsRegistry(counters=(
+    'connections_opened',
+    'connections_closed',
+    'frames_enqueued',
+    'frames_sent',
+    'send_calls',
+    'frames_dropped_oldest',
+    'frames_dropped_new',
+    'slow_client_disconnects',
+    'compression_bytes_in',
+    'compression_bytes_saved',
+    'compression_cpu_ns',
+    'decompression_cpu_ns',
+    'sessions_resumed',
+    'sessions_rejected',
+    'sessions_expired',
+    'session_frames_replayed',
+    'presence_snapshots_sent',
+    'presence_deltas_sent',
+    'pings_sent',
+    'rate_limit_notices',
+    'spool_queued',
+    'spool_delivered',
+    'spool_rejected',
+    'spool_failed',
+) + tuple(REAP_COUNTERS.values()) + tuple(ADMISSION_COUNTERS.values())
+  + tuple(RATE_LIMITED_COUNTERS.values()) + (UNKNOWN_RATE_LIMITED_COUNTER,))
+
+# Dict: nickname -> conexiune (vezi new_connection)
 clients = {}
-clients_lock = threading.Lock()
+clients_lock = metrics.timed_lock('clients_lock')
+
+# Camere: room -> {nickname} și indexul invers nickname -> {room} (protejate de clients_lock)
+rooms = {}
+member_rooms = {}
+
+# Utilizatorii conectați (inclusiv cei de pe ceilalți workeri), cu versiune
+presence = Presence(config['presence_changes'])
+
+# Sesiunile reluabile: token -> Session (protejate de clients_lock)
+sessions = {}
+
+# Ultimele mesaje generale și din camere, reluate la cerere la înregistrare/join
+history = MessageHistory(config['history_bytes'])
+
+# Timeout-urile tuturor conexiunilor (și expirarea sesiunilor), pe o singură roată
+timers = TimerWheel(TIMER_TICK, on_error=lambda timer, e: log.error('timers', 'Timer eșuat: {error}',
+                                                                     error=repr(e)))
+
+# Mesajele private păstrate pe disc pentru destinatarii deconectați (--spool-dir)
+spool = None
+# Pe motorul asyncio spool.take() citește de pe disc pe acest thread, nu în buclă;
+# un singur thread păstrează ordinea livrărilor
+spool_reader = None
+
+# Limitele de mesaje per nickname și per IP și admiterea conexiunilor noi (configurate în main)
+nickname_limits = RateLimiter(config['rate_limits']['nickname'])
+ip_limits = RateLimiter(config['rate_limits']['ip'])
+admission = Admission(config['max_connections'], config['max_connections_per_ip'],
+                      config['max_pending_registrations'])
+
+# Legătura cu ceilalți workeri (--workers); None când serverul rulează într-un singur proces
+bus = None
+
+
+def new_connection(client_socket, address):
+    """
+    Creează descrierea unei conexiuni, independentă de motorul folosit.
+    Motorul completează 'wake' (pornește scriitorul), 'close' (închidere după
+    golirea cozii) și 'abort' (închidere imediată), apoi pornește timerele
+    cu start_connection_timers().
+    """
+    metrics.inc('connections_opened')
+    outbox_lock = threading.Lock()
+    return {
+        'socket': client_socket,
+        'address': address,
+        'nickname': None,
+        'first_message': True,
+        'registering': False,       # așteaptă confirmarea nickname-ului de la bus
+        'backlog': [],              # mesaje sosite în timpul înregistrării
+        'decoder': FrameDecoder(),
+        'encoding': JSON,           # negociat la register (json sau binary)
+        'compressor': None,         # FrameCompressor, dacă s-a negociat compresia
+        'outbox': collections.deque(),
+        'outbox_lock': outbox_lock,
+        'outbox_ready': threading.Condition(outbox_lock),
+        'closing': False,
+        'session': None,            # Session, dacă clientul a cerut o sesiune reluabilă
+        'replay': [],               # cadre de trimis înaintea cozii, nenumerotate (la resume)
+        'resumed_by': None,         # conexiunea care a preluat sesiunea acestei conexiuni
+        'parked': False,            # deconectat, dar sesiunea încă poate fi reluată
+        'logout': False,
+        'presence': False,          # primește delte de prezență în locul notificărilor text
+        'pending_registration': True,   # numărată în admission.pending până la înregistrare
+        'rate_limited': False,      # a primit deja eroarea pentru depășirea limitei curente
+        'wake': None,
+        'close': None,
+        'abort': None,
+        'timers': {},               # nume -> Timer pe roata comună (register, read, idle)
+        'last_seen': time.monotonic(),  # ultimul recv() cu date
+        'partial_since': None,      # de când așteptăm restul unui mesaj început
+    }
+
+
+def enqueue_frame(conn, frame):
+    """
+    Pune un cadru gata codificat în coada de ieșire a conexiunii, fără să blocheze.
+    Returnează False dacă cadrul nu a fost pus în coadă.
+    """
+    outbox = conn['outbox']
+    overflow = False
+    successor = None
+
+    with conn['outbox_lock']:
+        if conn['closing']:
+            successor = conn['resumed_by']
+            if successor is None:
+                if conn['session'] is None:
+                    return False
+                # Clientul s-a deconectat, dar poate relua sesiunea: cadrul așteaptă în ea
+                conn['session'].record((frame,))
+                return True
+
+        elif len(outbox) >= config['outbox_limit']:
+            policy = config['overflow_policy']
+            if policy == 'drop_new':
+                metrics.inc('frames_dropped_new')
+                return False
+            if policy == 'drop_oldest':
+                outbox.popleft()
+                metrics.inc('frames_dropped_oldest')
+            else:
+                conn['closing'] = True
+                overflow = True
+
+        if successor is None and (not overflow or conn['session'] is not None):
+            # Cu sesiune, cadrele rămase în coadă trec în sesiune la deconectare
+            outbox.append(frame)
+            conn['wake']()
+
+    if successor is not None:
+        # Destinatarii au fost aleși înainte ca sesiunea să treacă pe conexiunea nouă
+        return enqueue_frame(successor, frame)
+
+    if overflow:
+        metrics.inc('slow_client_disconnects')
+        log.warning('slow_client', '{client} nu citește destul de repede, deconectat.',
+                    client=conn['nickname'] or conn['address'])
+        conn['abort']()
+        return conn['session'] is not None
+
+    metrics.inc('frames_enqueued')
+    return True
+
+
+def take_frames(conn):
+    """
+    Scoate toate cadrele din coada de ieșire (apelat de scriitor). Cadrele
+    unei sesiuni primesc aici numărul de secvență, deci cele aruncate din
+    coadă nu îl primesc; cele de reluare ('replay') pleacă primele, nenumerotate.
+    """
+    with conn['outbox_lock']:
+        frames = list(conn['outbox'])
+        conn['outbox'].clear()
+        session = conn['session']
+        if frames and session is not None:
+            session.record(frames)
+        if conn['replay']:
+            frames = conn['replay'] + frames
+            conn['replay'] = []
+    return frames
+
+
+def prepare_frames(conn, frames):
+    """Comprimă, în ordinea trimiterii, cadrele conexiunilor care au negociat compresia."""
+    compressor = conn['compressor']
+    if compressor is None:
+        return frames
+
+    bytes_in, bytes_out, cpu_ns = compressor.bytes_in, compressor.bytes_out, compressor.cpu_ns
+    frames = [compressor.compress_frame(frame) for frame in frames]
+    if compressor.bytes_in != bytes_in:
+        metrics.inc('compression_bytes_in', compressor.bytes_in - bytes_in)
+        metrics.inc('compression_bytes_saved',
+                    (compressor.bytes_in - bytes_in) - (compressor.bytes_out - bytes_out))
+        metrics.inc('compression_cpu_ns', compressor.cpu_ns - cpu_ns)
+    return frames
+
+
+def write_frames(conn, write, frames):
+    """
+    Scrie cadrele cu write(frames), care returnează numărul de apeluri de
+    sistem făcute, și înregistrează durata și apelurile în metrici.
+    """
+    start = time.perf_counter_ns()
+    calls = write(frames)
+    metrics.observe('send_ns', time.perf_counter_ns() - start)
+    metrics.inc('frames_sent', len(frames))
+    metrics.inc('send_calls', calls)
+
+
+def coalesces(conn):
+    """
+    Doar conexiunile framed primesc mai multe cadre într-o scriere: clientul
+    legacy decodează fiecare recv() ca un singur obiect JSON.
+    """
+    return conn['decoder'].mode == FRAMED
+
+
+def send_vectored(sock, frames):
+    """
+    Trimite cadrele pe un socket blocant cu cât mai puține apeluri sendmsg()
+    (câte un buffer per cadru, fără copiere). Returnează numărul de apeluri.
+    """
+    if not hasattr(sock, 'sendmsg'):
+        sock.sendall(b''.join(frames))
+        return 1
 
+    buffers = [memoryview(frame) for frame in frames]
+    calls = 0
+    while buffers:
+        sent = sock.sendmsg(buffers[:IOV_MAX])
+        calls += 1
+        done = 0
+        while done < len(buffers) and sent >= len(buffers[done]):
+            sent -= len(buffers[done])
+            done += 1
+        del buffers[:done]
+        if sent:
+            buffers[0] = buffers[0][sent:]
+    return calls
 
-def send_to_client(client_socket, msg_type, data):
-    """Trimite un mesaj JSON către un client."""
-    message = json.dumps({"type": msg_type, "data": data})
+
+def set_nodelay(sock):
+    """Scriitorii grupează deja cadrele; algoritmul lui Nagle ar adăuga doar întârziere."""
+    try:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    except (OSError, AttributeError):
+        pass
+
+
+def set_keepalive(sock):
+    """Clienții legacy nu știu de ping: conexiunile moarte le detectează TCP keepalive."""
     try:
-        client_socket.sendall(message.encode('utf-8'))
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+    except (OSError, AttributeError):
+        pass
+
+
+def send_to_client(conn, msg_type, data):
+    """Trimite un mesaj JSON către un client, în formatul folosit de acesta."""
+    try:
+        enqueue_frame(conn, encode_message(msg_type, data, conn['decoder'].mode, conn['encoding']))
     except:
         pass
 
 
-def broadcast(msg_type, data, exclude_nickname=None):
-    """Trimite mesajul către toți clienții conectați."""
+def reply(conn, request, msg_type, data):
+    """Răspunde direct unei cereri; dacă cererea avea 'id', răspunsul îl repetă."""
+    request_id = request.get('id')
+    if request_id is not None:
+        data = dict(data, id=request_id)
+    send_to_client(conn, msg_type, data)
+
+
+def fan_out(recipients, msg_type, data, frames=None):
+    """
+    Trimite același mesaj mai multor clienți: mesajul se serializează o singură
+    dată pentru fiecare codificare folosită (sau deloc, dacă `frames` conține
+    deja cadrele), iar toate cozile primesc același obiect bytes, respectiv o
+    vedere fără prefix pentru clienții legacy.
+    """
+    if frames is None:
+        frames = {}
+    views = {}
+
+    for conn in recipients:
+        key = (conn['decoder'].mode, conn['encoding'])
+        view = views.get(key)
+        if view is None:
+            frame = frames.get(key[1])
+            if frame is None:
+                frame = frames[key[1]] = encode_message(msg_type, data, encoding=key[1])
+            view = views[key] = frame_view(frame, key[0])
+        enqueue_frame(conn, view)
+
+
+def record_history(scope, msg_type, data):
+    """Mesajele de chat intră în istoric cu număr de secvență; restul nu."""
+    if msg_type != 'message':
+        return None
+    return history.record(scope, msg_type, data)
+
+
+def deliver_broadcast(msg_type, data, exclude_nickname=None):
+    """Pune mesajul în coada fiecărui client conectat la acest proces."""
+    with clients_lock:
+        recipients = [info for nickname, info in clients.items() if nickname != exclude_nickname]
+
+    fan_out(recipients, msg_type, data, record_history(None, msg_type, data))
+
+
+def deliver_private(target, msg_type, data):
+    """Livrează un mesaj unui client local; returnează False dacă nu e conectat aici."""
+    with clients_lock:
+        conn = clients.get(target)
+    if conn is None:
+        return False
+    send_to_client(conn, msg_type, data)
+    return True
+
+
+def deliver_room(room, msg_type, data):
+    """Trimite mesajul membrilor locali ai unei camere (cost proporțional cu mărimea camerei)."""
+    with clients_lock:
+        recipients = [clients[nickname] for nickname in rooms.get(room, ())]
+
+    fan_out(recipients, msg_type, data, record_history(room, msg_type, data))
+
+
+def room_broadcast(room, msg_type, data):
+    """Trimite mesajul tuturor membrilor camerei, inclusiv celor de pe alți workeri."""
+    deliver_room(room, msg_type, data)
+    if bus is not None:
+        bus.publish_room(room, msg_type, data)
+
+
+def join_room(nickname, room):
+    """Adaugă utilizatorul în cameră; returnează False dacă era deja membru."""
     with clients_lock:
-        for nickname, info in list(clients.items()):
-            if nickname != exclude_nickname:
-                send_to_client(info['socket'], msg_type, data)
+        members = rooms.setdefault(room, set())
+        if nickname in members:
+            return False
+        first_member = not members
+        members.add(nickname)
+        member_rooms.setdefault(nickname, set()).add(room)
+
+    if first_member and bus is not None:
+        bus.subscribe_room(room)
+    return True
+
+
+def leave_room(nickname, room):
+    """Scoate utilizatorul din cameră; returnează False dacă nu era membru."""
+    with clients_lock:
+        members = rooms.get(room)
+        if not members or nickname not in members:
+            return False
+        members.discard(nickname)
+        member_rooms[nickname].discard(room)
+        if not member_rooms[nickname]:
+            del member_rooms[nickname]
+        emptied = not members
+        if emptied:
+            del rooms[room]
+
+    if emptied and bus is not None:
+        bus.unsubscribe_room(room)
+    return True
+
+
+def leave_all_rooms(nickname):
+    """La deconectare: parcurge doar camerele utilizatorului, nu toate camerele."""
+    with clients_lock:
+        user_rooms = member_rooms.pop(nickname, set())
+        emptied = []
+        for room in user_rooms:
+            members = rooms[room]
+            members.discard(nickname)
+            if not members:
+                del rooms[room]
+                emptied.append(room)
+
+    if bus is not None:
+        for room in emptied:
+            bus.unsubscribe_room(room)
+
+
+def broadcast(msg_type, data, exclude_nickname=None):
+    """Trimite mesajul tuturor clienților, inclusiv celor de pe alți workeri (nu blochează)."""
+    deliver_broadcast(msg_type, data, exclude_nickname)
+    if bus is not None:
+        bus.publish_broadcast(msg_type, data, exclude_nickname)
 
 
 def get_user_list():
-    """Returnează lista de utilizatori conectați."""
+    """Returnează lista de utilizatori conectați (din tot clusterul)."""
     with clients_lock:
-        return list(clients.keys())
+        users = list(clients.keys())
+    if bus is not None:
+        users.extend(bus.remote_users())
+    return users
+
+
+def register_client(conn, msg):
+    """
+    Tratează primul mesaj al unei conexiuni.
+    Returnează False dacă nickname-ul este deja folosit și conexiunea trebuie închisă.
+    """
+    if msg['type'] != 'register':
+        return True
+
+    nickname = msg['data']['nickname']
+    conn['register_request'] = msg['data']
+    if conn['decoder'].mode == FRAMED:
+        if msg['data'].get('encoding') == BINARY:
+            conn['encoding'] = BINARY
+        negotiate_compression(conn, msg['data'])
+
+    if bus is not None:
+        # Unicitatea se verifică în hub; mesajele următoare așteaptă în backlog
+        conn['registering'] = True
+        bus.claim(nickname, lambda ok: finish_cluster_registration(conn, nickname, ok))
+        return True
+
+    with clients_lock:
+        if nickname in clients:
+            reply(conn, msg['data'], 'error', {'message': 'Nickname-ul este deja folosit!'})
+            return False
+        clients[nickname] = conn
+        conn['nickname'] = nickname
+        if msg['data'].get('resumable'):
+            open_session(conn)
+
+    complete_registration(conn)
+    return True
+
+
+def negotiate_compression(conn, request):
+    """Pornește compresia dacă clientul o cere și serverul nu a dezactivat-o."""
+    if request.get('compression') == ZLIB and config['compress_threshold'] > 0:
+        conn['compressor'] = FrameCompressor(config['compress_threshold'])
+        conn['decoder'].enable_compression()
+
+
+def open_session(conn):
+    """
+    Creează sesiunea reluabilă a unui client abia înregistrat (cu clients_lock
+    deținut). Sesiunile există doar într-un singur proces și doar pentru
+    clienții framed.
+    """
+    if bus is not None or config['session_ttl'] <= 0 or conn['decoder'].mode != FRAMED:
+        return
+    session = Session(conn['nickname'], conn['encoding'], config['session_buffer_bytes'])
+    session.conn = conn
+    sessions[session.token] = session
+    conn['session'] = session
+
+
+def resume_session(conn, msg):
+    """
+    Tratează un mesaj 'resume' (primul mesaj al unei conexiuni noi): conexiunea
+    preia sesiunea, iar clientul primește 'resumed' și apoi cadrele pe care nu
+    le-a primit. Dacă sesiunea nu mai poate fi reluată, clientul primește o
+    eroare și se poate înregistra normal pe aceeași conexiune.
+    """
+    request = msg['data']
+    frames = None
+
+    with clients_lock:
+        session = sessions.get(request.get('session')) if conn['decoder'].mode == FRAMED else None
+        if session is not None:
+            old = session.conn
+            with old['outbox_lock']:
+                frames = session.replay(request.get('last'))
+                if frames is not None:
+                    # Vechea conexiune nu mai trimite nimic; ce avea în coadă trece pe cea nouă
+                    pending = list(old['outbox'])
+                    old['outbox'].clear()
+                    old['closing'] = True
+                    old['session'] = None
+                    old['nickname'] = None
+                    old['resumed_by'] = conn
+
+        if frames is not None:
+            if session.expiry is not None:
+                session.expiry.cancel()
+                session.expiry = None
+            session.conn = conn
+            conn['session'] = session
+            conn['nickname'] = session.nickname
+            conn['encoding'] = session.encoding
+            conn['presence'] = old['presence']
+            clients[session.nickname] = conn
+            negotiate_compression(conn, request)
+
+            resumed = {'nickname': session.nickname, 'seq': session.seq, 'missed': len(frames)}
+            if conn['compressor'] is not None:
+                resumed['compression'] = ZLIB
+            if request.get('id') is not None:
+                resumed['id'] = request['id']
+            with conn['outbox_lock']:
+                conn['replay'] = [encode_message('resumed', resumed, FRAMED, session.encoding)] + frames
+                conn['outbox'].extend(pending)
+                conn['wake']()
+
+    if frames is None:
+        metrics.inc('sessions_rejected')
+        if session is not None:
+            # Cadrele lipsă nu mai sunt în buffer: sesiunea se încheie, clientul o ia de la capăt
+            end_session(session)
+        reply(conn, request, 'error', {'message': 'Sesiunea nu mai poate fi reluată.'})
+        conn['first_message'] = True
+        return
+
+    if not old['parked']:
+        # Clientul a revenit înainte ca serverul să observe că vechea conexiune a căzut
+        old['abort']()
+    cancel_timer(conn, 'register')
+    registration_admitted(conn)
+    metrics.inc('sessions_resumed')
+    metrics.inc('session_frames_replayed', len(frames))
+    log.info('session_resumed', '{nickname} și-a reluat sesiunea ({missed} mesaje pierdute).',
+             nickname=session.nickname, missed=len(frames))
+
+
+def end_session(session):
+    """Încheie o sesiune: clientul ei este scos din chat ca la o deconectare obișnuită."""
+    with clients_lock:
+        if sessions.get(session.token) is not session:
+            return
+        del sessions[session.token]
+        conn = session.conn
+        conn['logout'] = True
+        if session.expiry is not None:
+            session.expiry.cancel()
+            session.expiry = None
+        parked = conn['parked']
+
+    if not parked:
+        conn['abort']()
+    # Imediat, nu la închiderea conexiunii, ca nickname-ul să poată fi folosit din nou
+    drop_client(conn)
+
+
+def expire_session(session, conn):
+    """Timer-ul unei sesiuni parcate: clientul nu a revenit la timp."""
+    with clients_lock:
+        if session.conn is not conn or sessions.get(session.token) is not session:
+            return
+        del sessions[session.token]
+        session.expiry = None
+
+    metrics.inc('sessions_expired')
+    log.info('session_expired', 'Sesiunea lui {nickname} a expirat.', nickname=session.nickname)
+    drop_client(conn)
+
+
+def finish_cluster_registration(conn, nickname, ok):
+    """Primește de la hub rezultatul rezervării nickname-ului."""
+    conn['registering'] = False
+
+    if conn['closing']:
+        # Clientul a plecat între timp
+        if ok:
+            bus.release(nickname)
+        return
+
+    if not ok:
+        reply(conn, conn['register_request'], 'error', {'message': 'Nickname-ul este deja folosit!'})
+        conn['close']()
+        return
+
+    with clients_lock:
+        clients[nickname] = conn
+        conn['nickname'] = nickname
+    complete_registration(conn)
+
+    backlog, conn['backlog'] = conn['backlog'], []
+    try:
+        for msg in backlog:
+            handle_message(conn, msg)
+    except Exception as e:
+        log.error('client_error', '{client}: {error}', client=nickname, error=repr(e))
+        conn['close']()
+
+
+def complete_registration(conn):
+    """Confirmă înregistrarea clientului și anunță ceilalți utilizatori."""
+    nickname = conn['nickname']
+    address = conn['address']
+    log.info('connect', '{nickname} ({address}) s-a conectat.', nickname=nickname, address=address)
+    cancel_timer(conn, 'register')
+    registration_admitted(conn)
+    request = conn.pop('register_request', {})
+    registered = {'nickname': nickname, 'ip': address[0], 'port': address[1], 'encoding': conn['encoding']}
+    if conn['compressor'] is not None:
+        registered['compression'] = ZLIB
+    if conn['session'] is not None:
+        registered['session'] = conn['session'].token
+    reply(conn, request, 'registered', registered)
+    announce_presence(nickname, True)
+
+    subscribe = request.get('presence')
+    if subscribe:
+        # Întâi abonarea, apoi rosterul: nicio modificare nu cade între ele
+        conn['presence'] = True
+        since = subscribe.get('since') if isinstance(subscribe, dict) else None
+        send_presence(conn, {}, since, subscribe.get('epoch') if since is not None else None)
+    error = history_error(request.get('history'))
+    if error:
+        reply(conn, request, 'error', {'message': error})
+    else:
+        replay_history(conn, None, request.get('history'))
+    deliver_spooled(nickname)
+
+
+def announce_presence(nickname, joined):
+    """
+    Aplică intrarea sau ieșirea în prezență și o anunță clienților locali:
+    abonații primesc delta versionată, ceilalți notificarea text.
+    Workerii află de utilizatorii celorlalți prin bus (user_joined/user_left).
+    """
+    version = presence.join(nickname) if joined else presence.leave(nickname)
+    if version is None:
+        return
+
+    with clients_lock:
+        recipients = [info for name, info in clients.items() if name != nickname]
+    fan_out([info for info in recipients if info['presence']], 'presence',
+            {'version': version, ('joined' if joined else 'left'): [nickname]})
+    message = f'{nickname} s-a alăturat chat-ului!' if joined else f'{nickname} a părăsit chat-ul.'
+    fan_out([info for info in recipients if not info['presence']], 'notification', {'message': message})
+
+
+def send_presence(conn, request, since=None, epoch=None):
+    """Trimite modificările de prezență de după versiunea `since` sau, dacă nu se poate, tot rosterul."""
+    state = presence.snapshot() if since is None else presence.since(since, epoch)
+    metrics.inc('presence_snapshots_sent' if 'users' in state else 'presence_deltas_sent')
+    reply(conn, request, 'presence', state)
+
+
+def history_error(request):
+    """Verifică cererea de istoric ({'last': N} sau {'since': seq}); returnează mesajul de eroare sau None."""
+    if not request:
+        return None
+    if not isinstance(request, dict):
+        return 'Cererea de istoric trebuie să fie un obiect cu last sau since!'
+    last, since = request.get('last'), request.get('since')
+    if last is not None and (not isinstance(last, int) or isinstance(last, bool) or last < 0):
+        return 'history.last trebuie să fie un întreg nenegativ!'
+    if since is not None and (not isinstance(since, (int, float)) or isinstance(since, bool) or since < 0):
+        return 'history.since trebuie să fie un număr nenegativ!'
+    return None
+
+
+def replay_history(conn, scope, request):
+    """
+    Trimite mesajele cerute din istoric: {'last': N} sau {'since': seq}.
+    Cadrele sunt cele deja codificate; la final clientul primește history_end.
+    """
+    if not request:
+        return
+
+    frames, last_seq = history.replay(scope, conn['encoding'],
+                                      last=request.get('last'), since=request.get('since'))
+    mode = conn['decoder'].mode
+    for frame in frames:
+        enqueue_frame(conn, frame_view(frame, mode))
+    send_to_client(conn, 'history_end', {'room': scope, 'count': len(frames), 'seq': last_seq})
+
+
+def handle_message(conn, msg):
+    """Tratează un mesaj primit de la un client deja conectat."""
+    nickname = conn['nickname']
+    msg_type = msg['type']
+    request = msg['data']
+
+    if msg_type == 'broadcast':
+        log.info('broadcast', '{nickname}: mesaj de {length} caractere',
+                 nickname=nickname, length=len(msg['data']['message']))
+        broadcast('message', {'from': nickname, 'message': msg['data']['message'], 'type': 'broadcast'})
+
+    elif msg_type == 'private':
+        target = msg['data']['to']
+        message = msg['data']['message']
+        # Conținutul mesajelor private nu ajunge niciodată în jurnal
+        log.info('private', '{nickname} -> {target}: mesaj de {length} caractere',
+                 nickname=nickname, target=target, length=len(message))
+
+        payload = {'from': nickname, 'message': message, 'type': 'private'}
+        if deliver_private(target, 'message', payload):
+            delivered = True
+        elif bus is not None and bus.has_user(target):
+            bus.send_private(target, 'message', payload)
+            delivered = True
+        else:
+            delivered = False
+
+        if delivered:
+            reply(conn, request, 'message',
+                  {'from': f'Tu -> {target}', 'message': message, 'type': 'private_sent'})
+        elif spool is not None:
+            spool_private(conn, request, target, payload)
+        else:
+            reply(conn, request, 'error', {'message': f'Utilizatorul {target} nu există!'})
+
+    elif msg_type in ('join', 'leave', 'room_message'):
+        handle_room_message(conn, msg_type, msg['data'])
+
+    elif msg_type == 'list_users':
+        if 'since' in request:
+            send_presence(conn, request, request['since'], request.get('epoch'))
+        else:
+            reply(conn, request, 'user_list', {'users': get_user_list()})
+
+    elif msg_type == 'my_info':
+        with clients_lock:
+            info = clients.get(nickname)
+            if info:
+                reply(conn, request, 'info',
+                      {'nickname': nickname, 'ip': info['address'][0], 'port': info['address'][1]})
+
+    elif msg_type == 'stats':
+        reply(conn, request, 'stats', {'metrics': metrics.snapshot()})
+
+    elif msg_type == 'ping':
+        reply(conn, request, 'pong', {})
+
+    elif msg_type == 'pong':
+        # Răspunsul la heartbeat; receive_data() a notat deja activitatea
+        pass
+
+    elif msg_type == 'logout':
+        # Ieșire voită: sesiunea nu se mai păstrează
+        conn['logout'] = True
+        drop_client(conn)
+        conn['close']()
+
+
+def spool_private(conn, request, target, payload):
+    """Păstrează pe disc mesajul pentru un destinatar deconectat; confirmarea pleacă după fsync."""
+    def stored(error):
+        if error is not None:
+            metrics.inc('spool_failed')
+            reply(conn, request, 'error', {'message': f'Mesajul pentru {target} nu a putut fi păstrat: {error}'})
+            return
+        reply(conn, request, 'message',
+              {'from': f'Tu -> {target}', 'message': payload['message'], 'type': 'private_queued'})
+        # Destinatarul s-ar fi putut conecta cât timp mesajul era în lot
+        deliver_spooled(target)
+
+    if spool.append(target, dict(payload, sent=int(time.time())), stored):
+        metrics.inc('spool_queued')
+    else:
+        metrics.inc('spool_rejected')
+        reply(conn, request, 'error', {'message': f'Prea multe mesaje în așteptare pentru {target}!'})
+
+
+def deliver_spooled(nickname):
+    """Trimite, în ordine, mesajele private păstrate pentru un client conectat aici."""
+    if spool is None:
+        return
+    with clients_lock:
+        conn = clients.get(nickname)
+    if conn is None:
+        return
+    if spool_reader is None:
+        send_spooled(conn, spool.take(nickname))
+        return
+    future = asyncio.get_running_loop().run_in_executor(spool_reader, spool.take, nickname)
+    future.add_done_callback(lambda done: spooled_read(nickname, done))
+
+
+def spooled_read(nickname, done):
+    """Rulează în buclă după ce spool.take() a citit mesajele pe thread-ul spool_reader."""
+    if done.cancelled():
+        return
+    if done.exception() is not None:
+        # take() a lăsat mesajele în spool
+        log.error('spool', 'Eroare la citirea spool-ului: {error}', error=repr(done.exception()))
+        return
+    messages = done.result()
+    with clients_lock:
+        conn = clients.get(nickname)
+    if conn is None:
+        # S-a deconectat cât citeam: mesajele se pun la loc, în aceeași ordine
+        lost = sum(not spool.append(nickname, data) for data in messages)
+        if lost:
+            metrics.inc('spool_rejected', lost)
+        return
+    send_spooled(conn, messages)
+
+
+def send_spooled(conn, messages):
+    nickname = conn['nickname']
+    for data in messages:
+        send_to_client(conn, 'message', data)
+    if messages:
+        metrics.inc('spool_delivered', len(messages))
+        log.info('spool_delivered', '{nickname} a primit {count} mesaje private păstrate.',
+                 nickname=nickname, count=len(messages))
+
+
+def handle_room_message(conn, msg_type, data):
+    """Tratează mesajele join, leave și room_message."""
+    nickname = conn['nickname']
+    room = str(data.get('room', '')).strip()
+
+    if not nickname:
+        reply(conn, data, 'error', {'message': 'Trebuie să te înregistrezi mai întâi!'})
+        return
+    if not room:
+        reply(conn, data, 'error', {'message': 'Numele camerei nu poate fi gol!'})
+        return
+
+    if msg_type == 'join':
+        error = history_error(data.get('history'))
+        if error:
+            reply(conn, data, 'error', {'message': error})
+            return
+        if not join_room(nickname, room):
+            reply(conn, data, 'error', {'message': f'Ești deja în camera {room}!'})
+            return
+        reply(conn, data, 'joined', {'room': room})
+        replay_history(conn, room, data.get('history'))
+        room_broadcast(room, 'notification',
+                       {'message': f'{nickname} a intrat în camera {room}.', 'room': room})
+
+    elif msg_type == 'leave':
+        if not leave_room(nickname, room):
+            reply(conn, data, 'error', {'message': f'Nu ești în camera {room}!'})
+            return
+        reply(conn, data, 'left', {'room': room})
+        room_broadcast(room, 'notification',
+                       {'message': f'{nickname} a părăsit camera {room}.', 'room': room})
+
+    else:
+        with clients_lock:
+            is_member = room in member_rooms.get(nickname, ())
+        if not is_member:
+            reply(conn, data, 'error', {'message': f'Nu ești în camera {room}!'})
+            return
+        log.info('room_message', '{nickname} în #{room}: mesaj de {length} caractere',
+                 nickname=nickname, room=room, length=len(data['message']))
+        room_broadcast(room, 'message',
+                       {'from': nickname, 'message': data['message'], 'type': 'room', 'room': room})
+
+
+def receive_data(conn, data):
+    """
+    Decodează octeții primiți și tratează fiecare mesaj complet.
+    Returnează False dacă conexiunea trebuie închisă.
+    """
+    decoder = conn['decoder']
+    conn['last_seen'] = now = time.monotonic()
+    messages = decoder.feed(data)
+    if decoder.inflate_ns:
+        metrics.inc('decompression_cpu_ns', decoder.inflate_ns)
+        decoder.inflate_ns = 0
+
+    # Timeout-ul de citire măsoară cât stă un mesaj început fără să se termine
+    if messages or not decoder.buffer:
+        conn['partial_since'] = None
+    if decoder.buffer and conn['partial_since'] is None:
+        conn['partial_since'] = now
+        if config['read_timeout'] and 'read' not in conn['timers']:
+            arm_timer(conn, 'read', config['read_timeout'], lambda: check_read(conn))
+
+    for msg in messages:
+        metrics.inc(MESSAGE_COUNTERS.get(msg.get('type'), UNKNOWN_MESSAGE_COUNTER))
+        if conn['first_message']:
+            conn['first_message'] = False
+            if msg.get('type') == 'resume':
+                resume_session(conn, msg)
+            elif not register_client(conn, msg):
+                return False
+        elif not allow_message(conn, msg, now):
+            continue
+        elif conn['registering']:
+            conn['backlog'].append(msg)
+        else:
+            start = time.perf_counter_ns()
+            handle_message(conn, msg)
+            metrics.observe('handle_ns', time.perf_counter_ns() - start)
+    return True
+
+
+def allow_message(conn, msg, now):
+    """
+    Verifică limitele de mesaje ale expeditorului (nickname și IP). Mesajul
+    peste limită se aruncă; doar primul dintr-un șir de respingeri primește
+    o eroare, ca un client care inundă serverul să nu fie servit în continuare.
+    """
+    msg_type = msg.get('type')
+    if msg_type not in MESSAGE_COUNTERS:
+        msg_type = 'unknown'
+    nickname = conn['nickname']
+    if ((nickname is None or nickname_limits.allow(nickname, msg_type, now))
+            and ip_limits.allow(conn['address'][0], msg_type, now)):
+        conn['rate_limited'] = False
+        return True
+
+    metrics.inc(RATE_LIMITED_COUNTERS.get(msg_type, UNKNOWN_RATE_LIMITED_COUNTER))
+    if not conn['rate_limited']:
+        conn['rate_limited'] = True
+        metrics.inc('rate_limit_notices')
+        log.info('rate_limited', '{client} a depășit limita pentru mesajele {type}.',
+                 client=nickname or conn['address'], type=msg_type)
+        data = msg.get('data')
+        reply(conn, data if isinstance(data, dict) else {}, 'error',
+              {'message': f'Prea multe mesaje ({msg_type}); mesajele peste limită sunt ignorate.'})
+    return False
+
+
+def admit_connection(address):
+    """Decide la accept() dacă o conexiune nouă este primită; refuzul costă doar un close()."""
+    reason = admission.admit(address[0])
+    if reason is None:
+        return True
+    metrics.inc(ADMISSION_COUNTERS[reason])
+    log.debug('connection_rejected', 'Conexiune refuzată de la {address}: {reason}',
+              address=address, reason=reason)
+    return False
+
+
+def registration_admitted(conn):
+    """Conexiunea s-a înregistrat: nu mai ocupă un loc printre cele în așteptare."""
+    if conn['pending_registration']:
+        conn['pending_registration'] = False
+        admission.registered()
+
+
+def release_connection(conn):
+    admission.release(conn['address'][0], conn['pending_registration'])
+    conn['pending_registration'] = False
+
+
+def prune_limits():
+    """Uită periodic gălețile pline, ca memoria să urmărească doar clienții activi."""
+    now = time.monotonic()
+    nickname_limits.prune(now)
+    ip_limits.prune(now)
+    timers.schedule(LIMITS_PRUNE_INTERVAL, prune_limits)
+
+
+def configure_limits(args):
+    """Aplică limitele din fișierul --limits și apoi pe cele din linia de comandă."""
+    limits = load_limits(args.limits) if args.limits else {}
+    rules = [(scope, msg_type, *rule) for scope in ('nickname', 'ip')
+             for msg_type, rule in limits.get(scope, {}).items()]
+    rules.extend(parse_rule(text) for text in args.rate_limit)
+    for scope, msg_type, rate, *burst in rules:
+        limiter = nickname_limits if scope == 'nickname' else ip_limits
+        limiter.set_rule(msg_type, rate, burst[0] if burst else None)
+        if rate:
+            config['rate_limits'][scope][msg_type] = limiter.rules[msg_type]
+        else:
+            config['rate_limits'][scope].pop(msg_type, None)
+
+    for key in ('max_connections', 'max_connections_per_ip', 'max_pending_registrations'):
+        value = getattr(args, key)
+        if value is None:
+            value = limits.get(key, config[key])
+        config[key] = value
+        setattr(admission, key, value)
+
+
+# Timeout-urile conexiunilor. Timerele nu se reprogramează la fiecare mesaj
+# primit: receive_data() doar notează momentul, iar timerul care expiră
+# verifică starea și, dacă între timp a fost activitate, se reprogramează
+# pentru restul intervalului.
+
+def arm_timer(conn, name, delay, callback):
+    """(Re)programează timerul `name` al conexiunii pe roata comună."""
+    old = conn['timers'].get(name)
+    if old is not None:
+        old.cancel()
+    conn['timers'][name] = timers.schedule(delay, callback)
+
+
+def cancel_timer(conn, name):
+    timer = conn['timers'].pop(name, None)
+    if timer is not None:
+        timer.cancel()
+
+
+def start_connection_timers(conn):
+    """Timeout-ul de înregistrare și heartbeat-ul unei conexiuni noi."""
+    if config['register_timeout']:
+        arm_timer(conn, 'register', config['register_timeout'], lambda: check_registration(conn))
+    interval = config['ping_interval'] or config['idle_timeout']
+    if interval:
+        arm_timer(conn, 'idle', interval, lambda: check_idle(conn))
+
+
+def cancel_connection_timers(conn):
+    for name in list(conn['timers']):
+        cancel_timer(conn, name)
+
+
+def reap_connection(conn, reason):
+    """Închide o conexiune inactivă și o numără în metrici."""
+    metrics.inc(REAP_COUNTERS[reason])
+    log.info('reaped', '{client} deconectat: {reason}.', client=conn['nickname'] or conn['address'],
+             reason=REAP_REASONS[reason])
+    conn['abort']()
+
+
+def check_registration(conn):
+    conn['timers'].pop('register', None)
+    if conn['nickname'] is None and not conn['closing']:
+        reap_connection(conn, 'registration')
+
+
+def check_read(conn):
+    conn['timers'].pop('read', None)
+    since = conn['partial_since']
+    if since is None or conn['closing']:
+        return
+    waited = time.monotonic() - since
+    if waited >= config['read_timeout']:
+        reap_connection(conn, 'read')
+    else:
+        arm_timer(conn, 'read', config['read_timeout'] - waited, lambda: check_read(conn))
+
+
+def check_idle(conn):
+    """
+    Heartbeat: ping după ping_interval de liniște, închidere după idle_timeout.
+    Clienții legacy (JSON fără încadrare) nu pot răspunde la ping, deci nu
+    primesc ping și nu sunt închiși pentru liniște; pentru ei rămâne keepalive.
+    """
+    conn['timers'].pop('idle', None)
+    if conn['closing']:
+        return
+    if conn['decoder'].mode == LEGACY:
+        set_keepalive(conn['socket'])
+        return
+    idle = time.monotonic() - conn['last_seen']
+    ping_interval, idle_timeout = config['ping_interval'], config['idle_timeout']
+    if idle_timeout and idle >= idle_timeout:
+        reap_connection(conn, 'idle')
+        return
+
+    delays = []
+    if ping_interval:
+        if idle >= ping_interval and conn['nickname']:
+            send_to_client(conn, 'ping', {})
+            metrics.inc('pings_sent')
+        delays.append(ping_interval - idle if idle < ping_interval else ping_interval)
+    if idle_timeout:
+        delays.append(idle_timeout - idle)
+    arm_timer(conn, 'idle', min(delays), lambda: check_idle(conn))
+
+
+def run_timer_thread():
+    """Motorul threaded: un singur thread avansează roata de timere."""
+    def tick():
+        while True:
+            time.sleep(TIMER_TICK)
+            timers.run()
+
+    threading.Thread(target=tick, name='chat-timers', daemon=True).start()
+
+
+async def run_timer_loop():
+    """Motorul asyncio: roata de timere avansează pe bucla de evenimente."""
+    while True:
+        await asyncio.sleep(TIMER_TICK)
+        timers.run()
+
+
+def outbox_depths():
+    """Lungimile cozilor de ieșire ale clienților înregistrați."""
+    with clients_lock:
+        return [len(info['outbox']) for info in clients.values()]
+
+
+def open_connections():
+    counters = metrics.counters
+    return counters['connections_opened'] - counters['connections_closed']
+
+
+metrics.gauge('connections', open_connections)
+metrics.gauge('clients_registered', lambda: len(clients))
+metrics.gauge('rooms', lambda: len(rooms))
+metrics.gauge('threads', threading.active_count)
+metrics.gauge('send_calls_per_frame',
+              lambda: round(metrics.counters['send_calls'] / max(1, metrics.counters['frames_sent']), 4))
+metrics.gauge('outbox_frames', lambda: sum(outbox_depths()))
+metrics.gauge('outbox_frames_max', lambda: max(outbox_depths(), default=0))
+metrics.gauge('log_queue', lambda: len(log.records))
+metrics.gauge('log_dropped', lambda: log.dropped)
+metrics.gauge('history_bytes', lambda: history.stats()['bytes'])
+metrics.gauge('history_messages', lambda: history.stats()['messages'])
+metrics.gauge('presence_version', lambda: presence.version)
+metrics.gauge('timers', lambda: timers.count)
+metrics.gauge('sessions', lambda: len(sessions))
+metrics.gauge('sessions_parked', lambda: sum(1 for session in list(sessions.values()) if session.conn['parked']))
+metrics.gauge('spool_messages', lambda: spool.stats()['messages'] if spool is not None else 0)
+metrics.gauge('spool_segments', lambda: spool.stats()['segments'] if spool is not None else 0)
+metrics.gauge('spool_records_per_commit',
+              lambda: round(spool.records / max(1, spool.commits), 2) if spool is not None else 0)
+
+
+def unregister_client(conn):
+    """
+    Apelat când conexiunea se închide. Clientul cu sesiune rămâne înregistrat
+    (parcat) până la expirarea sesiunii, ca să o poată relua; ceilalți sunt
+    scoși imediat.
+    """
+    if not conn['nickname']:
+        return
+    if conn['session'] is not None and park_client(conn):
+        return
+    drop_client(conn)
+
+
+def park_client(conn):
+    """
+    Păstrează nickname-ul, camerele și sesiunea unui client deconectat; ce
+    avea în coadă și ce primește de acum intră în sesiune. Returnează False
+    dacă clientul trebuie scos (a ieșit voit sau sesiunea s-a încheiat).
+    """
+    with clients_lock:
+        if conn['nickname'] is None:
+            # Sesiunea a fost preluată între timp de o conexiune nouă
+            return True
+        session = conn['session']
+        if session is None or conn['logout'] or sessions.get(session.token) is not session:
+            return False
+        with conn['outbox_lock']:
+            conn['closing'] = True
+            session.record(conn['outbox'])
+            conn['outbox'].clear()
+        conn['parked'] = True
+        session.expiry = timers.schedule(config['session_ttl'], lambda: expire_session(session, conn))
+
+    log.info('session_parked', '{nickname} s-a deconectat; sesiunea se păstrează {ttl} s.',
+             nickname=session.nickname, ttl=config['session_ttl'])
+    return True
+
+
+def drop_client(conn):
+    """Scoate clientul din registru și anunță ceilalți utilizatori."""
+    nickname = conn['nickname']
+    if not nickname:
+        return
+
+    with clients_lock:
+        if clients.get(nickname) is conn:
+            del clients[nickname]
+        session = conn['session']
+        if session is not None and sessions.get(session.token) is session:
+            del sessions[session.token]
+        conn['session'] = None
+    conn['nickname'] = None
+    leave_all_rooms(nickname)
+    if bus is not None:
+        bus.release(nickname)
+    announce_presence(nickname, False)
+    log.info('disconnect', '{nickname} a închis conexiunea.', nickname=nickname)
+
+
+# ---------------------------------------------------------------------------
+# Motorul clasic: un thread pentru fiecare conexiune
+# ---------------------------------------------------------------------------
+
+def writer_loop(conn):
+    """
+    Golește coada de ieșire a unui client pe socket, în thread-ul propriu.
+    Toate cadrele adunate în coadă pleacă împreună, într-un sendmsg() vectorial
+    (pentru clienții legacy, câte unul pe scriere).
+    """
+    client_socket = conn['socket']
+    ready = conn['outbox_ready']
+
+    def send_batch(frames):
+        if not coalesces(conn):
+            for frame in frames:
+                client_socket.sendall(frame)
+            return len(frames)
+        return send_vectored(client_socket, frames)
+
+    while True:
+        with ready:
+            while not conn['outbox'] and not conn['replay'] and not conn['closing']:
+                ready.wait()
+            if not conn['outbox'] and not conn['replay']:
+                return
+
+            # Așteptăm puțin și alte cadre, dar primul nu stă mai mult de max_write_delay
+            delay = config['max_write_delay'] if coalesces(conn) else 0
+            if delay:
+                deadline = time.monotonic() + delay
+                while len(conn['outbox']) < WRITE_BATCH_FRAMES and not conn['closing']:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    ready.wait(remaining)
+
+        try:
+            write_frames(conn, send_batch, prepare_frames(conn, take_frames(conn)))
+        except OSError:
+            conn['abort']()
+            return
+
+
+def close_threaded(conn):
+    """Cere scriitorului să trimită ce a rămas în coadă și să se oprească."""
+    with conn['outbox_ready']:
+        conn['closing'] = True
+        conn['outbox_ready'].notify()
+
+
+def abort_threaded(conn):
+    """Întrerupe imediat conexiunea; recv() și sendall() blocate se deblochează."""
+    close_threaded(conn)
+    try:
+        conn['socket'].shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass
 
 
 def handle_client(client_socket, address):
     """Gestionează comunicarea cu un client individual."""
-    nickname = None
-    
+    set_nodelay(client_socket)
+    conn = new_connection(client_socket, address)
+    conn['wake'] = conn['outbox_ready'].notify
+    conn['close'] = lambda: close_threaded(conn)
+    conn['abort'] = lambda: abort_threaded(conn)
+    start_connection_timers(conn)
+
+    writer = threading.Thread(target=writer_loop, args=(conn,))
+    writer.daemon = True
+    writer.start()
+
     try:
-        # Primește nickname-ul
-        data = client_socket.recv(1024)
-        if not data:
-            return
-        
-        msg = json.loads(data.decode('utf-8'))
-        if msg['type'] == 'register':
-            nickname = msg['data']['nickname']
-            
-            with clients_lock:
-                if nickname in clients:
-                    send_to_client(client_socket, 'error', {'message': 'Nickname-ul este deja folosit!'})
-                    client_socket.close()
-                    return
-                clients[nickname] = {'socket': client_socket, 'address': address}
-            
-            print(f"[CONEXIUNE NOUĂ] {nickname} ({address}) s-a conectat.")
-            send_to_client(client_socket, 'registered', {'nickname': nickname, 'ip': address[0], 'port': address[1]})
-            broadcast('notification', {'message': f'{nickname} s-a alăturat chat-ului!'}, exclude_nickname=nickname)
-        
-        # Bucla principală pentru mesaje
+        # Bucla principală pentru mesaje; primul mesaj complet este înregistrarea
         while True:
             data = client_socket.recv(4096)
             if not data:
                 break
-            
-            msg = json.loads(data.decode('utf-8'))
-            msg_type = msg['type']
-            
-            if msg_type == 'broadcast':
-                print(f"[BROADCAST] {nickname}: {msg['data']['message']}")
-                broadcast('message', {'from': nickname, 'message': msg['data']['message'], 'type': 'broadcast'})
-            
-            elif msg_type == 'private':
-                target = msg['data']['to']
-                message = msg['data']['message']
-                print(f"[PRIVAT] {nickname} -> {target}: {message}")
-                
-                with clients_lock:
-                    if target in clients:
-                        send_to_client(clients[target]['socket'], 'message', 
-                                      {'from': nickname, 'message': message, 'type': 'private'})
-                        send_to_client(client_socket, 'message', 
-                                      {'from': f'Tu -> {target}', 'message': message, 'type': 'private_sent'})
-                    else:
-                        send_to_client(client_socket, 'error', {'message': f'Utilizatorul {target} nu există!'})
-            
-            elif msg_type == 'list_users':
-                users = get_user_list()
-                send_to_client(client_socket, 'user_list', {'users': users})
-            
-            elif msg_type == 'my_info':
-                with clients_lock:
-                    info = clients.get(nickname)
-                    if info:
-                        send_to_client(client_socket, 'info', 
-                                      {'nickname': nickname, 'ip': info['address'][0], 'port': info['address'][1]})
-    
+
+            if not receive_data(conn, data):
+                break
+
     except ConnectionResetError:
-        print(f"[DECONECTARE] {nickname or address} s-a deconectat brusc.")
-    except json.JSONDecodeError:
-        print(f"[EROARE] Mesaj invalid de la {nickname or address}")
+        log.info('connection_reset', '{client} s-a deconectat brusc.', client=conn['nickname'] or address)
+    except FrameError:
+        log.warning('invalid_frame', 'Mesaj invalid de la {client}', client=conn['nickname'] or address)
     except Exception as e:
-        print(f"[EROARE] {nickname or address}: {e}")
+        log.error('client_error', '{client}: {error}', client=conn['nickname'] or address, error=repr(e))
     finally:
-        if nickname:
-            with clients_lock:
-                if nickname in clients:
-                    del clients[nickname]
-            broadcast('notification', {'message': f'{nickname} a părăsit chat-ul.'})
-            print(f"[DECONECTAT] {nickname} a închis conexiunea.")
+        cancel_connection_timers(conn)
+        unregister_client(conn)
+        close_threaded(conn)
+        writer.join(timeout=5)
         client_socket.close()
+        release_connection(conn)
+        metrics.inc('connections_closed')
 
 
-def main():
+def run_threaded_server(host, port):
+    """Pornește serverul cu câte un thread pentru fiecare client."""
     server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-    
-    server_socket.bind((HOST, PORT))
+
+    server_socket.bind((host, port))
     server_socket.listen()
-    
-    print(f"[SERVER PORNIT] Ascultă pe {HOST}:{PORT}")
-    print("[INFO] Apasă Ctrl+C pentru a opri serverul.")
-    
+    run_timer_thread()
+
+    log.info('server_started', 'Ascultă pe {host}:{port} (motor: {engine})', host=host, port=port,
+             engine='threaded')
+    log.info('server_started', 'Apasă Ctrl+C pentru a opri serverul.')
+
     try:
         while True:
             client_socket, address = server_socket.accept()
+            if not admit_connection(address):
+                client_socket.close()
+                continue
             thread = threading.Thread(target=handle_client, args=(client_socket, address))
             thread.daemon = True
             thread.start()
-            print(f"[CONEXIUNI ACTIVE] {threading.active_count() - 1}")
-    
+            log.debug('connections', 'Conexiuni active: {count}', count=threading.active_count() - 1)
+
     except KeyboardInterrupt:
-        print("\n[SERVER OPRIT] Închidere...")
+        log.info('server_stopped', 'Închidere...')
     finally:
-        with clients_lock:
-            for nickname, info in clients.items():
-                info['socket'].close()
+        close_all_clients()
         server_socket.close()
 
 
+# ---------------------------------------------------------------------------
+# Motorul asyncio: toate conexiunile multiplexate pe o singură buclă
+# ---------------------------------------------------------------------------
+
+class ChatProtocol(asyncio.Protocol):
+    """Conexiune client gestionată de bucla asyncio (fără thread dedicat)."""
+
+    active_connections = 0
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.address = transport.get_extra_info('peername')
+        if not admit_connection(self.address):
+            self.conn = None
+            transport.abort()
+            return
+        self.loop = asyncio.get_running_loop()
+        self.paused = False
+        self.flush_handle = None
+
+        client_socket = transport.get_extra_info('socket')
+        set_nodelay(client_socket)
+        self.conn = new_connection(client_socket, self.address)
+        self.conn['wake'] = self.schedule_flush
+        self.conn['close'] = self.close
+        self.conn['abort'] = transport.abort
+        start_connection_timers(self.conn)
+
+        ChatProtocol.active_connections += 1
+        log.debug('connections', 'Conexiuni active: {count}', count=ChatProtocol.active_connections)
+
+    def data_received(self, data):
+        label = self.conn['nickname'] or self.address
+        try:
+            if not receive_data(self.conn, data):
+                self.close()
+        except FrameError:
+            log.warning('invalid_frame', 'Mesaj invalid de la {client}', client=label)
+            self.close()
+        except Exception as e:
+            log.error('client_error', '{client}: {error}', client=label, error=repr(e))
+            self.close()
+
+    # Scriitorul conexiunii: coada se golește în transport doar cât timp
+    # bufferul acestuia este sub limita superioară (pause/resume_writing).
+    # Cadrele puse în coadă în același tur al buclei (sau în max_write_delay)
+    # pleacă împreună, într-o singură scriere.
+
+    def schedule_flush(self):
+        if self.paused:
+            return
+        if self.flush_handle is None:
+            delay = config['max_write_delay'] if coalesces(self.conn) else 0
+            if delay:
+                self.flush_handle = self.loop.call_later(delay, self.flush)
+            else:
+                self.flush_handle = self.loop.call_soon(self.flush)
+        elif (len(self.conn['outbox']) >= WRITE_BATCH_FRAMES
+              and isinstance(self.flush_handle, asyncio.TimerHandle)):
+            self.flush_handle.cancel()
+            self.flush_handle = self.loop.call_soon(self.flush)
+
+    def write_batch(self, frames):
+        """
+        writelines() le concatenează într-o singură scriere; dacă bufferul
+        transportului era gol se face imediat un send(), altfel datele așteaptă
+        în buffer. Numărăm un apel per lot (limita superioară). Clienților
+        legacy le scriem fiecare cadru separat.
+        """
+        if not coalesces(self.conn):
+            for frame in frames:
+                self.transport.write(frame)
+            return len(frames)
+        self.transport.writelines(frames)
+        return 1
+
+    def flush(self):
+        self.flush_handle = None
+        if self.paused or self.transport.is_closing():
+            return
+        frames = prepare_frames(self.conn, take_frames(self.conn))
+        if frames:
+            write_frames(self.conn, self.write_batch, frames)
+
+    def pause_writing(self):
+        self.paused = True
+
+    def resume_writing(self):
+        self.paused = False
+        self.schedule_flush()
+
+    def close(self):
+        """Trimite ce a rămas în coadă, apoi închide conexiunea."""
+        with self.conn['outbox_lock']:
+            self.conn['closing'] = True
+        if not self.transport.is_closing():
+            frames = prepare_frames(self.conn, take_frames(self.conn))
+            if frames:
+                write_frames(self.conn, self.write_batch, frames)
+            self.transport.close()
+
+    def connection_lost(self, exc):
+        if self.conn is None:
+            # Refuzată la admitere
+            return
+        if isinstance(exc, ConnectionResetError):
+            log.info('connection_reset', '{client} s-a deconectat brusc.',
+                     client=self.conn['nickname'] or self.address)
+        with self.conn['outbox_lock']:
+            self.conn['closing'] = True
+        ChatProtocol.active_connections -= 1
+        metrics.inc('connections_closed')
+        cancel_connection_timers(self.conn)
+        # Cadrele rămase în coadă trec în sesiune, dacă există una
+        unregister_client(self.conn)
+        with self.conn['outbox_lock']:
+            self.conn['outbox'].clear()
+        release_connection(self.conn)
+
+
+async def serve_asyncio(host, port, reuse_port=False, label='asyncio'):
+    """Acceptă conexiuni pe bucla curentă până la anulare."""
+    global spool_reader
+    loop = asyncio.get_running_loop()
+    if spool is not None:
+        # Confirmările spool-ului vin de pe thread-ul lui; conexiunile se ating doar din buclă
+        spool.dispatch = loop.call_soon_threadsafe
+        spool_reader = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix='chat-spool-take')
+    server = await loop.create_server(ChatProtocol, host, port, reuse_address=True,
+                                      reuse_port=reuse_port)
+    timer_task = asyncio.create_task(run_timer_loop())
+    log.info('server_started', 'Ascultă pe {host}:{port} (motor: {engine})', host=host, port=port,
+             engine=label)
+    if not reuse_port:
+        log.info('server_started', 'Apasă Ctrl+C pentru a opri serverul.')
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        timer_task.cancel()
+        # Transporturile trebuie închise cât timp bucla încă rulează
+        close_all_clients()
+        if spool_reader is not None:
+            spool_reader.shutdown()
+
+
+def run_asyncio_server(host, port):
+    """Pornește serverul bazat pe o buclă de evenimente asyncio."""
+    try:
+        asyncio.run(serve_asyncio(host, port))
+    except KeyboardInterrupt:
+        log.info('server_stopped', 'Închidere...')
+
+
+# ---------------------------------------------------------------------------
+# Mod multi-proces: N workeri asyncio pe același port (SO_REUSEPORT),
+# legați printr-un hub pub/sub pe socket Unix în procesul principal
+# ---------------------------------------------------------------------------
+
+async def serve_worker(host, port, bus_path, worker_id):
+    """Conectează workerul la hub, apoi servește clienți până la pierderea hub-ului."""
+    global bus
+    loop = asyncio.get_running_loop()
+    _, bus = await loop.create_unix_connection(
+        lambda: BusClient(worker_id, deliver_broadcast, deliver_private, deliver_room, announce_presence),
+        bus_path)
+    await bus.ready
+    for nickname in bus.remote_users():
+        presence.join(nickname)
+
+    server_task = asyncio.create_task(
+        serve_asyncio(host, port, reuse_port=True, label=f'asyncio, worker {worker_id}'))
+    await asyncio.wait([server_task, bus.closed], return_when=asyncio.FIRST_COMPLETED)
+    server_task.cancel()
+
+
+def run_worker(host, port, bus_path, worker_id, metrics_port=0):
+    """Punctul de intrare al unui proces worker."""
+    start_metrics_endpoint(metrics_port + worker_id if metrics_port else 0)
+    try:
+        asyncio.run(serve_worker(host, port, bus_path, worker_id))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        log.close()
+
+
+def run_cluster(host, port, workers, metrics_port=0):
+    """Pornește `workers` procese care împart portul și rulează hub-ul în procesul curent."""
+    bus_path = os.path.join(tempfile.gettempdir(), f'chat-bus-{os.getpid()}.sock')
+    hub_socket = listen_hub(bus_path)
+
+    context = multiprocessing.get_context('fork')
+    processes = []
+    for worker_id in range(workers):
+        process = context.Process(target=run_worker, args=(host, port, bus_path, worker_id, metrics_port))
+        process.daemon = True
+        process.start()
+        processes.append(process)
+
+    log.info('server_started', '{workers} workeri pe {host}:{port}, bus: {bus}', workers=workers, host=host,
+             port=port, bus=bus_path)
+    log.info('server_started', 'Apasă Ctrl+C pentru a opri serverul.')
+
+    try:
+        asyncio.run(serve_hub(hub_socket))
+    except KeyboardInterrupt:
+        log.info('server_stopped', 'Închidere...')
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join()
+        os.unlink(bus_path)
+
+
+def start_metrics_endpoint(port):
+    """Pornește endpoint-ul HTTP al metricilor, dacă portul este nenul."""
+    if not port:
+        return
+    host = config['metrics_host']
+    serve_http(metrics, host, port)
+    log.info('metrics', 'http://{host}:{port}/metrics și /stats', host=host, port=port)
+
+
+def close_all_clients():
+    """Închide conexiunile tuturor clienților înregistrați."""
+    with clients_lock:
+        connections = list(clients.values())
+
+    for info in connections:
+        info['abort']()
+
+
+ENGINES = {
+    'threaded': run_threaded_server,
+    'asyncio': run_asyncio_server,
+}
+
+
+def parse_args():
+    """Citește opțiunile din linia de comandă."""
+    parser = argparse.ArgumentParser(description='Server de chat TCP')
+    parser.add_argument('--host', default=HOST, help='adresa pe care ascultă serverul')
+    parser.add_argument('--port', type=int, default=PORT, help='portul pe care ascultă serverul')
+    parser.add_argument('--engine', choices=sorted(ENGINES), default='threaded',
+                        help='threaded = un thread per client, asyncio = o singură buclă de evenimente')
+    parser.add_argument('--history-bytes', type=int, default=config['history_bytes'],
+                        help='memoria (octeți) pentru istoricul mesajelor; 0 dezactivează istoricul')
+    parser.add_argument('--compress-threshold', type=int, default=config['compress_threshold'],
+                        help='mesajele mai mari de atât (octeți) se comprimă zlib pentru clienții '
+                             'care cer compresie; 0 dezactivează compresia')
+    parser.add_argument('--metrics-port', type=int, default=0,
+                        help='portul endpoint-ului HTTP local cu metrici (/metrics, /stats); '
+                             'cu --workers, workerul i folosește portul + i; 0 = dezactivat')
+    parser.add_argument('--log-level', choices=LEVELS, default='info', help='nivelul minim al jurnalului')
+    parser.add_argument('--log-format', choices=('text', 'json'), default='text',
+                        help='formatul liniilor de jurnal (json = un obiect pe linie)')
+    parser.add_argument('--log-messages', type=int, default=0, metavar='N',
+                        help='scrie în jurnal unul din N mesaje de chat (fără conținutul lor); 0 = niciunul')
+    parser.add_argument('--log-queue', type=int, default=log.queue_size,
+                        help='înregistrări de jurnal în așteptare; peste limită se pierd, nu se așteaptă')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='numărul de procese asyncio care împart portul (SO_REUSEPORT)')
+    parser.add_argument('--max-write-delay-ms', type=float, default=config['max_write_delay'] * 1000,
+                        help='cât poate aștepta un mesaj în coadă ca să fie trimis împreună cu altele '
+                             '(0 = doar cele adunate în aceeași iterație)')
+    parser.add_argument('--outbox-limit', type=int, default=config['outbox_limit'],
+                        help='numărul maxim de mesaje în așteptare pentru un client')
+    parser.add_argument('--overflow-policy', choices=OVERFLOW_POLICIES, default=config['overflow_policy'],
+                        help='ce se întâmplă când coada unui client este plină')
+    parser.add_argument('--session-ttl', type=float, default=config['session_ttl'],
+                        help='cât timp (s) poate relua un client deconectat sesiunea; 0 = fără sesiuni '
+                             '(cu --workers sesiunile sunt dezactivate)')
+    parser.add_argument('--session-buffer-bytes', type=int, default=config['session_buffer_bytes'],
+                        help='octeții de mesaje recente păstrați per sesiune pentru reluare')
+    parser.add_argument('--register-timeout', type=float, default=config['register_timeout'],
+                        help='secunde în care o conexiune nouă trebuie să se înregistreze; 0 = oricât')
+    parser.add_argument('--read-timeout', type=float, default=config['read_timeout'],
+                        help='secunde în care trebuie să sosească restul unui mesaj început; 0 = oricât')
+    parser.add_argument('--ping-interval', type=float, default=config['ping_interval'],
+                        help='după câte secunde de liniște serverul trimite ping; 0 = fără ping')
+    parser.add_argument('--idle-timeout', type=float, default=config['idle_timeout'],
+                        help='după câte secunde fără niciun mesaj (nici pong) conexiunea se închide; '
+                             '0 = niciodată')
+    parser.add_argument('--presence-changes', type=int, default=config['presence_changes'],
+                        help='câte modificări de prezență se păstrează; un client rămas mai în urmă '
+                             'primește tot rosterul')
+    parser.add_argument('--limits', metavar='FILE',
+                        help='fișier JSON cu limitele de mesaje și de conexiuni (vezi chat_limits)')
+    parser.add_argument('--rate-limit', action='append', default=[], metavar='SCOPE:TIP=RATĂ[/RAFALĂ]',
+                        help='limită de mesaje per nickname sau ip, de ex. nickname:broadcast=5/20 sau '
+                             'ip:*=200; implicit nu există limite, rata 0 scoate una (se poate repeta)')
+    parser.add_argument('--max-connections', type=int,
+                        help=f'conexiuni deschise simultan (implicit {config["max_connections"]}, 0 = oricâte)')
+    parser.add_argument('--max-connections-per-ip', type=int,
+                        help=f'conexiuni simultane de pe aceeași adresă '
+                             f'(implicit {config["max_connections_per_ip"]}, 0 = oricâte)')
+    parser.add_argument('--max-pending-registrations', type=int,
+                        help=f'conexiuni acceptate, dar încă neînregistrate '
+                             f'(implicit {config["max_pending_registrations"]}, 0 = oricâte)')
+    parser.add_argument('--spool-dir', metavar='DIR',
+                        help='păstrează pe disc, în DIR, mesajele private pentru utilizatorii deconectați '
+                             'și le livrează la următoarea înregistrare')
+    parser.add_argument('--spool-max-messages', type=int, default=config['spool_max_messages'],
+                        help='câte mesaje pot aștepta în spool pentru un singur destinatar')
+    parser.add_argument('--spool-segment-bytes', type=int, default=config['spool_segment_bytes'],
+                        help='mărimea unui segment al spool-ului, în octeți')
+    return parser.parse_args()
+
+
+def main():
+    global spool
+    args = parse_args()
+    if args.workers > 1:
+        if args.engine != 'asyncio':
+            raise SystemExit("[EROARE] --workers necesită --engine asyncio")
+        if not hasattr(socket, 'SO_REUSEPORT'):
+            raise SystemExit("[EROARE] SO_REUSEPORT nu este disponibil pe acest sistem")
+        if args.spool_dir:
+            # Destinatarul se poate înregistra pe alt worker decât cel care a păstrat mesajul
+            raise SystemExit("[EROARE] --spool-dir nu funcționează împreună cu --workers")
+
+    config['outbox_limit'] = args.outbox_limit
+    config['overflow_policy'] = args.overflow_policy
+    config['history_bytes'] = history.byte_budget = args.history_bytes
+    config['compress_threshold'] = args.compress_threshold
+    config['max_write_delay'] = args.max_write_delay_ms / 1000
+    config['session_ttl'] = args.session_ttl
+    config['session_buffer_bytes'] = args.session_buffer_bytes
+    config['presence_changes'] = presence.max_changes = args.presence_changes
+    config['register_timeout'] = args.register_timeout
+    config['read_timeout'] = args.read_timeout
+    config['ping_interval'] = args.ping_interval
+    config['idle_timeout'] = args.idle_timeout
+    try:
+        configure_limits(args)
+    except (OSError, ValueError) as e:
+        raise SystemExit(f"[EROARE] Limite invalide: {e}")
+    timers.schedule(LIMITS_PRUNE_INTERVAL, prune_limits)
+    config['spool_dir'] = args.spool_dir
+    config['spool_max_messages'] = args.spool_max_messages
+    config['spool_segment_bytes'] = args.spool_segment_bytes
+    log.configure(level=LEVELS[args.log_level], json_output=args.log_format == 'json',
+                  queue_size=args.log_queue)
+    for event in MESSAGE_LOG_EVENTS:
+        log.sample(event, args.log_messages)
+
+    if args.workers > 1:
+        run_cluster(args.host, args.port, args.workers, args.metrics_port)
+        return
+
+    if args.spool_dir:
+        try:
+            spool = Spool(args.spool_dir, args.spool_segment_bytes, args.spool_max_messages,
+                          on_error=lambda e: log.error('spool', 'Eroare la scrierea spool-ului: {error}',
+                                                       error=repr(e))).open()
+        except (OSError, ValueError) as e:
+            raise SystemExit(f"[EROARE] Spool-ul nu poate fi deschis: {e}")
+        log.info('spool', 'Spool deschis în {path}: {messages} mesaje în așteptare.',
+                 path=args.spool_dir, messages=spool.stats()['messages'])
+    try:
+        start_metrics_endpoint(args.metrics_port)
+        ENGINES[args.engine](args.host, args.port)
+    finally:
+        if spool is not None:
+            spool.close()
+
+
 if __name__ == "__main__":
     main()